@@ -1,6 +1,9 @@
 import platform
 import os
 
+# This project
+from slodon.slodonix.systems.vision import Match, locate, locate_all
+
 
 def get_display_server():
     """
@@ -15,9 +18,13 @@ def get_display_server():
 
 _system = platform.system()  # Windows / Linux / Darwin
 _display_manager = get_display_server
+_backend = os.environ.get('SLODONIX_BACKEND')  # "null": the in-process backend, no OS is touched
+
 
+if _backend == 'null':
+    from slodon.slodonix.slodonix.slodonix_null import *
 
-if _system == 'Windows':
+elif _system == 'Windows':
     from slodon.slodonix.slodonix.slodonix_windows import *
 
 elif _system == 'Linux':
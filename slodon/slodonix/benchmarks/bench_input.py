@@ -0,0 +1,72 @@
+"""
+Operations per second of the input layer on the in-process backend(no OS, only the Python overhead)
+
+    python -m slodon.slodonix.benchmarks.bench_input [--seconds 1.0]
+
+The backend is imported directly, SLODONIX_BACKEND=null selects it for `from slodon.slodonix import *`.
+"""
+import argparse
+import time
+
+# This project
+from slodon.slodonix.slodonix.slodonix_null import CHARS, MODIFIER_CODES, DisplayContext, key_code
+from slodon.slodonix.systems.input import compile_plan, parse_plan
+
+TEXT = "The quick brown fox jumps over the lazy dog. "  # 45 characters, mixed case
+PLAN = parse_plan(
+    """
+move(10, 10); move(20, 20); move(30, 30)
+click(100, 200)
+type("Hello, World!")
+hotkey("ctrl", "s")
+wait(0.5)
+key("enter")
+click(400, 300, button="right", clicks=2, interval=0.1)
+"""
+)
+
+
+def measure(display, operation, seconds: float) -> tuple[int, float, int]:
+    """
+    Call operation() in a loop for about seconds, return back (calls, elapsed seconds, primitives). The
+    operations of the display are cleared between the batches of calls.
+    """
+    calls = primitives = 0
+    batch = 1
+    elapsed = 0.0
+    while elapsed < seconds:
+        display.clear()
+        start = time.perf_counter()
+        for _ in range(batch):
+            operation()
+        elapsed += time.perf_counter() - start
+        calls += batch
+        primitives += display.count
+        batch = max(1, min(batch * 2, int(calls / elapsed * 0.1)))  # about 10 batches a second
+    return calls, elapsed, primitives
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent on every benchmark")
+    args = parser.parse_args()
+
+    with DisplayContext() as display:
+        program = compile_plan(PLAN, CHARS, MODIFIER_CODES.get, key_code)
+        benchmarks = {
+            "key_down": lambda: display.key_down("a", with_release=True),
+            "key_down(shifted)": lambda: display.key_down("A", with_release=True),
+            "move_to": lambda: display.move_to(640, 480),
+            "move_to(0.5s tween)": lambda: display.move_to(display.position()[0] ^ 512, 300, duration=0.5),
+            f"type_text({len(TEXT)} chars)": lambda: display.type_text(TEXT),
+            "compile_plan": lambda: compile_plan(PLAN, CHARS, MODIFIER_CODES.get, key_code),
+            f"run_plan({program.steps} steps)": lambda: display.run_plan(PLAN),
+        }
+        print(f"{'operation':<24}{'ops/sec':>14}{'us/op':>10}{'primitives/op':>16}")
+        for name, operation in benchmarks.items():
+            calls, elapsed, primitives = measure(display, operation, args.seconds)
+            print(f"{name:<24}{calls / elapsed:>14,.0f}{elapsed / calls * 1e6:>10.2f}{primitives / calls:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
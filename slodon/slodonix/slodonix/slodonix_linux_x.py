@@ -0,0 +1,20 @@
+# X11 backend: a pure Python client of the X protocol(see slodon/slodonix/systems/x)
+# This project
+from slodon.slodonix.systems.x.display.display import Display, open_display
+
+__all__ = ["Display", "DisplayContext", "open_display", "get_os"]
+
+
+class DisplayContext(Display):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def get_os() -> str:
+    """
+    Return back the currently used operating system.
+    """
+    return "Linux"
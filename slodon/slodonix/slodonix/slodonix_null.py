@@ -0,0 +1,297 @@
+# In-process backend: the input is lowered like on a real display, then only appended to an array.
+# Select it with SLODONIX_BACKEND=null, it measures the overhead of the input layer without any OS.
+import math
+import string
+
+import numpy as np
+
+# This project
+from slodon.slodonix.systems.input.keystrokes import compile_text
+from slodon.slodonix.systems.input.motion import MOVE_RATE, linear, play_path, tween_path
+from slodon.slodonix.systems.input.plan import BUTTON_NUMBERS, Program, compile_plan
+from slodon.slodonix.systems.input.recorder import BUTTON_DOWN, BUTTON_UP, KEY_DOWN, KEY_UP, MOVE, RECORD
+from slodon.slodonix.systems.x.display.keyboard import KEYSYMS
+from slodon.slodonix.systems.x.display.screens import Monitor, MonitorLayout
+from slodon.slodonix.systems.x.display.selection import PASTE_KEYS, PASTE_THRESHOLD
+
+__all__ = ["Display", "DisplayContext", "open_display", "get_os"]
+
+_SHIFTED = '~!@#$%^&*()_+{}|:"<>?'
+
+
+def _keyboard() -> tuple[dict[str, tuple[int, int]], dict[str, tuple[int, int]]]:
+    """
+    (chars, named keys) of a US keyboard with made-up key codes: one key code per keysym, the named keys
+    after the characters
+    """
+    chars: dict[str, tuple[int, int]] = {}
+    code = 8
+    for char in string.ascii_lowercase + string.digits + "`-=[]\\;',./ \t\n":
+        chars[char] = (code, 0)
+        code += 1
+    for char in string.ascii_uppercase:
+        chars[char] = (chars[char.lower()][0], 1)
+    for char in _SHIFTED:
+        chars[char] = (code, 1)
+        code += 1
+
+    # keysym -> key code, the keys of the unshifted characters first
+    codes = {KEYSYMS.get(char, ord(char)): entry[0] for char, entry in chars.items() if not entry[1]}
+    named = {}
+    for name, keysym in KEYSYMS.items():
+        if keysym not in codes:
+            codes[keysym] = code
+            code += 1
+        named[name] = chars.get(name) or (codes[keysym], 0)
+    return chars, named
+
+
+# the made-up keyboard: character -> (key code, modifier mask), key name -> (key code, modifier mask)
+CHARS, NAMED_KEYS = _keyboard()
+# modifier mask -> key code(Shift, Control, Mod1): the keys named shift, ctrl and alt
+MODIFIER_CODES = {1: NAMED_KEYS["shift"][0], 4: NAMED_KEYS["ctrl"][0], 8: NAMED_KEYS["alt"][0]}
+
+
+class Display:
+    """
+    A display without any OS behind it: every operation is appended to a preallocated RECORD array
+    (`operations`), the time is virtual(moves and intervals advance it instead of sleeping).
+    """
+
+    def __init__(self, display=None, capacity: int = 1 << 16, size: tuple[int, int] = (1920, 1080)) -> None:
+        """
+        Display initialization
+        ### Arguments
+        - display: ignored(the name of the display on the other backends)
+        - capacity (int): operations preallocated, the array doubles when full
+        - size (tuple): (width, height) of the screen
+        ### Returns
+        - None
+        """
+        self.display_name = display
+        self._ops = np.zeros(capacity, dtype=RECORD)
+        self.count = 0
+        self.now = 0.0  # virtual seconds
+        self._size = size
+        self._position = (0, 0)
+        self.recorder = None
+        self.clipboard = ""
+
+    # -------------------------------------------------------------------------------------------------------
+    # Operations
+    # -------------------------------------------------------------------------------------------------------
+
+    @property
+    def operations(self) -> np.ndarray:
+        """
+        The operations so far(a view, valid until the next operation)
+        """
+        return self._ops[:self.count]
+
+    def clear(self) -> None:
+        self.count = 0
+        self.now = 0.0
+
+    def _append(self, op: int, detail: int = 0, x: int = 0, y: int = 0) -> None:
+        if self.count == len(self._ops):
+            self._ops = np.resize(self._ops, len(self._ops) * 2)
+        self._ops[self.count] = (self.now, op, detail, x, y)
+        self.count += 1
+        if self.recorder is not None:
+            self.recorder.append(op, detail, x, y)
+
+    def _send_input(self, actions: list[tuple[int, int, int, int, float]]) -> None:
+        """
+        Append (op, detail, x, y, delay) actions at once
+        """
+        count = len(actions)
+        end = self.count + count
+        if end > len(self._ops):
+            self._ops = np.resize(self._ops, max(end, len(self._ops) * 2))
+        rows = np.array(actions, dtype=np.float64).reshape(count, 5)
+        ops = self._ops[self.count:end]
+        ops["time"] = self.now + np.cumsum(rows[:, 4])
+        ops["op"] = rows[:, 0]
+        ops["detail"] = rows[:, 1]
+        ops["x"] = rows[:, 2]
+        ops["y"] = rows[:, 3]
+        self.count = end
+        if self.recorder is not None:  # before the virtual time moves: the delays are added to the current time
+            self.recorder.extend(actions)
+        if count:
+            self.now = float(ops["time"][-1])
+
+    def _clock(self) -> float:
+        return self.now
+
+    def _sleep(self, seconds: float) -> None:
+        # at least one ulp: a gap lost to rounding(now + offset - now < offset) must not stall play_path
+        self.now = max(self.now + max(seconds, 0.0), math.nextafter(self.now, math.inf))
+
+    # -------------------------------------------------------------------------------------------------------
+    # Display surface
+    # -------------------------------------------------------------------------------------------------------
+
+    def size(self) -> tuple[int, int]:
+        return self._size
+
+    def monitors(self) -> MonitorLayout:
+        return MonitorLayout((Monitor("null", 0, 0, *self._size, primary=True),))
+
+    def position(self) -> tuple[int, int]:
+        return self._position
+
+    def key_down(self, key: str, with_release: bool = False) -> None:
+        code, modifiers = self._key(key)
+        actions = [(KEY_DOWN, modifier, 0, 0, 0.0) for modifier in modifiers]
+        actions.append((KEY_DOWN, code, 0, 0, 0.0))
+        if with_release:
+            actions.append((KEY_UP, code, 0, 0, 0.0))
+        actions += [(KEY_UP, modifier, 0, 0, 0.0) for modifier in reversed(modifiers)]
+        self._send_input(actions)
+
+    def key_up(self, key: str) -> None:
+        code, modifiers = self._key(key)
+        actions = [(KEY_DOWN, modifier, 0, 0, 0.0) for modifier in modifiers]
+        actions.append((KEY_UP, code, 0, 0, 0.0))
+        actions += [(KEY_UP, modifier, 0, 0, 0.0) for modifier in reversed(modifiers)]
+        self._send_input(actions)
+
+    def type_text(self, text: str, interval: float = 0.0, paste_threshold: int | None = PASTE_THRESHOLD) -> None:
+        if paste_threshold is not None and not interval and len(text) >= paste_threshold:
+            self.paste_text(text)
+            return
+        strokes = compile_text(text, CHARS, MODIFIER_CODES.get)
+        self._send_input(
+            [
+                (KEY_DOWN if press else KEY_UP, code, 0, 0, interval if first and index else 0.0)
+                for index, (code, press, first) in enumerate(strokes)
+            ]
+        )
+
+    def paste_text(self, text: str, keys: tuple[str, ...] = PASTE_KEYS, timeout: float = 5.0) -> bool:
+        codes = [self._key(name)[0] for name in keys]
+        self._send_input(
+            [(KEY_DOWN, code, 0, 0, 0.0) for code in codes] + [(KEY_UP, code, 0, 0, 0.0) for code in reversed(codes)]
+        )
+        self.clipboard = text
+        return True
+
+    def move_to(self, x=None, y=None, duration: float = 0.0, tween=linear, rate: float = MOVE_RATE) -> None:
+        if isinstance(x, tuple):
+            x, y = x
+        x = self._position[0] if x is None else int(x)
+        y = self._position[1] if y is None else int(y)
+        if not duration > 0:
+            self._move(x, y)
+            return
+        times, points = tween_path(self._position, (x, y), duration, tween, rate)
+        play_path(times, points, self._move, self._clock, self._sleep)
+
+    def _move(self, x: int, y: int) -> None:
+        self._append(MOVE, 0, x, y)
+        self._position = (x, y)
+
+    def mouse_down(self, button="left") -> None:
+        self._append(BUTTON_DOWN, _button(button))
+
+    def mouse_up(self, button="left") -> None:
+        self._append(BUTTON_UP, _button(button))
+
+    def click(self, x=None, y=None, button="left", clicks: int = 1, interval: float = 0.0) -> None:
+        if isinstance(x, tuple):
+            x, y = x
+        if x is not None or y is not None:
+            self.move_to(x, y)
+        button = _button(button)
+        actions = []
+        for index in range(clicks):
+            actions.append((BUTTON_DOWN, button, 0, 0, interval if index else 0.0))
+            actions.append((BUTTON_UP, button, 0, 0, 0.0))
+        self._send_input(actions)
+
+    def send_records(self, records, timed: bool = False, speed: float = 1.0) -> None:
+        if timed and speed <= 0:
+            raise ValueError("speed must be positive")
+        count = len(records)
+        end = self.count + count
+        if end > len(self._ops):
+            self._ops = np.resize(self._ops, max(end, len(self._ops) * 2))
+        ops = self._ops[self.count:end]
+        ops[:] = records
+        if timed and count:
+            ops["time"] = self.now + (records["time"] - records["time"][0]) / speed
+        else:
+            ops["time"] = self.now
+        self.count = end
+        if self.recorder is not None:
+            delays = np.diff(ops["time"], prepend=ops["time"][:1])
+            self.recorder.extend(zip(ops["op"].tolist(), ops["detail"].tolist(), ops["x"].tolist(), ops["y"].tolist(),
+                                     delays.tolist()))
+        if count:
+            self.now = float(ops["time"][-1])
+            moves = records[records["op"] == MOVE]
+            if len(moves):
+                self._position = (int(moves["x"][-1]), int(moves["y"][-1]))
+
+    def run_plan(self, plan) -> Program:
+        program = compile_plan(plan, CHARS, MODIFIER_CODES.get, key_code)
+        program.run(lambda records: self.send_records(records, timed=True), self.wait_for_window, self._sleep)
+        return program
+
+    def wait_for_window(self, window: str, timeout: float = 10.0, exact: bool = False) -> list:
+        return []  # no window ever appears, and nobody waits for them
+
+    def capture(self, x: int = 0, y: int = 0, width: int | None = None, height: int | None = None, copy=False):
+        """
+        A black (height, width, 4) BGRX NumPy array
+        """
+        width = self._size[0] - x if width is None else width
+        height = self._size[1] - y if height is None else height
+        return np.zeros((height, width, 4), dtype=np.uint8)
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _key(key: str) -> tuple[int, list[int]]:
+        entry = key_code(key)
+        if entry is None:
+            raise ValueError(f"no key produces {key!r}")
+        code, mask = entry
+        return code, [MODIFIER_CODES[bit] for bit in (1, 4, 8) if mask & bit]
+
+    def __repr__(self) -> str:
+        return f"<null Display operations={self.count} now={self.now:.3f}>"
+
+
+def key_code(name: str) -> tuple[int, int] | None:
+    return NAMED_KEYS.get(name.lower()) if len(name) > 1 else CHARS.get(name)
+
+
+def _button(button) -> int:
+    if isinstance(button, int):
+        return button
+    try:
+        return BUTTON_NUMBERS[button]
+    except KeyError:
+        raise ValueError(f"unknown button {button!r}") from None
+
+
+class DisplayContext(Display):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def open_display(name=None, pool=None) -> Display:
+    return Display(name)
+
+
+def get_os() -> str:
+    """
+    Return back the currently used operating system.
+    """
+    return "null"
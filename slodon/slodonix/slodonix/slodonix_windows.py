@@ -3,12 +3,15 @@
 # (pyautogui: see notice.md)
 from ctypes import windll as w
 import ctypes
+import time
 from typing import Union, Callable
 
 # This project
+from slodon.slodonix.systems.input.keystrokes import Keystroke, compile_text
+from slodon.slodonix.systems.input.motion import play_path, tween_path
 from slodon.slodonix.systems.windows.keyboard_map import full_map as key_map
 from slodon.slodonix.systems.windows.utils import *
-from slodon.slodonix.systems.windows.structures import POSITION, SIZE
+from slodon.slodonix.systems.windows.structures import INPUT, POSITION, SIZE
 from slodon.slodonix.systems.windows.constants import *
 
 __all__ = ["Display", "get_os", "DisplayContext"]
@@ -22,6 +25,9 @@ Y_TYPE = Union[int, float, None]
 DURATION_TYPE = Union[float, None]
 TWEEN_TYPE = Union[Callable, None]  # Callable -> tween function
 
+# modifier bit of VkKeyScan -> virtual key code of the modifier(HANKAKU(8) not supported)
+MODIFIER_KEYS = {1: 0x10, 2: 0x11, 4: 0x12}
+
 
 class Screen:
     """
@@ -36,6 +42,52 @@ class _Interact:
 
     def __init__(self, info) -> None:
         self.info = info
+        self._chars: dict[str, tuple[int, int]] | None = None
+
+    @property
+    def chars(self) -> dict[str, tuple[int, int]]:
+        """
+        character -> (virtual key code, modifier mask), built once from the key map
+        """
+        if self._chars is None:
+            chars = {}
+            for key, value in key_map.items():
+                if len(key) != 1 or value is None or value < 0:
+                    continue
+                mods, vk_code = divmod(value, 0x100)
+                if is_shift_character(key):
+                    mods |= 1
+                chars[key] = (vk_code, mods & 7)
+            self._chars = chars
+        return self._chars
+
+    # noinspection PyMethodMayBeStatic
+    def send_keystrokes(self, strokes: list[Keystroke], interval: float = 0.0) -> None:
+        """
+        - https://learn.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-sendinput
+
+        ### Arguments
+            - strokes (list): key press/release primitives(see compile_text)
+            - interval (float): seconds between two characters, 0 sends every primitive in one SendInput call
+        ### Returns
+            - None
+        """
+        inputs = (INPUT * len(strokes))()
+        for slot, (vk_code, press, _) in zip(inputs, strokes):
+            slot.type = INPUT_KEYBOARD
+            slot.ki.wVk = vk_code
+            slot.ki.dwFlags = KEYEVENTF_KEYDOWN if press else KEYEVENTF_KEYUP
+
+        size = ctypes.sizeof(INPUT)
+        if not interval:
+            ctypes.windll.user32.SendInput(len(inputs), inputs, size)
+            return
+
+        starts = [index for index, (_, _, first) in enumerate(strokes) if first] + [len(strokes)]
+        for number, (start, end) in enumerate(zip(starts, starts[1:])):
+            if number:
+                time.sleep(interval)
+            ctypes.windll.user32.SendInput(end - start, ctypes.byref(inputs[start]), size)
 
     # noinspection PyMethodMayBeStatic
     def key_up(self, key: str) -> None:
@@ -340,6 +392,21 @@ class Display:
 
         self._interact.key_down(key, with_release=with_release)
 
+    def type_text(self, text: str, interval: float = 0.0) -> None:
+        """
+        Types a string, the modifiers are pressed once for a run of characters that need them.
+
+        ### Arguments:
+            - text (str): The text to be typed.
+            - interval (float): The number of seconds between two characters. 0.0 by default.
+
+        ### Returns:
+            - None
+        """
+        strokes = compile_text(text, self._interact.chars, MODIFIER_KEYS.get)
+        if strokes:
+            self._interact.send_keystrokes(strokes, interval)
+
     def move_to(
         self,
         x: X_TYPE = None,
@@ -373,7 +440,19 @@ class Display:
         ### Returns:
             None
         """
-        self._interact.moveto(x, y)
+        if isinstance(x, tuple):
+            x, y = x
+        if x is None or y is None or duration:  # the start is only needed to fill a coordinate or for a tween
+            start = self.info.position()
+            x = start.x if x is None else x
+            y = start.y if y is None else y
+        x, y = int(x), int(y)
+        if not duration:
+            self._interact.moveto(x, y)
+            return
+        # the whole path is precomputed, the positions are sent against a deadline(late ones are dropped)
+        times, points = tween_path((start.x, start.y), (x, y), duration, tween or linear)
+        play_path(times, points, self._interact.moveto)
 
     def mouse_down(self):
         pass
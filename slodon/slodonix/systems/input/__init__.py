@@ -0,0 +1,4 @@
+from slodon.slodonix.systems.input.keystrokes import *
+from slodon.slodonix.systems.input.motion import *
+from slodon.slodonix.systems.input.recorder import *
+from slodon.slodonix.systems.input.plan import Step, Program, parse_plan, compile_plan
@@ -0,0 +1,67 @@
+# Lowering of text into key press/release primitives, shared by the backends
+from typing import Callable, Mapping
+
+__all__ = ["Keystroke", "compile_text"]
+
+# (key code, press(True) / release(False), first primitive of a character)
+Keystroke = tuple[int, bool, bool]
+
+
+def compile_text(
+    text: str,
+    keys: Mapping[str, tuple[int, int]],
+    modifier_code: Callable[[int], int | None],
+) -> list[Keystroke]:
+    """
+    Turn a string into a flat list of key press/release primitives. Modifiers are grouped: they stay pressed
+    while the next characters need them(typing "HELLO" presses Shift once), and are released at the end.
+    ### Arguments
+    - text (str): the text to type
+    - keys (Mapping): character -> (key code, modifier mask), e.g. KeyboardMapping.chars
+    - modifier_code (Callable): single bit modifier mask -> key code of the modifier
+    ### Returns
+    - list[Keystroke]
+    ### Raises
+    - ValueError: no key of the keyboard produces a character(nothing is typed)
+    """
+    strokes: list[Keystroke] = []
+    append = strokes.append
+    get = keys.get
+    modifier_codes: dict[int, int] = {}
+    held = 0  # modifier mask currently pressed
+
+    for char in text:
+        entry = get(char)
+        if entry is None:
+            raise ValueError(f"no key produces {char!r}")
+        code, mask = entry
+        first = True
+        if mask != held:
+            for bit in _bits(held & ~mask, reverse=True):
+                append((modifier_codes[bit], False, first))
+                first = False
+            for bit in _bits(mask & ~held):
+                modifier = modifier_codes.get(bit)
+                if modifier is None:
+                    modifier = modifier_codes[bit] = _modifier(modifier_code, bit)
+                append((modifier, True, first))
+                first = False
+            held = mask
+        append((code, True, first))
+        append((code, False, False))
+
+    for bit in _bits(held, reverse=True):
+        append((modifier_codes[bit], False, False))
+    return strokes
+
+
+def _bits(mask: int, reverse: bool = False) -> list[int]:
+    bits = [1 << index for index in range(mask.bit_length()) if mask >> index & 1]
+    return bits[::-1] if reverse else bits
+
+
+def _modifier(modifier_code: Callable[[int], int | None], bit: int) -> int:
+    code = modifier_code(bit)
+    if code is None:
+        raise ValueError(f"no key generates the modifier {bit:#x}")
+    return code
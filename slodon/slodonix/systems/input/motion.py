@@ -0,0 +1,190 @@
+# Tweened pointer motion, shared by the backends
+# https://easings.net/
+# https://github.com/asweigart/pytweening
+from __future__ import annotations
+
+import math
+import time
+from typing import Callable
+
+import numpy as np
+
+__all__ = [
+    "linear", "ease_in_quad", "ease_out_quad", "ease_in_out_quad", "ease_in_out_cubic", "ease_out_back",
+    "EASINGS", "MOVE_RATE", "tween_path", "play_path", "RecordingBackend",
+]
+
+MOVE_RATE = 125  # pointer positions per second, the usual rate of a USB mouse
+
+Point = tuple[int, int]
+
+
+# -----------------------------------------------------------------------------------------------------------
+# Easing functions: progress(0..1) -> position along the path(0..1), on whole arrays
+# -----------------------------------------------------------------------------------------------------------
+
+def linear(n: np.ndarray) -> np.ndarray:
+    return n
+
+
+def ease_in_quad(n: np.ndarray) -> np.ndarray:
+    return n * n
+
+
+def ease_out_quad(n: np.ndarray) -> np.ndarray:
+    return n * (2 - n)
+
+
+def ease_in_out_quad(n: np.ndarray) -> np.ndarray:
+    return np.where(n < 0.5, 2 * n * n, 1 - 2 * (1 - n) ** 2)
+
+
+def ease_in_out_cubic(n: np.ndarray) -> np.ndarray:
+    return np.where(n < 0.5, 4 * n ** 3, 1 - 4 * (1 - n) ** 3)
+
+
+def ease_out_back(n: np.ndarray, s: float = 1.70158) -> np.ndarray:
+    n = n - 1
+    return n * n * ((s + 1) * n + s) + 1
+
+
+EASINGS: dict[str, Callable] = {
+    function.__name__: function
+    for function in (linear, ease_in_quad, ease_out_quad, ease_in_out_quad, ease_in_out_cubic, ease_out_back)
+}
+
+
+def _ease(tween: Callable | str, progress: np.ndarray) -> np.ndarray:
+    """
+    Apply an easing to every progress value at once, scalar functions(e.g. from pytweening) are called per
+    value
+    """
+    if isinstance(tween, str):
+        tween = EASINGS[tween]
+    try:
+        eased = np.asarray(tween(progress), dtype=np.float64)
+        if eased.shape == progress.shape:
+            return eased
+    except (TypeError, ValueError):  # e.g. `if n < 0.5` on an array
+        pass
+    return np.fromiter((tween(float(value)) for value in progress), dtype=np.float64, count=len(progress))
+
+
+def tween_path(
+    start: Point,
+    end: Point,
+    duration: float,
+    tween: Callable | str = linear,
+    rate: float = MOVE_RATE,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Precompute a whole pointer move
+    ### Arguments
+    - start (tuple): (x, y) of the pointer
+    - end (tuple): (x, y) of the destination
+    - duration (float): seconds
+    - tween (Callable | str): easing function(or the name of one of EASINGS), called once with the whole
+    progress array
+    - rate (float): positions per second
+    ### Returns
+    - (times, points): the offset of every position from the start(seconds, float64, increasing) and the
+    (n, 2) int32 positions. Repeated positions are removed, the last one is end.
+    """
+    steps = max(math.ceil(duration * rate), 1) if duration > 0 else 1
+    progress = np.arange(1, steps + 1, dtype=np.float64) / steps
+    eased = _ease(tween, progress)
+
+    delta = np.subtract(end, start, dtype=np.float64)
+    points = np.rint(np.asarray(start, dtype=np.float64) + eased[:, None] * delta).astype(np.int32)
+    points[-1] = end
+    times = progress * duration
+
+    previous = np.vstack((np.asarray(start, dtype=np.int32), points[:-1]))
+    keep = np.any(points != previous, axis=1)  # drop the positions equal to the previous one
+    if not keep.any():  # start == end
+        keep[-1] = True
+    return times[keep], points[keep]
+
+
+def play_path(
+    times: np.ndarray,
+    points: np.ndarray,
+    move: Callable[[int, int], None],
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    """
+    Send the positions of a path at their times. Every position is scheduled against the start time(not
+    after the previous sleep), so the time spent sending does not add up; when running late, the positions
+    already due are dropped and only the latest of them is sent.
+    ### Arguments
+    - times (np.ndarray): offsets from the start in seconds(see tween_path)
+    - points (np.ndarray): (n, 2) positions
+    - move (Callable): move(x, y) sends a single position
+    - clock (Callable): monotonic time source
+    - sleep (Callable): sleep(seconds)
+    ### Returns
+    - int: the number of dropped positions
+    """
+    offsets = times.tolist()
+    count = len(offsets)
+    dropped = 0
+    index = 0
+    start = clock()
+    while index < count:
+        elapsed = clock() - start
+        if offsets[index] > elapsed:
+            sleep(offsets[index] - elapsed)
+            continue
+        due = int(np.searchsorted(times, elapsed, side="right")) - 1  # the latest position already due
+        dropped += due - index
+        x, y = points[due].tolist()
+        move(x, y)
+        index = due + 1
+    return dropped
+
+
+class RecordingBackend:
+    """
+    Records the moves instead of sending them, on a virtual clock: sleep advances the clock and every move
+    costs move_cost seconds. Used to check the timing of a path without a display.
+    """
+
+    def __init__(self, position: Point = (0, 0), move_cost: float = 0.0) -> None:
+        """
+        RecordingBackend initialization
+        ### Arguments
+        - position (tuple): (x, y) of the pointer at the start
+        - move_cost (float): virtual seconds spent by every move
+        ### Returns
+        - None
+        """
+        self.now = 0.0
+        self.position = position
+        self.move_cost = move_cost
+        self.moves: list[tuple[float, int, int]] = []  # (virtual time, x, y)
+        self.sleeps = 0
+
+    def clock(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps += 1
+        # at least one ulp: a gap lost to rounding(now + offset - now < offset) must not stall play_path
+        self.now = max(self.now + max(seconds, 0.0), math.nextafter(self.now, math.inf))
+
+    def move(self, x: int, y: int) -> None:
+        self.moves.append((self.now, x, y))
+        self.position = (x, y)
+        self.now += self.move_cost
+
+    def move_to(self, x: int, y: int, duration: float = 0.0, tween: Callable | str = linear,
+                rate: float = MOVE_RATE) -> int:
+        """
+        Record a tweened move from the current position, return back the number of dropped positions
+        """
+        times, points = tween_path(self.position, (x, y), duration, tween, rate)
+        return play_path(times, points, self.move, self.clock, self.sleep)
+
+    def __repr__(self) -> str:
+        return f"<RecordingBackend moves={len(self.moves)} now={self.now:.3f}>"
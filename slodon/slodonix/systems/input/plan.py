@@ -0,0 +1,314 @@
+# Action plans: a list of steps lowered into a flat array of input primitives
+from __future__ import annotations
+
+import ast
+import time
+from typing import Any, Callable, Iterable, Mapping, NamedTuple
+
+import numpy as np
+
+# This project
+from slodon.slodonix.systems.input.keystrokes import compile_text
+from slodon.slodonix.systems.input.recorder import BUTTON_DOWN, BUTTON_UP, KEY_DOWN, KEY_UP, MOVE, RECORD
+
+__all__ = [
+    "Step", "Program", "click", "move", "type", "key", "hotkey", "wait", "wait_for", "parse_plan", "compile_plan",
+    "BUTTON_NUMBERS",
+]
+
+BUTTON_NUMBERS = {"left": 1, "middle": 2, "right": 3, "primary": 1, "secondary": 3}
+
+
+class Step(NamedTuple):
+    """
+    A single step of a plan, e.g. Step("click", (10, 20), {"button": "right"})
+    """
+
+    op: str
+    args: tuple = ()
+    kwargs: dict = {}
+
+
+# -----------------------------------------------------------------------------------------------------------
+# Steps
+# -----------------------------------------------------------------------------------------------------------
+
+def click(x: int | None = None, y: int | None = None, button: str | int = "left", clicks: int = 1,
+          interval: float = 0.0) -> Step:
+    return Step("click", (x, y), {"button": button, "clicks": clicks, "interval": interval})
+
+
+def move(x: int, y: int) -> Step:
+    return Step("move", (x, y))
+
+
+def type(text: str, interval: float = 0.0) -> Step:  # noqa: A001, the name used in the plans
+    return Step("type", (text,), {"interval": interval})
+
+
+def key(name: str) -> Step:
+    return Step("key", (name,))
+
+
+def hotkey(*names: str) -> Step:
+    return Step("hotkey", names)
+
+
+def wait(seconds: float) -> Step:
+    return Step("wait", (seconds,))
+
+
+def wait_for(window: str, timeout: float = 10.0, exact: bool = False) -> Step:
+    return Step("wait_for", (), {"window": window, "timeout": timeout, "exact": exact})
+
+
+_STEPS: dict[str, Callable[..., Step]] = {
+    function.__name__: function for function in (click, move, type, key, hotkey, wait, wait_for)
+}
+
+
+def parse_plan(source: str) -> list[Step]:
+    """
+    Parse a plan written as calls, one per line or separated by ";":
+
+        click(100, 200)
+        type("hello")
+        hotkey("ctrl", "s")
+        wait_for(window="Save")
+
+    Only the step functions are allowed and every argument must be a literal, nothing is evaluated.
+    ### Arguments
+    - source (str): the plan
+    ### Returns
+    - list[Step]
+    ### Raises
+    - ValueError: not a valid plan
+    """
+    try:
+        tree = ast.parse(source, mode="exec")
+    except SyntaxError as error:
+        raise ValueError(f"invalid plan: {error.msg} (line {error.lineno})") from None
+
+    steps = []
+    for statement in tree.body:
+        call = statement.value if isinstance(statement, ast.Expr) else None
+        if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Name) or call.func.id not in _STEPS:
+            raise ValueError(f"invalid step on line {statement.lineno}: expected one of {', '.join(_STEPS)}")
+        try:
+            args = [ast.literal_eval(arg) for arg in call.args]
+            kwargs = {keyword.arg: ast.literal_eval(keyword.value) for keyword in call.keywords}
+            steps.append(_STEPS[call.func.id](*args, **kwargs))
+        except (ValueError, TypeError) as error:
+            raise ValueError(f"invalid step on line {statement.lineno}: {error}") from None
+    return steps
+
+
+# -----------------------------------------------------------------------------------------------------------
+# Compiler
+# -----------------------------------------------------------------------------------------------------------
+
+class Program:
+    """
+    A compiled plan: arrays of primitives(RECORD, time is the offset from the start of the array) separated by
+    the steps that cannot be sent(wait_for, and a wait with no primitive after it). Every array is sent in one
+    backend write.
+    """
+
+    def __init__(self, segments: list[np.ndarray | Step], steps: int, lowered: int) -> None:
+        self.segments = segments
+        self.steps = steps  # steps of the plan
+        self.lowered = lowered  # primitives before merging
+
+    @property
+    def primitives(self) -> int:
+        return sum(len(segment) for segment in self.segments if isinstance(segment, np.ndarray))
+
+    def run(
+        self,
+        send: Callable[[np.ndarray], None],
+        wait_for: Callable[..., Any] | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> int:
+        """
+        Execute the program
+        ### Arguments
+        - send (Callable): send(records) issues an array of primitives at once, waiting the time gaps
+        - wait_for (Callable): wait_for(window=..., timeout=..., exact=...), needed by the wait_for steps
+        - sleep (Callable): sleep(seconds)
+        ### Returns
+        - int: the number of backend writes
+        """
+        writes = 0
+        for segment in self.segments:
+            if isinstance(segment, Step) and segment.op == "wait":
+                sleep(segment.args[0])
+            elif isinstance(segment, Step):
+                if wait_for is None:
+                    raise ValueError("the plan waits for a window, the backend cannot")
+                wait_for(**segment.kwargs)
+            else:
+                send(segment)
+                writes += 1
+        return writes
+
+    def __repr__(self) -> str:
+        return f"<Program steps={self.steps} primitives={self.primitives}/{self.lowered} segments={len(self.segments)}>"
+
+
+def _button(button) -> int:
+    if isinstance(button, int):
+        return button
+    try:
+        return BUTTON_NUMBERS[button]
+    except KeyError:
+        raise ValueError(f"unknown button {button!r}") from None
+
+
+class _Lowering:
+    """
+    Lowers the steps into (op, detail, x, y, delay) primitives and merges them while appending(peephole)
+    """
+
+    def __init__(self, keys, modifier_code, key_code) -> None:
+        self.keys = keys
+        self.modifier_code = modifier_code
+        self.key_code = key_code
+        self.modifiers = {code for code in map(modifier_code, (1 << bit for bit in range(8))) if code is not None}
+        self.out: list[list] = []
+        self.delay = 0.0  # waited before the next primitive
+        self.lowered = 0
+        self._chord_release = False  # the last primitive releases a modifier held for another key
+
+    def emit(self, op: int, detail: int = 0, x: int = 0, y: int = 0, chord: bool = False) -> None:
+        """
+        Append a primitive, chord marks the modifiers held for another key(e.g. the ctrl of ctrl+s, not a
+        key("ctrl") tap): a chord modifier released and pressed again right away is kept pressed
+        """
+        self.lowered += 1
+        delay, self.delay = self.delay, 0.0
+        out = self.out
+        if out and not delay:
+            last = out[-1]
+            if op == MOVE and last[0] == MOVE:
+                last[2:4] = x, y  # only the last of consecutive moves is visible
+                return
+            if op == KEY_DOWN and chord and self._chord_release and last[1] == detail and not last[4]:
+                out.pop()
+                self._chord_release = False
+                return
+        out.append([op, detail, x, y, delay])
+        self._chord_release = chord and op == KEY_UP
+
+    def keystroke(self, name: str) -> None:
+        entry = self.key_code(name)
+        if entry is None:
+            raise ValueError(f"no key produces {name!r}")
+        code, mask = entry
+        modifiers = [self._modifier(1 << bit) for bit in range(8) if mask >> bit & 1]
+        for modifier in modifiers:
+            self.emit(KEY_DOWN, modifier, chord=True)
+        self.emit(KEY_DOWN, code)
+        self.emit(KEY_UP, code)
+        for modifier in reversed(modifiers):
+            self.emit(KEY_UP, modifier, chord=True)
+
+    def _modifier(self, bit: int) -> int:
+        code = self.modifier_code(bit)
+        if code is None:
+            raise ValueError(f"no key generates the modifier {bit:#x}")
+        return code
+
+    def step(self, step: Step) -> None:
+        op, args, kwargs = step
+        if op == "move":
+            self.emit(MOVE, 0, *args)
+        elif op == "click":
+            x, y = args
+            if x is not None and y is not None:
+                self.emit(MOVE, 0, x, y)
+            button = _button(kwargs.get("button", "left"))
+            for index in range(kwargs.get("clicks", 1)):
+                if index:
+                    self.delay += kwargs.get("interval", 0.0)
+                self.emit(BUTTON_DOWN, button)
+                self.emit(BUTTON_UP, button)
+        elif op == "type":
+            interval = kwargs.get("interval", 0.0)
+            modifiers = self.modifiers
+            for index, (code, press, first) in enumerate(compile_text(args[0], self.keys, self.modifier_code)):
+                if first and index:
+                    self.delay += interval
+                self.emit(KEY_DOWN if press else KEY_UP, code, chord=code in modifiers)  # no text types a modifier
+        elif op == "key":
+            self.keystroke(args[0])
+        elif op == "hotkey":
+            codes = []
+            for name in args:
+                entry = self.key_code(name)
+                if entry is None:
+                    raise ValueError(f"no key produces {name!r}")
+                codes.append(entry[0])
+            last = len(codes) - 1  # the keys before the last one are held for it
+            for index, code in enumerate(codes):
+                self.emit(KEY_DOWN, code, chord=index < last)
+            for index in range(last, -1, -1):
+                self.emit(KEY_UP, codes[index], chord=index < last)
+        elif op == "wait":
+            self.delay += args[0]
+        else:
+            raise ValueError(f"unknown step {op!r}")
+
+    def cut(self, segments: list) -> None:
+        """
+        Move the primitives lowered so far to segments as a RECORD array, followed by the pending wait
+        """
+        if self.out:
+            segments.append(self._records())
+        if self.delay:
+            segments.append(wait(self.delay))
+            self.delay = 0.0
+
+    def _records(self) -> np.ndarray:
+        rows = np.array(self.out, dtype=np.float64)
+        self.out = []
+        records = np.zeros(len(rows), dtype=RECORD)
+        records["time"] = np.cumsum(rows[:, 4])
+        records["op"] = rows[:, 0]
+        records["detail"] = rows[:, 1]
+        records["x"] = rows[:, 2]
+        records["y"] = rows[:, 3]
+        return records
+
+
+def compile_plan(
+    plan: Iterable[Step] | str,
+    keys: Mapping[str, tuple[int, int]],
+    modifier_code: Callable[[int], int | None],
+    key_code: Callable[[str], tuple[int, int] | None],
+) -> Program:
+    """
+    Lower a plan into arrays of primitives: consecutive moves are merged into the last one and a modifier
+    released then pressed again for another key is kept pressed(e.g. between two hotkeys sharing ctrl, but
+    not between two taps of key("ctrl")), the waits become the time gaps of the next primitive
+    ### Arguments
+    - plan (Iterable[Step] | str): the steps, or their source(see parse_plan)
+    - keys (Mapping): character -> (key code, modifier mask), e.g. KeyboardMapping.chars
+    - modifier_code (Callable): single bit modifier mask -> key code of the modifier
+    - key_code (Callable): key name -> (key code, modifier mask), e.g. KeyboardMapping.key
+    ### Returns
+    - Program
+    """
+    if isinstance(plan, str):
+        plan = parse_plan(plan)
+    lowering = _Lowering(keys, modifier_code, key_code)
+    segments: list[np.ndarray | Step] = []
+    steps = 0
+    for step in plan:
+        steps += 1
+        if step.op == "wait_for":
+            lowering.cut(segments)
+            segments.append(step)
+        else:
+            lowering.step(step)
+    lowering.cut(segments)
+    return Program(segments, steps, lowering.lowered)
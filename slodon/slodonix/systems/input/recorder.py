@@ -0,0 +1,230 @@
+# Input macro log: fixed-width records appended to a binary file, replayed through a memory map
+from __future__ import annotations
+
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Callable, Iterable
+
+import numpy as np
+
+__all__ = [
+    "Recorder", "Replayer", "RECORD", "KEY_DOWN", "KEY_UP", "BUTTON_DOWN", "BUTTON_UP", "MOVE",
+]
+
+# op of a record: the type of XTestFakeInput(the core event codes), used by every backend
+KEY_DOWN = 2
+KEY_UP = 3
+BUTTON_DOWN = 4
+BUTTON_UP = 5
+MOVE = 6
+
+# time: seconds from the start of the log, detail: key code or button, x/y: position of MOVE
+RECORD = np.dtype(
+    {
+        "names": ["time", "op", "detail", "x", "y"],
+        "formats": ["<f8", "u1", "u1", "<i4", "<i4"],
+        "offsets": [0, 8, 9, 12, 16],
+        "itemsize": 20,
+    }
+)
+
+_MAGIC = b"SLDNREC\0"
+_VERSION = 1
+_HEADER = struct.Struct("<8sII")  # magic, version, record size
+
+
+def _check_header(data: bytes, path) -> None:
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path}: not an input log")
+    magic, version, size = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION or size != RECORD.itemsize:
+        raise ValueError(f"{path}: not an input log of version {_VERSION}")
+
+
+class Recorder:
+    """
+    Appends input actions to a log file. The records are collected in a preallocated array and written in
+    blocks, the file is only ever appended to: a new session continues the times of the previous one.
+    """
+
+    def __init__(
+        self, path: str | os.PathLike, block: int = 4096, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Recorder initialization
+        ### Arguments
+        - path (str | PathLike): the log file, created if needed
+        - block (int): records written at once
+        - clock (Callable): monotonic time source
+        ### Returns
+        - None
+        """
+        self.path = path
+        self._file = open(path, "a+b")
+        self._file.seek(0)
+        header = self._file.read(_HEADER.size)
+        offset = 0.0
+        if header:
+            _check_header(header, path)
+            self._file.seek(0, os.SEEK_END)
+            size = self._file.tell()
+            if size >= _HEADER.size + RECORD.itemsize:
+                self._file.seek(size - RECORD.itemsize)
+                offset = float(np.frombuffer(self._file.read(RECORD.itemsize), RECORD)["time"][0])
+        else:
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION, RECORD.itemsize))
+
+        self._clock = clock
+        self._start = clock() - offset
+        self._block = np.zeros(block, dtype=RECORD)
+        self._used = 0
+        self.count = 0  # records appended by this recorder
+
+    def elapsed(self) -> float:
+        """
+        Time of a record made now
+        """
+        return self._clock() - self._start
+
+    def append(self, op: int, detail: int = 0, x: int = 0, y: int = 0, at: float | None = None) -> None:
+        """
+        Append a single action
+        ### Arguments
+        - op (int): KEY_DOWN, KEY_UP, BUTTON_DOWN, BUTTON_UP or MOVE
+        - detail (int): the key code or the button
+        - x, y (int): the position of a MOVE
+        - at (float): time of the action(see elapsed), now by default
+        ### Returns
+        - None
+        """
+        if self._used == len(self._block):
+            self.flush()
+        self._block[self._used] = (self.elapsed() if at is None else at, op, detail, x, y)
+        self._used += 1
+        self.count += 1
+
+    def extend(self, actions: Iterable[tuple[int, int, int, int, float]]) -> None:
+        """
+        Append many (op, detail, x, y, delay) actions, delay is the time(seconds) after the previous one
+        """
+        at = self.elapsed()
+        for op, detail, x, y, delay in actions:
+            at += delay
+            self.append(op, detail, x, y, at)
+
+    def flush(self) -> None:
+        """
+        Write the collected records to the file
+        """
+        if self._used:
+            self._file.write(self._block[:self._used].tobytes())
+            self._used = 0
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> Recorder:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<Recorder {self.path} records={self.count}>"
+
+
+class Replayer:
+    """
+    Re-issues the actions of a log file. The file is memory-mapped and viewed as a structured array, nothing
+    is parsed or copied before the replay.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        """
+        Replayer initialization
+        ### Arguments
+        - path (str | PathLike): the log file
+        ### Returns
+        - None
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        if self._map is None:
+            raise ValueError(f"{path}: not an input log")
+        _check_header(self._map[:_HEADER.size], path)
+        count = (size - _HEADER.size) // RECORD.itemsize  # a torn last record is ignored
+        self.records = np.frombuffer(self._map, dtype=RECORD, count=count, offset=_HEADER.size)
+
+    def replay(
+        self,
+        send: Callable[[np.ndarray], None],
+        speed: float | None = 1.0,
+        batch: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> int:
+        """
+        Issue every action at its time divided by speed. The actions already due are sent together, every
+        action is sent even when running late(no key may be lost). The time inside a sent slice is up to send:
+        with a send waiting the gaps itself(Display.send_records(timed=True, speed=N)), replay with speed=None.
+        ### Arguments
+        - send (Callable): send(records) issues a slice of records at once, e.g. Display.send_records
+        - speed (float): 1.0 for real time, N for N times faster, None(or inf) as fast as possible
+        - batch (int): most records sent at once
+        - clock (Callable): monotonic time source
+        - sleep (Callable): sleep(seconds)
+        ### Returns
+        - int: the number of sends
+        """
+        records = self.records
+        count = len(records)
+        if not count:
+            return 0
+        fast = speed is None or math.isinf(speed)
+        if not fast:
+            if speed <= 0:
+                raise ValueError("speed must be positive")
+            due = (records["time"] - records["time"][0]) / speed
+            offsets = due.tolist()
+
+        sends = 0
+        index = 0
+        start = clock()
+        while index < count:
+            end = min(index + batch, count)
+            if not fast:
+                elapsed = clock() - start
+                if offsets[index] > elapsed:
+                    sleep(offsets[index] - elapsed)
+                    continue
+                end = min(int(np.searchsorted(due, elapsed, side="right")), end)
+            send(records[index:end])
+            sends += 1
+            index = end
+        return sends
+
+    def close(self) -> None:
+        self.records = np.zeros(0, dtype=RECORD)  # release the view before the map
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __enter__(self) -> Replayer:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<Replayer {self.path} records={len(self.records)}>"
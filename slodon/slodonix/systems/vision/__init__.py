@@ -0,0 +1,2 @@
+from slodon.slodonix.systems.vision.locate import *
+from slodon.slodonix.systems.vision.cache import *
@@ -0,0 +1,184 @@
+# Memoization of region analysis by visual content
+# https://www.hackerfactor.com/blog/index.php?/archives/529-Kind-of-Like-That.html (difference hash)
+from __future__ import annotations
+
+import collections
+import hashlib
+import sys
+from typing import Any, Callable, Hashable
+
+import numpy as np
+
+# This project
+from slodon.slodonix.systems.vision.locate import Match, Rect, _gray, locate_all
+
+__all__ = ["RegionCache", "perceptual_hash"]
+
+
+def perceptual_hash(pixels: np.ndarray, hash_size: int = 16) -> int:
+    """
+    Difference hash of an image: the grayscale is averaged into hash_size x (hash_size + 1) blocks and every bit
+    tells whether a block is brighter than its right neighbour. Visually identical regions(same content,
+    different capture) give the same hash, a few changed pixels usually do not change it.
+    ### Arguments
+    - pixels (np.ndarray): (h, w), (h, w, 3) or (h, w, 4)
+    - hash_size (int): the rows of blocks, the hash has hash_size ** 2 bits
+    ### Returns
+    - int
+    """
+    gray = _gray(pixels)
+    height, width = gray.shape
+    if height < hash_size or width < hash_size + 1:  # too small to be averaged, hash the bytes
+        return int.from_bytes(_digest(pixels), "little")
+
+    rows = (np.arange(hash_size) * height) // hash_size
+    columns = (np.arange(hash_size + 1) * width) // (hash_size + 1)
+    blocks = np.add.reduceat(np.add.reduceat(gray, rows, axis=0, dtype=np.float64), columns, axis=1)
+    blocks /= np.outer(np.diff(rows, append=height), np.diff(columns, append=width))
+    bits = np.packbits(blocks[:, 1:] > blocks[:, :-1])
+    return int.from_bytes(bits.tobytes(), "little")
+
+
+def _digest(pixels: np.ndarray) -> bytes:
+    """
+    Exact digest of the pixels(and of their shape, so a reshaped image is another one)
+    """
+    pixels = np.ascontiguousarray(pixels)
+    digest = hashlib.blake2b(str(pixels.shape).encode(), digest_size=16)
+    digest.update(memoryview(pixels).cast("B"))  # no copy of the bytes
+    return digest.digest()
+
+
+def _sizeof(value: Any) -> int:
+    """
+    Approximate memory used by a cached value
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(_sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(key) + _sizeof(item) for key, item in value.items())
+    return sys.getsizeof(value)
+
+
+class RegionCache:
+    """
+    LRU cache of analysis results(template matches, detected elements, ...) keyed by
+    (analysis name, region, perceptual hash of the region pixels), bounded by a byte budget.
+
+    When a region did not change visually, the cached result is returned back without running the analysis
+    again, whatever time has passed. The perceptual hash does not see small moves of the content, so results
+    holding positions(e.g. match boxes) are keyed by an exact digest of the pixels instead(exact=True).
+    """
+
+    def __init__(self, max_bytes: int = 64 << 20, hash_size: int = 16) -> None:
+        """
+        RegionCache initialization
+        ### Arguments
+        - max_bytes (int): the budget of the cached values, the least recently used ones are evicted above it
+        - hash_size (int): see perceptual_hash
+        ### Returns
+        - None
+        """
+        self.max_bytes = max_bytes
+        self.hash_size = hash_size
+        self._entries: collections.OrderedDict[tuple, tuple[Any, int]] = collections.OrderedDict()
+        self.bytes = 0
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, name: Hashable, region: Rect | None, pixels: np.ndarray, exact: bool = False) -> tuple:
+        return name, region, _digest(pixels) if exact else perceptual_hash(pixels, self.hash_size)
+
+    def get(self, key: tuple, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: tuple, value: Any, size: int | None = None) -> None:
+        """
+        Store a value, values larger than the whole budget are not cached
+        """
+        size = _sizeof(value) if size is None else size
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def memoize(self, name: Hashable, region: Rect | None, pixels: np.ndarray, compute: Callable[[np.ndarray], Any],
+                size: int | None = None, exact: bool = False) -> Any:
+        """
+        Return back compute(pixels), from the cache if the region looked the same before
+        ### Arguments
+        - name (Hashable): identifies the analysis(and its parameters)
+        - region (tuple): (x, y, width, height) of the pixels on the screen, None if not relevant
+        - pixels (np.ndarray): the captured region
+        - compute (Callable): the analysis
+        - size (int): the memory used by the result, estimated if None
+        - exact (bool): reuse the result only for the very same pixels, for results depending on the position of
+        the content
+        ### Returns
+        - the result of compute
+        """
+        key = self.key(name, region, pixels, exact)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+        self.misses += 1
+        value = compute(pixels)
+        self.put(key, value, size)
+        return value
+
+    def locate_all(self, template: np.ndarray, image: np.ndarray, region: Rect | None = None,
+                   threshold: float = 0.9, limit: int | None = None) -> list[Match]:
+        """
+        locate.locate_all of a template in a region of an image, memoized by the exact pixels of the region(a
+        template moved by a few pixels keeps the perceptual hash but not the match boxes)
+        """
+        if region is not None:
+            x, y, width, height = region
+            pixels = image[y:y + height, x:x + width]
+        else:
+            x = y = 0
+            pixels = image
+        name = ("locate_all", _digest(template), threshold, limit)
+        matches = self.memoize(
+            name, region, pixels, lambda pixels: locate_all(template, pixels, threshold, limit), exact=True,
+        )
+        return [match._replace(left=match.left + x, top=match.top + y) for match in matches]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __repr__(self) -> str:
+        return f"<RegionCache {self.stats()}>"
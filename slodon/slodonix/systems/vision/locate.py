@@ -0,0 +1,297 @@
+# Template matching: find an image(e.g. a button) on a captured frame
+# https://docs.opencv.org/4.x/df/dfb/group__imgproc__object.html (TM_CCOEFF_NORMED)
+# J. P. Lewis, Fast Normalized Cross-Correlation(1995): integral images for the normalization
+from __future__ import annotations
+
+from typing import Iterable, NamedTuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+__all__ = ["Match", "locate", "locate_all", "match_template"]
+
+Rect = tuple[int, int, int, int]  # x, y, width, height
+
+_DIRECT_LIMIT = 1 << 22  # output pixels * template pixels below which the correlation is computed directly
+_MIN_TEMPLATE = 8  # the pyramid stops before the template gets smaller than this(pixels)
+_MAX_LEVELS = 4
+_COARSE_SLACK = 0.25  # score margin of the candidates at the coarsest level
+_MAX_CANDIDATES = 16  # coarse candidates refined for a single match, up to 4 times more for locate_all
+_REFINE_RADIUS = 2  # pixels searched around a candidate at each finer level
+
+
+class Match(NamedTuple):
+    """
+    A match box in the coordinates of the searched image
+    """
+
+    left: int
+    top: int
+    width: int
+    height: int
+    score: float  # normalized cross-correlation, 1.0 is a perfect match
+
+    @property
+    def center(self) -> tuple[int, int]:
+        return self.left + self.width // 2, self.top + self.height // 2
+
+
+def _gray(image: np.ndarray) -> np.ndarray:
+    """
+    Grayscale of a (h, w), (h, w, 3) or (h, w, 4) image: the sum of the color channels(the scale does not
+    matter to the normalized correlation), so that BGRX captures and RGB templates give the same values
+    """
+    image = np.asarray(image)
+    if image.ndim == 2:
+        return image
+    if image.dtype != np.uint8:
+        return image[..., :3].sum(axis=2, dtype=np.float64)
+    gray = np.add(image[..., 0], image[..., 1], dtype=np.uint16)  # integer adds: far faster than mean()
+    gray += image[..., 2]
+    return gray
+
+
+def _downsample(image: np.ndarray) -> np.ndarray:
+    """
+    Half size image, blurred before the decimation: every pixel is the [1, 2, 1] x [1, 2, 1] weighted sum of
+    the 3 x 3 pixels around an odd pixel. Without the blur, a template at an odd offset is sampled out of phase
+    with the image and its coarse score collapses on detailed content.
+    """
+    if image.dtype.kind == "f":
+        dtype = np.float64
+    elif image.dtype.itemsize == 1 or (image.dtype == np.uint16 and int(image.max()) < 1 << 12):
+        dtype = np.uint16  # 16 times the largest value fits: half the memory traffic of uint32
+    else:
+        dtype = np.uint32
+    rows = np.add(image[:-2:2], image[2::2], dtype=dtype)
+    middle = image[1:-1:2]
+    rows += middle
+    rows += middle
+    total = rows[:, :-2:2] + rows[:, 2::2]
+    middle = rows[:, 1:-1:2]
+    total += middle
+    total += middle
+    return total
+
+
+def _window_sums(image: np.ndarray, height: int, width: int) -> np.ndarray:
+    """
+    Sum of every height x width window(valid positions) with an integral image
+    """
+    integral = np.zeros((image.shape[0] + 1, image.shape[1] + 1), dtype=np.float64)
+    np.cumsum(image, axis=0, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    return integral[height:, width:] - integral[:-height, width:] - integral[height:, :-width] + integral[:-height, :-width]
+
+
+def _fast_length(length: int) -> int:
+    """
+    Smallest 2^a 3^b 5^c not below length: the FFT of a prime size(e.g. the 269 rows of a 1080p frame at the
+    coarse level) is several times slower
+    """
+    best = 1 << (length - 1).bit_length()
+    fives = 1
+    while fives < best:
+        threes = fives
+        while threes < best:
+            size = threes
+            while size < length:
+                size *= 2
+            best = min(best, size)
+            threes *= 3
+        fives *= 5
+    return best
+
+
+def _correlate(image: np.ndarray, template: np.ndarray) -> np.ndarray:
+    """
+    sum(image window * template) for every valid position, directly for small problems and with the FFT for
+    large ones
+    """
+    height, width = template.shape
+    out_shape = (image.shape[0] - height + 1, image.shape[1] - width + 1)
+    if out_shape[0] * out_shape[1] * template.size <= _DIRECT_LIMIT:
+        return np.einsum("ijkl,kl->ij", sliding_window_view(image, template.shape), template)
+
+    # circular cross-correlation, the valid positions never wrap around(nor with a padded, faster, shape)
+    shape = (_fast_length(image.shape[0]), _fast_length(image.shape[1]))
+    spectrum = np.fft.rfft2(image, shape) * np.conj(np.fft.rfft2(template, shape))
+    return np.fft.irfft2(spectrum, shape)[:out_shape[0], :out_shape[1]]
+
+
+def _ncc(image: np.ndarray, template: np.ndarray) -> np.ndarray:
+    height, width = template.shape
+    image = image.astype(np.float64, copy=False)
+    template = template - template.mean()
+    template_norm = float(np.dot(template.ravel(), template.ravel()))
+    if template_norm <= 1e-12:
+        raise ValueError("the template is flat, normalized cross-correlation is undefined")
+
+    count = template.size
+    sums = _window_sums(image, height, width)
+    variance = _window_sums(image * image, height, width) - sums * sums / count
+    denominator = np.sqrt(np.maximum(variance, 0.0) * template_norm)
+    numerator = _correlate(image, template)  # sum((I - mean(I)) * T') == sum(I * T') as sum(T') == 0
+    scores = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=scores, where=denominator > 1e-6 * template_norm)
+    return scores
+
+
+def match_template(image: np.ndarray, template: np.ndarray) -> np.ndarray:
+    """
+    Normalized cross-correlation(zero mean) of the template at every position where it fits in the image
+    ### Arguments
+    - image (np.ndarray): (h, w), (h, w, 3) or (h, w, 4)
+    - template (np.ndarray): same formats, not larger than the image
+    ### Returns
+    - np.ndarray: (h - template h + 1, w - template w + 1) scores in [-1, 1]
+    """
+    image, template = _gray(image), _gray(template)
+    if template.shape[0] > image.shape[0] or template.shape[1] > image.shape[1]:
+        raise ValueError(f"template {template.shape} is larger than the image {image.shape}")
+    return _ncc(image, template)
+
+
+def _peaks(scores: np.ndarray, threshold: float, height: int, width: int, limit: int) -> list[tuple[int, int]]:
+    """
+    Best positions above threshold, greedy non-maximum suppression over template sized neighbourhoods
+    """
+    candidates = np.flatnonzero(scores >= threshold)
+    if not candidates.size:
+        return []
+    candidates = candidates[np.argsort(scores.ravel()[candidates], kind="stable")[::-1]]
+
+    kept: list[tuple[int, int]] = []
+    for index in candidates.tolist():
+        y, x = divmod(index, scores.shape[1])
+        if all(abs(y - top) >= height or abs(x - left) >= width for top, left in kept):
+            kept.append((y, x))
+            if len(kept) >= limit:
+                break
+    return kept
+
+
+def _search(image: np.ndarray, template: np.ndarray, threshold: float, limit: int, pyramid: bool) -> list[Match]:
+    height, width = template.shape
+    images, templates = [image], [template]
+    while (
+        pyramid
+        and len(images) < _MAX_LEVELS
+        and (min(templates[-1].shape) - 1) // 2 >= _MIN_TEMPLATE
+        and (min(images[-1].shape) - 1) // 2 >= 2 * _MIN_TEMPLATE
+    ):
+        images.append(_downsample(images[-1]))
+        templates.append(_downsample(templates[-1]))
+
+    level = len(images) - 1
+    if level and not np.ptp(templates[level]):  # the detail of the template is lost at the coarse level
+        return _search(image, template, threshold, limit, False)
+    coarse = _ncc(images[level], templates[level])
+    if level == 0:
+        return [
+            Match(x, y, width, height, float(coarse[y, x]))
+            for y, x in _peaks(coarse, threshold, height, width, limit)
+        ]
+
+    # coarse to fine: only a few pixels around every coarse candidate are searched at the finer levels
+    matches = []
+    small_height, small_width = templates[level].shape
+    candidates = max(_MAX_CANDIDATES, min(limit, 4 * _MAX_CANDIDATES))  # every refinement costs a few _ncc calls
+    for y, x in _peaks(coarse, threshold - _COARSE_SLACK, small_height, small_width, candidates):
+        for finer in range(level - 1, -1, -1):
+            y, x, score = _refine(images[finer], templates[finer], 2 * y, 2 * x)
+        if score >= threshold:
+            matches.append(Match(x, y, width, height, score))
+    if not matches:  # the coarse scores of detailed templates can still fall below the slack
+        return _search(image, template, threshold, limit, False)
+
+    matches.sort(key=lambda match: match.score, reverse=True)
+    return _suppress(matches, limit)
+
+
+def _refine(image: np.ndarray, template: np.ndarray, y: int, x: int) -> tuple[int, int, float]:
+    """
+    Best (y, x, score) within _REFINE_RADIUS of a position, the window is clamped to the valid positions so
+    the candidates near the borders are kept
+    """
+    last_y, last_x = image.shape[0] - template.shape[0], image.shape[1] - template.shape[1]
+    top = min(max(y - _REFINE_RADIUS, 0), last_y)
+    left = min(max(x - _REFINE_RADIUS, 0), last_x)
+    bottom = max(min(y + _REFINE_RADIUS, last_y), top) + template.shape[0]
+    right = max(min(x + _REFINE_RADIUS, last_x), left) + template.shape[1]
+    scores = _ncc(image[top:bottom, left:right], template)
+    dy, dx = np.unravel_index(int(np.argmax(scores)), scores.shape)
+    return top + int(dy), left + int(dx), float(scores[dy, dx])
+
+
+def _suppress(matches: list[Match], limit: int) -> list[Match]:
+    kept: list[Match] = []
+    for match in matches:
+        if all(
+            abs(match.top - other.top) >= match.height or abs(match.left - other.left) >= match.width
+            for other in kept
+        ):
+            kept.append(match)
+            if len(kept) >= limit:
+                break
+    return kept
+
+
+def locate_all(
+    template: np.ndarray,
+    image: np.ndarray,
+    threshold: float = 0.9,
+    limit: int | None = None,
+    regions: Iterable[Rect] | None = None,
+    pyramid: bool = True,
+) -> list[Match]:
+    """
+    Find every occurrence of a template in an image(e.g. a frame of Display.capture)
+    ### Arguments
+    - template (np.ndarray): the searched image, (h, w), (h, w, 3) or (h, w, 4)
+    - image (np.ndarray): the image searched in
+    - threshold (float): the lowest normalized cross-correlation accepted
+    - limit (int): the most matches returned back
+    - regions (Iterable): only search matches overlapping these (x, y, width, height) rects, e.g. the dirty
+    tiles of changes.TileDiff
+    - pyramid (bool): coarse to fine search, much faster on large images(a full search is made when it finds
+    nothing), may miss some of several low contrast matches
+    ### Returns
+    - list[Match]: best score first, the matches do not overlap each other
+    """
+    image, template = _gray(image), _gray(template)
+    height, width = template.shape
+    if height > image.shape[0] or width > image.shape[1]:
+        raise ValueError(f"template {template.shape} is larger than the image {image.shape}")
+    limit = limit if limit is not None else image.size
+
+    if regions is None:
+        return _search(image, template, threshold, limit, pyramid)
+
+    matches = []
+    for x, y, region_width, region_height in regions:
+        # a match overlapping the region may start up to a template size before it
+        left, top = max(x - width + 1, 0), max(y - height + 1, 0)
+        right = min(x + region_width + width - 1, image.shape[1])
+        bottom = min(y + region_height + height - 1, image.shape[0])
+        if right - left < width or bottom - top < height:
+            continue
+        for match in _search(image[top:bottom, left:right], template, threshold, limit, pyramid):
+            matches.append(match._replace(left=match.left + left, top=match.top + top))
+    matches.sort(key=lambda match: match.score, reverse=True)
+    return _suppress(matches, limit)
+
+
+def locate(
+    template: np.ndarray,
+    image: np.ndarray,
+    threshold: float = 0.9,
+    regions: Iterable[Rect] | None = None,
+    pyramid: bool = True,
+) -> Match | None:
+    """
+    Find the best occurrence of a template in an image, None if no score reaches threshold
+    (see locate_all)
+    """
+    matches = locate_all(template, image, threshold, 1, regions, pyramid)
+    return matches[0] if matches else None
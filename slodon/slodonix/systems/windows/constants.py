@@ -3,6 +3,7 @@
 __all__ = [
     "KEYEVENTF_KEYDOWN",
     "KEYEVENTF_KEYUP",
+    "INPUT_KEYBOARD",
     "LEFT",
     "RIGHT",
     "MIDDLE",
@@ -22,6 +23,9 @@ __all__ = [
 KEYEVENTF_KEYDOWN = 0x0000
 KEYEVENTF_KEYUP = 0x0002
 
+# type of the INPUT structure passed to SendInput()
+INPUT_KEYBOARD = 1
+
 # Constants for the mouse button names:
 LEFT = "left"
 MIDDLE = "middle"
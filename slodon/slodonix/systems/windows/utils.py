@@ -1,5 +1,7 @@
 from dataclasses import dataclass
 import ctypes
+
+import numpy as np
 from slodon.slodonix.systems.windows.constants import *
 __all__ = ["Position", "is_shift_character", "send_mouse_event", "linear"]
 
@@ -16,12 +18,15 @@ class Position:
         return str(self)
 
 
+# NOTE TODO - This will be different for non-qwerty keyboards.
+_SHIFT_CHARACTERS = frozenset('~!@#$%^&*()_+{}|:"<>?')
+
+
 def is_shift_character(character: str) -> bool:
     """
     source: https://github.com/asweigart/pyautogui/blob/master/pyautogui/__init__.py#L526-L532
     """
-    # NOTE TODO - This will be different for non-qwerty keyboards.
-    return character.isupper() or character in set('~!@#$%^&*()_+{}|:"<>?')
+    return character.isupper() or character in _SHIFT_CHARACTERS
 
 
 def send_mouse_event(ev, x, y, dw_data=0, instance=None):
@@ -76,9 +81,10 @@ def linear(n):
       linear tween for mouse moving functions.
 
       This function was copied from PyTweening module, so that it can be called even if PyTweening is not installed.
+      ``n`` may also be a NumPy array of progress values, the motion engine eases a whole path at once.
       """
 
-    if not 0.0 <= n <= 1.0:
+    if np.min(n) < 0.0 or np.max(n) > 1.0:
         raise Exception("Argument must be between 0.0 and 1.0.")
     return n
 
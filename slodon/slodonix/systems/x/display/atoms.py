@@ -0,0 +1,167 @@
+# https://tronche.com/gui/x/xlib/window-information/properties-and-atoms.html
+# https://specifications.freedesktop.org/wm-spec/latest/
+from typing import Iterable
+
+# This project
+from slodon.slodonix.systems.x.protocol import bds
+
+__all__ = ["AtomTable", "PREDEFINED_ATOMS", "DEFAULT_ATOMS"]
+
+# Atoms 1..68 are predefined by the protocol, they never need a round trip
+PREDEFINED_ATOMS: tuple[str, ...] = (
+    "PRIMARY", "SECONDARY", "ARC", "ATOM", "BITMAP", "CARDINAL", "COLORMAP", "CURSOR", "CUT_BUFFER0",
+    "CUT_BUFFER1", "CUT_BUFFER2", "CUT_BUFFER3", "CUT_BUFFER4", "CUT_BUFFER5", "CUT_BUFFER6", "CUT_BUFFER7",
+    "DRAWABLE", "FONT", "INTEGER", "PIXMAP", "POINT", "RECTANGLE", "RESOURCE_MANAGER", "RGB_COLOR_MAP",
+    "RGB_BEST_MAP", "RGB_BLUE_MAP", "RGB_DEFAULT_MAP", "RGB_GRAY_MAP", "RGB_GREEN_MAP", "RGB_RED_MAP",
+    "STRING", "VISUALID", "WINDOW", "WM_COMMAND", "WM_HINTS", "WM_CLIENT_MACHINE", "WM_ICON_NAME",
+    "WM_ICON_SIZE", "WM_NAME", "WM_NORMAL_HINTS", "WM_SIZE_HINTS", "WM_ZOOM_HINTS", "MIN_SPACE",
+    "NORM_SPACE", "MAX_SPACE", "END_SPACE", "SUPERSCRIPT_X", "SUPERSCRIPT_Y", "SUBSCRIPT_X", "SUBSCRIPT_Y",
+    "UNDERLINE_POSITION", "UNDERLINE_THICKNESS", "STRIKEOUT_ASCENT", "STRIKEOUT_DESCENT", "ITALIC_ANGLE",
+    "X_HEIGHT", "QUAD_WIDTH", "WEIGHT", "POINT_SIZE", "RESOLUTION", "COPYRIGHT", "NOTICE", "FONT_NAME",
+    "FAMILY_NAME", "FULL_NAME", "CAP_HEIGHT", "WM_CLASS", "WM_TRANSIENT_FOR",
+)
+
+# Interned in one flush when a display is opened: the atoms used by window inspection
+DEFAULT_ATOMS: tuple[str, ...] = (
+    "UTF8_STRING", "TARGETS", "CLIPBOARD", "INCR", "TEXT",
+    "WM_PROTOCOLS", "WM_DELETE_WINDOW", "WM_STATE", "WM_WINDOW_ROLE", "WM_CLIENT_LEADER",
+    "_NET_SUPPORTED", "_NET_CLIENT_LIST", "_NET_CLIENT_LIST_STACKING", "_NET_ACTIVE_WINDOW",
+    "_NET_CURRENT_DESKTOP", "_NET_NUMBER_OF_DESKTOPS", "_NET_DESKTOP_NAMES", "_NET_WORKAREA",
+    "_NET_SUPPORTING_WM_CHECK", "_NET_WM_NAME", "_NET_WM_VISIBLE_NAME", "_NET_WM_ICON_NAME",
+    "_NET_WM_DESKTOP", "_NET_WM_PID", "_NET_WM_STATE", "_NET_WM_STATE_HIDDEN", "_NET_WM_STATE_FOCUSED",
+    "_NET_WM_STATE_MAXIMIZED_VERT", "_NET_WM_STATE_MAXIMIZED_HORZ", "_NET_WM_STATE_FULLSCREEN",
+    "_NET_WM_STATE_ABOVE", "_NET_WM_STATE_MODAL", "_NET_WM_WINDOW_TYPE", "_NET_WM_WINDOW_TYPE_NORMAL",
+    "_NET_WM_WINDOW_TYPE_DIALOG", "_NET_WM_WINDOW_TYPE_DOCK", "_NET_WM_WINDOW_TYPE_DESKTOP",
+    "_NET_FRAME_EXTENTS", "_NET_WM_USER_TIME",
+)
+
+
+class AtomTable:
+    """
+    Caches the InternAtom and GetAtomName results of a connection in both directions.
+
+    Atoms never change during the lifetime of the server, so the entries are never invalidated.
+    """
+
+    def __init__(self, connection) -> None:
+        """
+        AtomTable initialization
+        ### Arguments
+        - connection (BaseConnection): the connection used for the round trips
+        ### Returns
+        - None
+        """
+        self.connection = connection
+        self._atoms: dict[str, int] = {name: atom for atom, name in enumerate(PREDEFINED_ATOMS, 1)}
+        self._names: dict[int, str] = {atom: name for name, atom in self._atoms.items()}
+        self._names[0] = "None"
+
+    def _store(self, name: str, atom: int) -> int:
+        if atom:  # 0: only_if_exists and the atom does not exist, it may be created later
+            self._atoms[name] = atom
+            self._names[atom] = name
+        return atom
+
+    def _queue_intern(self, names: Iterable[str], only_if_exists: bool) -> list:
+        cookies = []
+        for name in names:
+            if name not in self._atoms:
+                encoded = name.encode()
+                cookies.append(
+                    (name, self.connection.request(bds.INTERN_ATOM, only_if_exists, len(encoded), tail=encoded))
+                )
+        return cookies
+
+    def _queue_names(self, atoms: Iterable[int]) -> list:
+        return [
+            (atom, self.connection.request(bds.GET_ATOM_NAME, atom)) for atom in atoms if atom not in self._names
+        ]
+
+    def _store_name(self, atom: int, reply) -> None:
+        layout = bds.GET_ATOM_NAME.reply
+        name = layout.tail(reply)[:layout.get(reply, "name_len")]  # the tail is padded to 4 bytes
+        self._store(bytes(name).decode(errors="replace"), atom)
+
+    # -------------------------------------------------------------------------------------------------------
+    # blocking connection
+    # -------------------------------------------------------------------------------------------------------
+
+    def intern(self, name: str, only_if_exists: bool = False) -> int:
+        """
+        Return back the atom of a name, 0 if only_if_exists and it does not exist
+        """
+        atom = self._atoms.get(name)
+        if atom is None:
+            self.prefetch((name,), only_if_exists)
+            atom = self._atoms.get(name, 0)
+        return atom
+
+    def name(self, atom: int) -> str:
+        """
+        Return back the name of an atom
+        """
+        name = self._names.get(atom)
+        if name is None:
+            self.prefetch_names((atom,))
+            name = self._names[atom]
+        return name
+
+    def prefetch(self, names: Iterable[str], only_if_exists: bool = False) -> None:
+        """
+        Intern every uncached name with a single flush(one round trip)
+        """
+        for name, cookie in self._queue_intern(names, only_if_exists):
+            self._store(name, bds.INTERN_ATOM.reply.get(cookie.reply(), "atom"))
+
+    def prefetch_names(self, atoms: Iterable[int]) -> None:
+        """
+        Look up the name of every unknown atom with a single flush(one round trip)
+        """
+        for atom, cookie in self._queue_names(atoms):
+            self._store_name(atom, cookie.reply())
+
+    # -------------------------------------------------------------------------------------------------------
+    # asyncio connection
+    # -------------------------------------------------------------------------------------------------------
+
+    async def aintern(self, name: str, only_if_exists: bool = False) -> int:
+        atom = self._atoms.get(name)
+        if atom is None:
+            await self.aprefetch((name,), only_if_exists)
+            atom = self._atoms.get(name, 0)
+        return atom
+
+    async def aname(self, atom: int) -> str:
+        name = self._names.get(atom)
+        if name is None:
+            await self.aprefetch_names((atom,))
+            name = self._names[atom]
+        return name
+
+    async def aprefetch(self, names: Iterable[str], only_if_exists: bool = False) -> None:
+        for name, cookie in self._queue_intern(names, only_if_exists):
+            self._store(name, bds.INTERN_ATOM.reply.get(await cookie.reply(), "atom"))
+
+    async def aprefetch_names(self, atoms: Iterable[int]) -> None:
+        for atom, cookie in self._queue_names(atoms):
+            self._store_name(atom, await cookie.reply())
+
+    # -------------------------------------------------------------------------------------------------------
+
+    def get(self, name: str) -> int | None:
+        """
+        Cached atom of a name without any round trip
+        """
+        return self._atoms.get(name)
+
+    def __getitem__(self, name: str) -> int:
+        return self.intern(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._atoms
+
+    def __len__(self) -> int:
+        return len(self._atoms)
+
+    def __repr__(self) -> str:
+        return f"<AtomTable cached={len(self._atoms)}>"
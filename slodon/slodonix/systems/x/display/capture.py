@@ -0,0 +1,164 @@
+# https://www.x.org/releases/X11R7.7/doc/xextproto/shm.html (ShmGetImage)
+# https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#requests:GetImage
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+# This project
+from slodon.slodonix.systems.x.errors import *
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.resources.shm import ShmSegment
+
+if TYPE_CHECKING:
+    from slodon.slodonix.systems.x.display.display import Display
+
+__all__ = ["ScreenCapture", "to_rgb"]
+
+Z_PIXMAP = 2  # image format of GetImage/ShmGetImage
+ALL_PLANES = 0xFFFFFFFF
+_LOCAL_HOSTS = ("", "unix", None)
+
+
+def to_rgb(frame: np.ndarray) -> np.ndarray:
+    """
+    RGB view(no copy) of a BGRX frame returned by ScreenCapture.capture
+    """
+    return frame[..., 2::-1]
+
+
+class ScreenCapture:
+    """
+    Captures a drawable(the root window by default) into (height, width, 4) uint8 BGRX NumPy arrays.
+
+    On a local connection with MIT-SHM the server writes the pixels into a reusable shared memory segment and
+    the returned array is a view over it: nothing goes through the socket. Otherwise(e.g. over TCP) the image
+    is read with pipelined GetImage requests of at most `chunk_bytes`, straight into a reusable array.
+
+    In both cases the returned array is only valid until the next capture, pass copy=True to keep it.
+    """
+
+    def __init__(self, display: Display, drawable: int | None = None, shm: bool | None = None,
+                 chunk_bytes: int = 1 << 22) -> None:
+        """
+        ScreenCapture initialization
+        ### Arguments
+        - display (Display): the display to capture
+        - drawable (int): the window(or pixmap) to capture, the root window of the default screen by default
+        - shm (bool): use MIT-SHM, None to use it when the connection is local and the extension is present
+        - chunk_bytes (int): the most pixel bytes asked by a single GetImage
+        ### Returns
+        - None
+        """
+        connection = display.connection
+        screen = display.screen
+        self.display = display
+        self.connection = connection
+        self.drawable = drawable if drawable is not None else screen.root
+        self.chunk_bytes = chunk_bytes
+
+        self.width, self.height = screen.width, screen.height
+        depth = screen.root_depth
+        bits_per_pixel = {format[0]: format[1] for format in connection.setup.pixmap_formats}.get(depth)
+        if bits_per_pixel != 32:
+            raise DisplayError(f"only 32 bits per pixel screens can be captured(depth {depth}: {bits_per_pixel})")
+
+        self.shm = self._shm_supported() if shm is None else shm
+        self._segment: ShmSegment | None = None
+        self._attached = False  # the server attached the segment, it can be marked for removal
+        self._frame = np.empty(0, dtype=np.uint8)  # reusable buffer of the GetImage path
+
+    def _shm_supported(self) -> bool:
+        _, protocol, host, _, _ = self.connection.display_info
+        if protocol != "unix" and host not in _LOCAL_HOSTS:  # the server can not map our memory
+            return False
+        return self.connection.extension("MIT-SHM") is not None
+
+    def capture(self, x: int = 0, y: int = 0, width: int | None = None, height: int | None = None,
+                copy: bool = False) -> np.ndarray:
+        """
+        Capture a region of the drawable
+        ### Arguments
+        - x, y (int): the top left corner of the region
+        - width, height (int): the size of the region, up to the right/bottom edge of the screen by default
+        - copy (bool): return back a copy instead of a view over the reusable buffer
+        ### Returns
+        - np.ndarray: (height, width, 4) uint8, BGRX
+        """
+        width = self.width - x if width is None else width
+        height = self.height - y if height is None else height
+        if width <= 0 or height <= 0:
+            raise ValueError(f"empty capture region {width}x{height}+{x}+{y}")
+
+        frame = None
+        if self.shm:
+            frame = self._capture_shm(x, y, width, height)
+        if frame is None:
+            frame = self._capture_get_image(x, y, width, height)
+        return frame.copy() if copy else frame
+
+    def _capture_shm(self, x: int, y: int, width: int, height: int) -> np.ndarray | None:
+        size = width * height * 4
+        segment = self._segment
+        if segment is None or segment.size < size:
+            if segment is not None:
+                segment.close()
+            try:
+                # sized for the whole screen, so that every region fits in it
+                segment = self._segment = ShmSegment(self.connection, max(size, self.width * self.height * 4))
+            except OSError:
+                self.shm = False
+                self._segment = None
+                return None
+            self._attached = False
+
+        reply = self.connection.request(
+            bds.SHM_GET_IMAGE, self.drawable, x, y, width, height, ALL_PLANES, Z_PIXMAP, segment.id, 0
+        ).reply(check=False)
+        if reply is None:
+            if not self._attached:  # the server could not attach the segment, use GetImage from now on
+                self.shm = False
+                segment.close(detach=False)  # never attached, a ShmDetach would fail as well
+                self._segment = None
+                return None
+            raise DisplayError(f"ShmGetImage failed for {width}x{height}+{x}+{y}")
+
+        if not self._attached:
+            segment.mark_removed()  # freed by the kernel once both sides detached
+            self._attached = True
+        return np.frombuffer(segment.buffer, dtype=np.uint8, count=size).reshape(height, width, 4)
+
+    def _capture_get_image(self, x: int, y: int, width: int, height: int) -> np.ndarray:
+        row_bytes = width * 4
+        size = row_bytes * height
+        if self._frame.size < size:
+            self._frame = np.empty(size, dtype=np.uint8)
+        frame = self._frame[:size]
+
+        rows = max(1, self.chunk_bytes // row_bytes)
+        request = self.connection.request
+        chunks = [
+            (row, request(bds.GET_IMAGE, Z_PIXMAP, self.drawable, x, y + row, width, min(rows, height - row),
+                          ALL_PLANES))
+            for row in range(0, height, rows)
+        ]
+        layout = bds.GET_IMAGE.reply
+        for row, cookie in chunks:
+            # waited in order: every reply is read straight from the receive buffer, without a copy in between
+            reply = cookie.reply(copy=False)
+            start = row * row_bytes
+            end = min(start + rows * row_bytes, size)
+            frame[start:end] = np.frombuffer(layout.tail(reply), dtype=np.uint8, count=end - start)
+        return frame.reshape(height, width, 4)
+
+    def close(self) -> None:
+        """
+        Detach and free the shared memory segment, the arrays returned so far must not be used after it
+        """
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def __repr__(self) -> str:
+        return f"<ScreenCapture drawable={self.drawable:#x} {self.width}x{self.height} shm={self.shm}>"
@@ -0,0 +1,238 @@
+# Change detection over successive captures
+# https://www.x.org/releases/X11R7.7/doc/damageproto/damageproto.txt
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Callable, Iterator
+
+import numpy as np
+
+# This project
+from slodon.slodonix.systems.x.errors import *
+from slodon.slodonix.systems.x.protocol import bds
+
+if TYPE_CHECKING:
+    from slodon.slodonix.systems.x.display.display import Display
+
+__all__ = ["TileDiff", "DamageTracker", "watch_changes"]
+
+Rect = tuple[int, int, int, int]  # x, y, width, height
+
+DAMAGE_REPORT_DELTA_RECTANGLES = 1  # a DamageNotify for every newly damaged area since the last subtract
+
+
+class TileDiff:
+    """
+    Splits successive frames into tiles and reports the tiles that changed since the previous frame.
+
+    Every tile is hashed with vectorized reductions: the pixels(as uint32) are multiplied by fixed random odd
+    weights and summed per tile(modulo 2**64), one row of tiles at a time. The weights cover a single row of
+    tiles and are reused by every row, so the memory is tile_size x width words and not a full frame of them,
+    only the (rows, columns) array of hashes is kept between frames.
+    """
+
+    def __init__(self, tile_size: int = 64, seed: int = 0x5107) -> None:
+        """
+        TileDiff initialization
+        ### Arguments
+        - tile_size (int): the width and the height of a tile(the last row/column of tiles may be smaller)
+        - seed (int): seed of the weights
+        ### Returns
+        - None
+        """
+        self.tile_size = tile_size
+        self._rng = np.random.default_rng(seed)
+        self._shape: tuple[int, int] | None = None
+        self._weights = np.empty((0, 0), dtype=np.uint64)
+        self._work = np.empty((0, 0), dtype=np.uint64)
+        self._rows = self._columns = np.empty(0, dtype=np.intp)
+        self.previous: np.ndarray | None = None  # tile hashes of the previous frame
+
+    def _prepare(self, height: int, width: int) -> None:
+        band = min(self.tile_size, height)
+        self._shape = (height, width)
+        self._weights = self._rng.integers(0, 1 << 63, size=(band, width), dtype=np.uint64) * 2 + 1
+        self._work = np.empty((band, width), dtype=np.uint64)
+        self._rows = np.arange(0, height, self.tile_size)
+        self._columns = np.arange(0, width, self.tile_size)
+        self.previous = None
+
+    def hashes(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Return back the (rows, columns) uint64 hashes of the tiles of a (height, width, 4) uint8 frame
+        """
+        height, width = frame.shape[:2]
+        if self._shape != (height, width):
+            self._prepare(height, width)
+        pixels = np.ascontiguousarray(frame).view(np.uint32).reshape(height, width)
+        hashes = np.empty((len(self._rows), len(self._columns)), dtype=np.uint64)
+        for row, top in enumerate(self._rows.tolist()):
+            band = pixels[top:top + self.tile_size]
+            work = self._work[:len(band)]
+            np.multiply(band, self._weights[:len(band)], out=work)
+            np.add.reduceat(work.sum(axis=0), self._columns, out=hashes[row])
+        return hashes
+
+    def diff(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Return back the (rows, columns) mask of the tiles changed since the previous frame(every tile for the
+        first frame, or when the size changed)
+        """
+        hashes = self.hashes(frame)
+        previous, self.previous = self.previous, hashes
+        if previous is None:
+            return np.ones(hashes.shape, dtype=bool)
+        return hashes != previous
+
+    def rects(self, mask: np.ndarray, width: int, height: int, x: int = 0, y: int = 0) -> list[Rect]:
+        """
+        Turn a tile mask into rectangles(offset by x, y), clipped to width x height
+        """
+        size = self.tile_size
+        return [
+            (x + column * size, y + row * size, min(size, width - column * size), min(size, height - row * size))
+            for row, column in zip(*(indices.tolist() for indices in np.nonzero(mask)))
+        ]
+
+    def updates(self, frame: np.ndarray, mask: np.ndarray | None = None, x: int = 0, y: int = 0
+                ) -> Iterator[tuple[Rect, np.ndarray]]:
+        """
+        Yield (rect, pixels) for every changed tile of a frame, the pixels are views over the frame
+        ### Arguments
+        - frame (np.ndarray): (height, width, 4) uint8
+        - mask (np.ndarray): the changed tiles, diff(frame) by default
+        - x, y (int): position of the frame on the screen, added to the rects
+        ### Returns
+        - generator of ((x, y, width, height), np.ndarray)
+        """
+        height, width = frame.shape[:2]
+        if mask is None:
+            mask = self.diff(frame)
+        for rect in self.rects(mask, width, height):
+            left, top, w, h = rect
+            yield (left + x, top + y, w, h), frame[top:top + h, left:left + w]
+
+    def reset(self) -> None:
+        """
+        Forget the previous frame, the next diff reports every tile
+        """
+        self.previous = None
+
+
+class DamageTracker:
+    """
+    Collects the areas of a drawable damaged since the last call with the DAMAGE extension, so unchanged
+    frames need no hashing at all
+    """
+
+    def __init__(self, display: Display, drawable: int | None = None) -> None:
+        """
+        DamageTracker initialization
+        ### Arguments
+        - display (Display): the display of the drawable
+        - drawable (int): the tracked drawable, the root window of the first screen by default
+        ### Returns
+        - None
+        """
+        connection = self.connection = display.connection
+        extension = connection.extension("DAMAGE")
+        if extension is None:
+            raise DisplayError("the DAMAGE extension is not available")
+        self.event_code = extension[1]  # DamageNotify
+        self.drawable = drawable if drawable is not None else connection.setup.roots[0]
+
+        connection.request(bds.DAMAGE_QUERY_VERSION, 1, 1).reply()  # required before any other request
+        self.damage = connection.xid.alloc()
+        connection.request(bds.DAMAGE_CREATE, self.damage, self.drawable, DAMAGE_REPORT_DELTA_RECTANGLES)
+        connection.flush()
+
+    def take(self) -> list[Rect]:
+        """
+        Return back the areas damaged since the previous call(never blocks), the other events are kept
+        """
+        connection = self.connection
+        code = self.event_code
+        layout = connection.event_layouts[code]
+        rects = []
+
+        def claim(events: bytearray, offset: int) -> bool:
+            if events[offset] & 0x7F != code:
+                return False
+            _, _, _, _, _, _, x, y, width, height, *_ = layout.unpack_from(events, offset)
+            rects.append((x, y, width, height))
+            return True
+
+        connection.poll()
+        connection.claim_events(claim)
+        if rects:
+            connection.request(bds.DAMAGE_SUBTRACT, self.damage, 0, 0)  # repair everything
+        return rects
+
+    def close(self) -> None:
+        self.connection.request(bds.DAMAGE_DESTROY, self.damage)
+        self.connection.flush()
+        self.connection.xid.free(self.damage)
+
+
+def _tiles_shape(frame: np.ndarray, tile_size: int) -> tuple[int, int]:
+    height, width = frame.shape[:2]
+    return -(-height // tile_size), -(-width // tile_size)
+
+
+def _damage_mask(rects: list[Rect], shape: tuple[int, int], tile_size: int, x: int, y: int) -> np.ndarray:
+    mask = np.zeros(shape, dtype=bool)
+    for left, top, width, height in rects:
+        left -= x
+        top -= y
+        if width <= 0 or height <= 0:
+            continue
+        mask[max(top // tile_size, 0):max((top + height - 1) // tile_size + 1, 0),
+             max(left // tile_size, 0):max((left + width - 1) // tile_size + 1, 0)] = True
+    return mask
+
+
+def watch_changes(
+    display: Display,
+    tile_size: int = 64,
+    interval: float = 0.1,
+    region: Rect | None = None,
+    damage: bool = False,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Iterator[tuple[Rect, np.ndarray]]:
+    """
+    Capture the screen(or a region of it) every interval and yield only the tiles changed since the previous
+    capture, the first capture yields every tile
+    ### Arguments
+    - display (Display): the display to watch
+    - tile_size (int): the size of the tiles
+    - interval (float): the time between two captures(seconds)
+    - region (tuple): (x, y, width, height) of the watched region, the whole screen by default
+    - damage (bool): use DAMAGE events instead of hashing the tiles
+    - clock, sleep: time source and sleep function
+    ### Returns
+    - generator of ((x, y, width, height), np.ndarray): the pixels are BGRX views over the capture buffer,
+    valid until the next capture(the next frame starts after the last tile of the frame was consumed)
+    """
+    x, y, width, height = region if region is not None else (0, 0, None, None)
+    tiles = TileDiff(tile_size)
+    tracker = DamageTracker(display) if damage else None
+    first = True
+    try:
+        while True:
+            started = clock()
+            mask = None
+            if tracker is not None:
+                rects = tracker.take()
+                if not rects and not first:
+                    sleep(max(interval - (clock() - started), 0))
+                    continue
+            frame = display.capture(x, y, width, height)
+            if tracker is not None and not first:
+                mask = _damage_mask(rects, _tiles_shape(frame, tile_size), tile_size, x, y)
+            first = False
+            yield from tiles.updates(frame, mask, x, y)
+            sleep(max(interval - (clock() - started), 0))
+    finally:
+        if tracker is not None:
+            tracker.close()
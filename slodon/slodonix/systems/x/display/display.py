@@ -1,7 +1,38 @@
 """Basic display"""
-from slodon.slodonix.systems.x.protocol.display import BaseDisplay
+import itertools
+import os
+import time
 
-__all__ = ["open_display", "Display"]
+import numpy as np
+
+from slodon.slodonix.systems.input.keystrokes import compile_text
+from slodon.slodonix.systems.input.motion import MOVE_RATE, linear, play_path, tween_path
+from slodon.slodonix.systems.input.plan import Program, compile_plan
+from slodon.slodonix.systems.input.recorder import Recorder
+from slodon.slodonix.systems.x.errors import *
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.display import CW_EVENT_MASK, BaseDisplay
+from slodon.slodonix.systems.x.protocol.async_connect import AsyncConnection
+from slodon.slodonix.systems.x.display.atoms import DEFAULT_ATOMS
+from slodon.slodonix.systems.x.display.capture import ScreenCapture
+from slodon.slodonix.systems.x.display.keyboard import KeyboardMapping
+from slodon.slodonix.systems.x.display.properties import DEFAULT_PROPERTIES, WindowTable, fetch_window_properties
+from slodon.slodonix.systems.x.display.screens import MonitorLayout
+from slodon.slodonix.systems.x.display.selection import PASTE_KEYS, PASTE_THRESHOLD, SelectionOwner
+from slodon.slodonix.systems.x.display.state import DisplayState
+from slodon.slodonix.systems.x.xobjects.window import WindowTree
+
+__all__ = ["open_display", "open_display_async", "Display", "AsyncDisplay"]
+
+# type of XTestFakeInput(also the op of the input log records)
+KEY_PRESS = 2
+KEY_RELEASE = 3
+BUTTON_PRESS = 4
+BUTTON_RELEASE = 5
+MOTION_NOTIFY = 6
+
+# button names of the Windows backend -> X buttons
+BUTTONS = {"left": 1, "middle": 2, "right": 3, "primary": 1, "secondary": 3}
 
 
 class Display(BaseDisplay):
@@ -11,16 +42,366 @@ class Display(BaseDisplay):
     A set of screens for a single user with one keyboards and one pointer(usually a mouse) is called a display.
     """
 
-    def __init__(self, display) -> None:
-        super().__init__(display=display)
+    def __init__(self, display=None) -> None:
+        super().__init__(display=display or os.environ.get("DISPLAY"))
+        self.atoms.prefetch(DEFAULT_ATOMS)  # one flush for every atom used by window inspection
+        self._capture: ScreenCapture | None = None
+        self._keyboard: KeyboardMapping | None = None
+        self.recorder: Recorder | None = None  # every input sent is appended to it
+        self._tree: WindowTree | None = None  # followed by wait_for_window
+        self._state: DisplayState | None = None
+
+    def type_text(self, text: str, interval: float = 0.0, paste_threshold: int | None = PASTE_THRESHOLD) -> None:
+        """
+        Type a string with XTEST: the whole keystroke stream is queued and sent in one flush, the interval
+        between the characters is waited by the server(the time field of XTestFakeInput).
+        Without interval, a text of at least paste_threshold characters is pasted instead(see paste_text).
+        ### Arguments
+        - text (str): the text to type, every character must be produced by a key of the keyboard
+        - interval (float): seconds between two characters
+        - paste_threshold (int): shortest text pasted through the CLIPBOARD, None to always type
+        ### Returns
+        - None
+        """
+        if not interval and paste_threshold is not None and len(text) >= paste_threshold:
+            if not self.paste_text(text):
+                raise DisplayError("the pasted text was not requested by any client")
+            return
+
+        keyboard = self.keyboard
+        keyboard.sync()
+        strokes = compile_text(text, keyboard.chars, keyboard.modifier_keycode)
+        self._send_input(
+            [
+                (KEY_PRESS if press else KEY_RELEASE, code, 0, 0, interval if first and index else 0.0)
+                for index, (code, press, first) in enumerate(strokes)
+            ]
+        )
+
+    def paste_text(self, text: str, keys: tuple[str, ...] = PASTE_KEYS, timeout: float = 5.0) -> bool:
+        """
+        Become the CLIPBOARD owner, press the paste chord and serve the text to the focused client(with INCR for
+        large texts), the number of round trips does not depend on the length of the text
+        ### Arguments
+        - text (str): the pasted text
+        - keys (tuple): the key names of the paste chord, ("ctrl", "shift", "v") for most terminals
+        - timeout (float): seconds to wait for the transfer
+        ### Returns
+        - bool: True once the text has been transferred, False if nobody requested it in time
+        """
+        self._xtest()
+        keyboard = self.keyboard
+        keyboard.sync()
+        codes = []
+        for name in keys:
+            key = keyboard.key(name)
+            if key is None:
+                raise ValueError(f"no key produces {name!r}")
+            codes.append(key[0])
+
+        with SelectionOwner(self, text) as owner:
+            self._send_input(
+                [(KEY_PRESS, code, 0, 0, 0.0) for code in codes]
+                + [(KEY_RELEASE, code, 0, 0, 0.0) for code in reversed(codes)]
+            )
+            return owner.serve(timeout)
+
+    def position(self) -> tuple[int, int]:
+        """
+        x-y position of the pointer on the root window of the first screen(cached, see DisplayState)
+        """
+        return self.state.pointer()
+
+    def size(self) -> tuple[int, int]:
+        """
+        width-height of the root window of the first screen(cached, see DisplayState)
+        """
+        return self.state.size()
+
+    def monitors(self) -> MonitorLayout:
+        """
+        The monitors of the first screen(cached, see DisplayState), e.g.
+        display.monitors().to_local(points) maps root window points to (monitor, point on the monitor)
+        """
+        return self.state.monitors()
+
+    def move_to(self, x=None, y=None, duration: float = 0.0, tween=linear, rate: float = MOVE_RATE) -> None:
+        """
+        Move the pointer with XTEST. With a duration, the whole path is precomputed(see motion.tween_path) and
+        every position is sent at its time against a monotonic deadline, the positions already late are dropped.
+        ### Arguments
+        - x (int | tuple): the x position, None for the current one, a tuple for (x, y)
+        - y (int): the y position, None for the current one
+        - duration (float): seconds of the move, 0 moves instantaneously
+        - tween (Callable | str): easing of the move(see motion.EASINGS)
+        - rate (float): positions per second
+        ### Returns
+        - None
+        """
+        if isinstance(x, tuple):
+            x, y = x
+        self._xtest()
+        state = self.state
+
+        def move(to_x: int, to_y: int) -> None:
+            self._send_input(((MOTION_NOTIFY, 0, to_x, to_y, 0.0),))
+            state.moved(to_x, to_y)
+
+        if x is None or y is None or duration > 0:
+            start = state.pointer()
+            x = start[0] if x is None else x
+            y = start[1] if y is None else y
+        if not duration > 0:
+            move(int(x), int(y))
+            return
+        play_path(*tween_path(start, (int(x), int(y)), duration, tween, rate), move)
+
+    def key_down(self, key: str, with_release: bool = False) -> None:
+        """
+        Press a key("enter", "shift", "f5", ... or a character), the modifiers the character needs are pressed
+        around it
+        """
+        code, modifiers = self._key(key)
+        actions = [(KEY_PRESS, modifier, 0, 0, 0.0) for modifier in modifiers]
+        actions.append((KEY_PRESS, code, 0, 0, 0.0))
+        if with_release:
+            actions.append((KEY_RELEASE, code, 0, 0, 0.0))
+        actions += [(KEY_RELEASE, modifier, 0, 0, 0.0) for modifier in reversed(modifiers)]
+        self._send_input(actions)
+
+    def key_up(self, key: str) -> None:
+        """
+        Release a key(see key_down)
+        """
+        code, modifiers = self._key(key)
+        actions = [(KEY_PRESS, modifier, 0, 0, 0.0) for modifier in modifiers]
+        actions.append((KEY_RELEASE, code, 0, 0, 0.0))
+        actions += [(KEY_RELEASE, modifier, 0, 0, 0.0) for modifier in reversed(modifiers)]
+        self._send_input(actions)
+
+    def mouse_down(self, button="left") -> None:
+        self._send_input(((BUTTON_PRESS, _button(button), 0, 0, 0.0),))
+
+    def mouse_up(self, button="left") -> None:
+        self._send_input(((BUTTON_RELEASE, _button(button), 0, 0, 0.0),))
+
+    def click(self, x=None, y=None, button="left", clicks: int = 1, interval: float = 0.0) -> None:
+        """
+        Move the pointer(if x or y is given) and click, every press and release is sent in one flush
+        ### Arguments
+        - x (int | tuple): the x position, None for the current one, a tuple for (x, y)
+        - y (int): the y position, None for the current one
+        - button (str | int): "left", "middle", "right" or an X button number
+        - clicks (int): the number of clicks
+        - interval (float): seconds between two clicks
+        ### Returns
+        - None
+        """
+        if isinstance(x, tuple):
+            x, y = x
+        actions = []
+        if x is not None or y is not None:
+            if x is None or y is None:
+                current = self.position()
+                x = current[0] if x is None else x
+                y = current[1] if y is None else y
+            actions.append((MOTION_NOTIFY, 0, int(x), int(y), 0.0))
+        button = _button(button)
+        for index in range(clicks):
+            actions.append((BUTTON_PRESS, button, 0, 0, interval if index else 0.0))
+            actions.append((BUTTON_RELEASE, button, 0, 0, 0.0))
+        self._send_input(actions)
+        if x is not None:
+            self.state.moved(int(x), int(y))
+
+    def send_records(self, records, timed: bool = False, speed: float = 1.0) -> None:
+        """
+        Send a slice of input log records(see recorder.Replayer) in one flush, e.g.
+        Replayer(path).replay(display.send_records, speed=None).
+        If timed, the gaps between the times of the records, divided by speed, are waited by the server: a whole
+        log is replayed N times faster with replay(partial(display.send_records, timed=True, speed=N), speed=None).
+        """
+        connection = self._xtest()
+        root = connection.setup.roots[0]
+        ops = records["op"].tolist()
+        details = records["detail"].tolist()
+        xs = records["x"].tolist()
+        ys = records["y"].tolist()
+        if timed:
+            if speed <= 0:
+                raise ValueError("speed must be positive")
+            gaps = np.diff(records["time"], prepend=records["time"][:1]) / speed
+            delays = np.rint(gaps * 1000).astype(np.int64).tolist()
+        else:
+            delays = itertools.repeat(0)
+        if self.recorder is not None:
+            self.recorder.extend(zip(ops, details, xs, ys, (delay / 1000 for delay in delays) if timed else delays))
+        zero = itertools.repeat(0)
+        connection.request_batch(bds.XTEST_FAKE_INPUT, zip(ops, details, delays, itertools.repeat(root), xs, ys, zero))
+        connection.flush()
+        moves = np.flatnonzero(records["op"] == MOTION_NOTIFY)
+        if len(moves):
+            self.state.moved(xs[moves[-1]], ys[moves[-1]])
+
+    def run_plan(self, plan) -> Program:
+        """
+        Compile an action plan(a list of steps or their source, see plan.parse_plan) and execute it, every run of
+        steps between two wait_for is sent in one flush
+        ### Arguments
+        - plan (Iterable[Step] | str): the plan
+        ### Returns
+        - Program: the compiled plan
+        """
+        keyboard = self.keyboard
+        keyboard.sync()
+        program = compile_plan(plan, keyboard.chars, keyboard.modifier_keycode, keyboard.key)
+        program.run(lambda records: self.send_records(records, timed=True), self.wait_for_window)
+        return program
+
+    def wait_for_window(self, window: str, timeout: float = 10.0, exact: bool = False) -> list:
+        """
+        Wait until a window named window(or whose name contains it if not exact) exists, the windows are
+        followed by the WindowTree of the display
+        ### Returns
+        - list[WindowNode]: the matching windows
+        ### Raises
+        - DisplayError: not found within timeout seconds
+        """
+        if self._tree is None:
+            self._tree = self.window_tree()
+        tree = self._tree
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._state is not None:
+                self._state.sync()  # before the tree takes the pointer events
+            tree.refresh()
+            found = tree.find(window, exact)
+            if found:
+                return found
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DisplayError(f"no window named {window!r} after {timeout} seconds")
+            self.connection.poll(min(remaining, 0.1))
+
+    def _send_input(self, actions: list[tuple[int, int, int, int, float]]) -> None:
+        """
+        Send (type, detail, x, y, delay) XTestFakeInput actions in one flush, the delay(seconds after the previous
+        action) is waited by the server. The actions are appended to the recorder if there is one.
+        """
+        connection = self._xtest()
+        root = connection.setup.roots[0]
+        if self.recorder is not None:
+            self.recorder.extend(actions)
+        connection.request_batch(
+            bds.XTEST_FAKE_INPUT,
+            ((type, detail, int(delay * 1000), root, x, y, 0) for type, detail, x, y, delay in actions),
+        )
+        connection.flush()
+
+    def _key(self, key: str) -> tuple[int, list[int]]:
+        keyboard = self.keyboard
+        keyboard.sync()
+        entry = keyboard.key(key)
+        if entry is None:
+            raise ValueError(f"no key produces {key!r}")
+        code, mask = entry
+        modifiers = []
+        for bit in range(8):
+            if mask >> bit & 1:
+                modifier = keyboard.modifier_keycode(1 << bit)
+                if modifier is None:
+                    raise ValueError(f"no key generates the modifier {1 << bit:#x}")
+                modifiers.append(modifier)
+        return code, modifiers
 
+    def reset(self) -> None:
+        """
+        Forget everything kept for the current user of the display: the cached state, the keyboard mapping, the
+        window tree, the recorder, and the events selected for them(e.g. before a DisplayPool hands the display
+        to someone else). The errors of windows destroyed meanwhile end up in connection.errors.
+        """
+        connection = self.connection
+        windows = list(self.root_event_masks)
+        if self._tree is not None:
+            windows += [window for window in self._tree.windows if window not in self.root_event_masks]
+        for window in windows:
+            connection.request(bds.CHANGE_WINDOW_ATTRIBUTES, window, CW_EVENT_MASK, tail=bytes(4))  # no events
+        if self._state is not None and self._state.randr_selected:
+            connection.request(bds.RANDR_SELECT_INPUT, self._state.root, 0)
+        self.root_event_masks.clear()
+        self._state = self._tree = self._keyboard = self.recorder = None
 
-# Todo: if the default name is none or not provided connect to the default display
-def open_display(name=None) -> Display:
+    def _xtest(self):
+        connection = self.connection
+        if connection.extension("XTEST") is None:
+            raise DisplayError("the XTEST extension is not available")
+        return connection
+
+    @property
+    def state(self) -> DisplayState:
+        """
+        The cached geometry and pointer position of the display, created on the first use
+        """
+        if self._state is None:
+            self._state = DisplayState(self)
+        return self._state
+
+    @property
+    def keyboard(self) -> KeyboardMapping:
+        """
+        The keyboard mapping of the display, fetched on the first use and after a MappingNotify
+        """
+        if self._keyboard is None:
+            self._keyboard = KeyboardMapping(self.connection)
+        return self._keyboard
+
+    def capture(self, x: int = 0, y: int = 0, width: int | None = None, height: int | None = None, copy=False):
+        """
+        Capture a region of the root window into a (height, width, 4) BGRX NumPy array, through MIT-SHM when
+        possible(see capture.ScreenCapture). Without copy the array is only valid until the next capture.
+        """
+        if self._capture is None:
+            self._capture = ScreenCapture(self)
+        return self._capture.capture(x, y, width, height, copy)
+
+    def window_tree(self, root: int | None = None, names: bool = True) -> WindowTree:
+        """
+        Read the window hierarchy once and return back a WindowTree kept current by the events
+        (call tree.refresh() before using it)
+        """
+        tree = WindowTree(self, root, names)
+        tree.seed()
+        return tree
+
+    def window_properties(self, properties=DEFAULT_PROPERTIES, windows=None, geometry: bool = True) -> WindowTable:
+        """
+        Snapshot of a property set(and the geometry) of every managed window, fetched in one batch
+        (see properties.fetch_window_properties)
+        """
+        return fetch_window_properties(self, properties, windows, geometry)
+
+    def close(self):
+        """Close the display"""
+        if self._capture is not None:
+            self._capture.close()
+        super().close()
+
+
+def _button(button) -> int:
+    if isinstance(button, int):
+        return button
+    try:
+        return BUTTONS[button]
+    except KeyError:
+        raise ValueError(f"button must be one of {', '.join(BUTTONS)} or an X button number, not {button!r}") from None
+
+
+def open_display(name=None, pool=None) -> Display:
     """
     Open a display
 
     name: The name of the display / os.environ["DISPLAY"]
+    pool: a DisplayPool, the display is acquired from it(give it back with pool.release)
 
     Display names:
         - UNIX
@@ -28,4 +409,36 @@ def open_display(name=None) -> Display:
 
     Returns a display object
     """
-    return Display(display=name)
+    if pool is not None:
+        return pool.acquire(name)
+    return Display(display=name or os.environ.get("DISPLAY"))
+
+
+class AsyncDisplay(BaseDisplay):
+    """
+    Represents a display driven by an asyncio event loop(see open_display_async)
+    """
+
+    def __init__(self, display, connection: AsyncConnection) -> None:
+        super().__init__(display=display, connection=connection)
+
+    async def __aenter__(self) -> "AsyncDisplay":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+async def open_display_async(name=None) -> AsyncDisplay:
+    """
+    Open a display without blocking the running event loop
+
+    name: The name of the display / os.environ["DISPLAY"]
+
+    Returns an AsyncDisplay object, its connection replies are awaitable and its events can be
+    consumed with `async for event in display.connection`
+    """
+    name = name or os.environ.get("DISPLAY")
+    display = AsyncDisplay(display=name, connection=await AsyncConnection.open(name))
+    await display.atoms.aprefetch(DEFAULT_ATOMS)
+    return display
@@ -0,0 +1,274 @@
+# https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#Keyboards
+# https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#keysym_encoding
+# https://cgit.freedesktop.org/xorg/proto/x11proto/tree/keysymdef.h
+from __future__ import annotations
+
+import struct
+import time
+from typing import TYPE_CHECKING, Callable
+
+# This project
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.bds import MESSAGE_SIZE
+
+if TYPE_CHECKING:
+    from slodon.slodonix.systems.x.events.event import _EventType
+
+__all__ = ["KeyboardMapping", "KEYSYMS", "char_keysym", "MODIFIER_MASKS", "POLL_INTERVAL"]
+
+MAPPING_NOTIFY = 34
+MAPPING_MODIFIER = 0
+MAPPING_KEYBOARD = 1
+MAPPING_POINTER = 2
+
+# seconds between two reads of the socket by sync(): the events received with the replies are seen at once,
+# a select() on every keystroke would cost more than the keystroke itself
+POLL_INTERVAL = 0.25
+
+# modifier index(row of GetModifierMapping) -> mask
+SHIFT_MASK = 1 << 0
+LOCK_MASK = 1 << 1
+CONTROL_MASK = 1 << 2
+MODIFIER_MASKS: tuple[int, ...] = tuple(1 << index for index in range(8))  # Shift Lock Control Mod1..Mod5
+
+NO_SYMBOL = 0
+MODE_SWITCH = 0xFF7E
+ISO_LEVEL3_SHIFT = 0xFE03
+
+# Key names(the names of the Windows backend key map) -> keysym
+KEYSYMS: dict[str, int] = {
+    "backspace": 0xFF08, "\b": 0xFF08, "tab": 0xFF09, "\t": 0xFF09, "clear": 0xFF0B,
+    "enter": 0xFF0D, "return": 0xFF0D, "\n": 0xFF0D, "\r": 0xFF0D, "pause": 0xFF13, "scrolllock": 0xFF14,
+    "esc": 0xFF1B, "escape": 0xFF1B, "delete": 0xFFFF, "del": 0xFFFF,
+    "home": 0xFF50, "left": 0xFF51, "up": 0xFF52, "right": 0xFF53, "down": 0xFF54,
+    "pageup": 0xFF55, "pgup": 0xFF55, "pagedown": 0xFF56, "pgdn": 0xFF56, "end": 0xFF57,
+    "select": 0xFF60, "print": 0xFF61, "prtsc": 0xFF61, "prtscr": 0xFF61, "prntscrn": 0xFF61,
+    "printscreen": 0xFF61, "execute": 0xFF62, "insert": 0xFF63, "help": 0xFF6A, "apps": 0xFF67,
+    "numlock": 0xFF7F, "modechange": 0xFF7E,
+    "num0": 0xFFB0, "num1": 0xFFB1, "num2": 0xFFB2, "num3": 0xFFB3, "num4": 0xFFB4, "num5": 0xFFB5,
+    "num6": 0xFFB6, "num7": 0xFFB7, "num8": 0xFFB8, "num9": 0xFFB9, "multiply": 0xFFAA, "add": 0xFFAB,
+    "separator": 0xFFAC, "subtract": 0xFFAD, "decimal": 0xFFAE, "divide": 0xFFAF,
+    **{f"f{number}": 0xFFBD + number for number in range(1, 25)},
+    "shift": 0xFFE1, "shiftleft": 0xFFE1, "shiftright": 0xFFE2,
+    "ctrl": 0xFFE3, "ctrlleft": 0xFFE3, "ctrlright": 0xFFE4, "capslock": 0xFFE5,
+    "alt": 0xFFE9, "altleft": 0xFFE9, "altright": 0xFFEA,
+    "win": 0xFFEB, "winleft": 0xFFEB, "winright": 0xFFEC, "super": 0xFFEB,
+    "space": 0x20, " ": 0x20,
+    "volumemute": 0x1008FF12, "volumedown": 0x1008FF11, "volumeup": 0x1008FF13, "playpause": 0x1008FF14,
+    "stop": 0x1008FF15, "prevtrack": 0x1008FF16, "nexttrack": 0x1008FF17, "launchmail": 0x1008FF19,
+    "browserback": 0x1008FF26, "browserforward": 0x1008FF27, "browserrefresh": 0x1008FF29,
+    "browserstop": 0x1008FF28, "browsersearch": 0x1008FF1B, "browserfavorites": 0x1008FF30,
+    "browserhome": 0x1008FF18, "sleep": 0x1008FF2F,
+}
+
+
+def char_keysym(char: str) -> int:
+    """
+    The keysym of a character: Latin-1 characters are their own keysym, the others are 0x01000000 + code point
+    """
+    keysym = KEYSYMS.get(char) if char in "\b\t\n\r" else None
+    if keysym is not None:
+        return keysym
+    code = ord(char)
+    if 0x20 <= code <= 0x7E or 0xA0 <= code <= 0xFF:
+        return code
+    return 0x01000000 | code
+
+
+def _keysym_char(keysym: int) -> str | None:
+    if 0x20 <= keysym <= 0x7E or 0xA0 <= keysym <= 0xFF:
+        return chr(keysym)
+    if keysym & 0xFF000000 == 0x01000000:
+        return chr(keysym & 0x00FFFFFF)
+    return None
+
+
+def _is_keyboard_mapping(events: bytearray, offset: int) -> bool:
+    return events[offset] & 0x7F == MAPPING_NOTIFY and events[offset + 4] != MAPPING_POINTER
+
+
+class KeyboardMapping:
+    """
+    The keyboard mapping of a connection(GetKeyboardMapping + GetModifierMapping) fetched once, with the reverse
+    indexes precomputed: character -> (keycode, modifier mask) and keysym -> (keycode, modifier mask).
+
+    The tables are fetched again only after a MappingNotify: pass the events to handle(), or call sync() to
+    take them from the connection.
+    """
+
+    def __init__(
+        self, connection, poll_interval: float = POLL_INTERVAL, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        KeyboardMapping initialization
+        ### Arguments
+        - connection (Connection): the blocking connection the tables are fetched with
+        - poll_interval (float): the least time between two reads of the socket by sync()(0: every call)
+        - clock (Callable): monotonic time source
+        ### Returns
+        - None
+        """
+        self.connection = connection
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._polled = clock()
+        self.min_keycode: int = connection.setup.min_keycode
+        self.max_keycode: int = connection.setup.max_keycode
+        self.keysyms: dict[int, tuple[int, ...]] = {}  # keycode -> keysyms of the columns
+        self.modifiers: tuple[tuple[int, ...], ...] = ()  # modifier index -> keycodes
+        self.chars: dict[str, tuple[int, int]] = {}  # character -> (keycode, mask)
+        self.symbols: dict[int, tuple[int, int]] = {}  # keysym -> (keycode, mask)
+        self.stale = True
+        self.refresh()
+
+    # -------------------------------------------------------------------------------------------------------
+    # Fetching
+    # -------------------------------------------------------------------------------------------------------
+
+    def refresh(self) -> None:
+        """
+        Fetch both tables in one round trip and rebuild the indexes
+        """
+        connection = self.connection
+        count = self.max_keycode - self.min_keycode + 1
+        keyboard = connection.request(bds.GET_KEYBOARD_MAPPING, self.min_keycode, count)
+        modifiers = connection.request(bds.GET_MODIFIER_MAPPING)
+
+        reply = keyboard.reply()
+        per_keycode = bds.GET_KEYBOARD_MAPPING.reply.get(reply, "keysyms_per_keycode")
+        values = struct.unpack_from(
+            f"{bds.BYTE_ORDER}{count * per_keycode}I", bds.GET_KEYBOARD_MAPPING.reply.tail(reply)
+        )
+        self.keysyms = {
+            self.min_keycode + index: values[index * per_keycode:(index + 1) * per_keycode] for index in range(count)
+        }
+
+        reply = modifiers.reply()
+        per_modifier = bds.GET_MODIFIER_MAPPING.reply.get(reply, "keycodes_per_modifier")
+        keycodes = bytes(bds.GET_MODIFIER_MAPPING.reply.tail(reply)[:8 * per_modifier])
+        self.modifiers = tuple(
+            tuple(keycode for keycode in keycodes[row:row + per_modifier] if keycode)
+            for row in range(0, 8 * per_modifier, per_modifier)
+        )
+        self._index()
+        self.stale = False
+
+    def _modifier_mask(self, keysym: int) -> int:
+        """
+        Mask of the modifier generated by a key with this keysym(e.g. Mode_switch), 0 if none
+        """
+        keycodes = {keycode for keycode, symbols in self.keysyms.items() if keysym in symbols}
+        for index, row in enumerate(self.modifiers):
+            if keycodes.intersection(row):
+                return MODIFIER_MASKS[index]
+        return 0
+
+    def _index(self) -> None:
+        # column -> modifiers selecting it(group 2 with Mode_switch, level 3 with ISO_Level3_Shift)
+        mode_switch = self._modifier_mask(MODE_SWITCH)
+        level3 = self._modifier_mask(ISO_LEVEL3_SHIFT)
+        columns = [0, SHIFT_MASK]
+        if mode_switch:
+            columns += [mode_switch, mode_switch | SHIFT_MASK]
+        if level3:
+            while len(columns) < 4:
+                columns.append(None)  # group 2 unreachable
+            columns += [level3, level3 | SHIFT_MASK]
+
+        symbols: dict[int, tuple[int, int]] = {}
+        # fewest modifiers first: column by column, every keycode of a column before the next column
+        for column, mask in enumerate(columns):
+            if mask is None:
+                continue
+            for keycode, keysyms in self.keysyms.items():
+                keysym = self._column(keysyms, column)
+                if keysym != NO_SYMBOL and keysym not in symbols:
+                    symbols[keysym] = (keycode, mask)
+        self.symbols = symbols
+
+        chars: dict[str, tuple[int, int]] = {}
+        for keysym, entry in symbols.items():
+            char = _keysym_char(keysym)
+            if char is not None:
+                chars.setdefault(char, entry)
+        for char in "\b\t\n\r":
+            entry = symbols.get(KEYSYMS[char])
+            if entry is not None:
+                chars[char] = entry
+        self.chars = chars
+
+    @staticmethod
+    def _column(keysyms: tuple[int, ...], column: int) -> int:
+        """
+        Keysym of a column with the rules of the core protocol: a group with a single alphabetic keysym
+        has its lowercase/uppercase forms in both columns
+        """
+        group = column & ~1
+        first = keysyms[group] if group < len(keysyms) else NO_SYMBOL
+        second = keysyms[group + 1] if group + 1 < len(keysyms) else NO_SYMBOL
+        if second == NO_SYMBOL:
+            char = _keysym_char(first)
+            if char is not None and char.lower() != char.upper() and len(char.upper()) == 1:
+                lower, upper = char_keysym(char.lower()), char_keysym(char.upper())
+                return upper if column & 1 else lower
+            return first if not column & 1 else NO_SYMBOL
+        return second if column & 1 else first
+
+    # -------------------------------------------------------------------------------------------------------
+    # MappingNotify
+    # -------------------------------------------------------------------------------------------------------
+
+    def handle(self, event: _EventType) -> bool:
+        """
+        Mark the tables stale on a keyboard or modifier MappingNotify, return back True if it was one
+        """
+        if event.type != MAPPING_NOTIFY or event.request not in (MAPPING_MODIFIER, MAPPING_KEYBOARD):
+            return False
+        self.stale = True
+        return True
+
+    def sync(self) -> None:
+        """
+        Take the keyboard and modifier MappingNotify events and fetch the tables again if they are stale. The
+        already buffered events are always looked at, the socket is read(without waiting) at most every
+        poll_interval. The other events are left in the buffer.
+        """
+        connection = self.connection
+        now = self._clock()
+        if now - self._polled >= self.poll_interval:
+            self._polled = now
+            connection.poll()
+        if MAPPING_NOTIFY in connection.events[0::MESSAGE_SIZE]:  # a copy of the codes, no Python loop
+            if connection.claim_events(_is_keyboard_mapping):
+                self.stale = True
+        if self.stale:
+            self.refresh()
+
+    # -------------------------------------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------------------------------------
+
+    def lookup(self, char: str) -> tuple[int, int] | None:
+        """
+        (keycode, modifier mask) typing a character, None if no key of the keyboard produces it
+        """
+        return self.chars.get(char)
+
+    def key(self, name: str) -> tuple[int, int] | None:
+        """
+        (keycode, modifier mask) of a key name("enter", "shift", "f5", ...) or of a single character
+        """
+        keysym = KEYSYMS.get(name.lower()) if len(name) > 1 else None
+        if keysym is not None:
+            return self.symbols.get(keysym)
+        return self.chars.get(name)
+
+    def modifier_keycode(self, mask: int) -> int | None:
+        """
+        A keycode generating the modifier of a single bit mask(e.g. the Shift_L keycode for SHIFT_MASK)
+        """
+        row = self.modifiers[mask.bit_length() - 1] if mask else ()
+        return row[0] if row else None
+
+    def __repr__(self) -> str:
+        return f"<KeyboardMapping keycodes={len(self.keysyms)} chars={len(self.chars)} stale={self.stale}>"
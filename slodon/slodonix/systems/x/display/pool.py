@@ -0,0 +1,190 @@
+# Reuse of live display connections
+import contextlib
+import os
+import select
+import socket
+import threading
+import time
+from typing import Callable, Iterator
+
+# This project
+from slodon.slodonix.systems.x.display.display import Display
+from slodon.slodonix.systems.x.errors import *
+
+__all__ = ["DisplayPool"]
+
+
+class DisplayPool:
+    """
+    Keyed pool of open displays: releasing a display keeps its connection alive so the next acquire of the
+    same display name skips the socket connect, the connection setup and the atom prefetch.
+    """
+
+    def __init__(
+        self,
+        max_per_display: int = 4,
+        idle_timeout: float = 60.0,
+        probe_after: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        DisplayPool initialization
+        ### Arguments
+        - max_per_display (int): the most displays(in use + idle) kept open per display name
+        - idle_timeout (float): idle displays older than this(in seconds) are closed
+        - probe_after (float): displays idle for longer than this are probed for EOF before reuse, the recently
+        used ones are only checked against their status flag
+        - clock (Callable): monotonic time source
+        ### Returns
+        - None
+        """
+        self.max_per_display = max_per_display
+        self.idle_timeout = idle_timeout
+        self.probe_after = probe_after
+        self._clock = clock
+        self._idle: dict[str, list[tuple[float, Display]]] = {}  # name -> (released at, display), LIFO
+        self._in_use: dict[str, int] = {}
+        self._lock = threading.Lock()  # the pool can be shared by threads, each using its own displays
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(name: str | None) -> str:
+        name = name or os.environ.get("DISPLAY")
+        if not name:
+            raise DisplayNameError("no display name and $DISPLAY is not set")
+        return name
+
+    @staticmethod
+    def _probe(display: Display) -> bool:
+        """
+        Check that the server has not closed the connection, without blocking and without getsockopt
+        """
+        sock = display.connection._connection
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            return not readable or sock.recv(1, socket.MSG_PEEK) != b""
+        except (OSError, ValueError):
+            return False
+
+    def _alive(self, display: Display, idle_for: float) -> bool:
+        connection = display.connection
+        if not connection._status or connection._connection.fileno() < 0:
+            return False
+        return idle_for < self.probe_after or self._probe(display)
+
+    def acquire(self, name: str | None = None) -> Display:
+        """
+        Return back an open display of name(os.environ["DISPLAY"] by default), reusing an idle one if possible
+        """
+        key = self._key(name)
+        now = self._clock()
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                released_at, display = idle.pop()
+                if now - released_at < self.idle_timeout and self._alive(display, now - released_at):
+                    self.hits += 1
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    return display
+                self._close(display)
+
+            if self._in_use.get(key, 0) >= self.max_per_display:
+                raise DisplayError(f"pool limit of {self.max_per_display} displays reached for {key}")
+            self.misses += 1
+            self._in_use[key] = self._in_use.get(key, 0) + 1  # reserved while connecting(outside the lock)
+
+        try:
+            return Display(display=key)
+        except BaseException:
+            with self._lock:
+                self._in_use[key] -= 1
+            raise
+
+    def release(self, display: Display) -> None:
+        """
+        Give back a display, it is reset(see Display.reset) and kept open for the next acquire
+        """
+        key = display.display_name
+        connection = display.connection
+        clean = connection._status  # a dead connection is closed(its socket is still open)
+        if clean:
+            try:
+                # the next user starts with a clean display: no cache, no selected event, no pending event or error
+                display.reset()
+                connection.sync()
+            except (OSError, ConnectionClosedError):
+                clean = False
+            else:
+                connection.take_events()
+                connection.errors.clear()
+
+        with self._lock:
+            self._in_use[key] = max(self._in_use.get(key, 0) - 1, 0)
+            idle = self._idle.setdefault(key, [])
+            keep = clean and len(idle) + self._in_use[key] < self.max_per_display
+            if keep:
+                idle.append((self._clock(), display))
+        if not keep:
+            self._close(display)
+            return
+        self.evict_idle()
+
+    @contextlib.contextmanager
+    def display(self, name: str | None = None) -> Iterator[Display]:
+        """
+        with pool.display(":0") as display: ...
+        """
+        display = self.acquire(name)
+        try:
+            yield display
+        finally:
+            self.release(display)
+
+    def evict_idle(self) -> int:
+        """
+        Close the displays idle for longer than idle_timeout, return back their number
+        """
+        deadline = self._clock() - self.idle_timeout
+        evicted = 0
+        with self._lock:
+            for key, idle in self._idle.items():
+                while idle and idle[0][0] < deadline:  # oldest first
+                    self._close(idle.pop(0)[1])
+                    evicted += 1
+        return evicted
+
+    def _close(self, display: Display) -> None:
+        self.evictions += 1
+        try:
+            display.close()
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        """
+        Close every idle display
+        """
+        with self._lock:
+            for idle in self._idle.values():
+                for _, display in idle:
+                    self._close(display)
+            self._idle.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "idle": sum(len(idle) for idle in self._idle.values()),
+            "in_use": sum(self._in_use.values()),
+        }
+
+    def __enter__(self) -> "DisplayPool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
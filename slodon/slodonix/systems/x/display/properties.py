@@ -0,0 +1,203 @@
+# https://tronche.com/gui/x/xlib/window-information/XGetWindowProperty.html
+# https://specifications.freedesktop.org/wm-spec/latest/ar01s03.html (_NET_CLIENT_LIST)
+# https://tronche.com/gui/x/icccm/sec-4.html#s-4.1.2 (WM_NAME, WM_CLASS)
+from __future__ import annotations
+
+import struct
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+
+# This project
+from slodon.slodonix.systems.x.protocol import bds
+
+if TYPE_CHECKING:
+    from slodon.slodonix.systems.x.display.display import Display
+
+__all__ = ["WindowTable", "fetch_window_properties", "DEFAULT_PROPERTIES", "GEOMETRY_COLUMNS", "PROPERTY_DECODERS"]
+
+DEFAULT_PROPERTIES: tuple[str, ...] = ("WM_NAME", "_NET_WM_NAME", "WM_CLASS", "_NET_WM_PID", "_NET_WM_STATE")
+GEOMETRY_COLUMNS: tuple[str, ...] = ("x", "y", "width", "height")  # x, y in root coordinates
+
+_PROPERTY_LENGTH = 1024  # longest value fetched, in 4-byte units(longer values are truncated)
+_FORMATS = {8: "B", 16: "H", 32: "I"}
+
+
+def _cardinals(format: int, value: bytes) -> tuple[int, ...]:
+    return struct.unpack(f"{bds.BYTE_ORDER}{len(value) // (format // 8)}{_FORMATS[format]}", value)
+
+
+def _text(type_name: str, format: int, value: bytes):
+    if format != 8:
+        return _cardinals(format, value)
+    return value.decode("utf-8" if type_name == "UTF8_STRING" else "latin-1", errors="replace")
+
+
+def _wm_class(type_name: str, format: int, value: bytes):
+    # instance and class, both null-terminated
+    parts = value.split(b"\0")
+    return (parts[0].decode("latin-1"), parts[1].decode("latin-1") if len(parts) > 1 else "")
+
+
+def _first_cardinal(type_name: str, format: int, value: bytes):
+    values = _cardinals(format, value)
+    return values[0] if values else None
+
+
+def _default(type_name: str, format: int, value: bytes):
+    if format == 8:
+        return _text(type_name, format, value)
+    return _cardinals(format, value)
+
+
+# property name -> decoder(type name, format, raw value), atom lists are turned into names afterwards
+PROPERTY_DECODERS: dict[str, Callable] = {
+    "WM_NAME": _text,
+    "WM_ICON_NAME": _text,
+    "_NET_WM_NAME": _text,
+    "_NET_WM_VISIBLE_NAME": _text,
+    "WM_CLASS": _wm_class,
+    "WM_WINDOW_ROLE": _text,
+    "_NET_WM_PID": _first_cardinal,
+    "_NET_WM_DESKTOP": _first_cardinal,
+}
+
+
+class WindowTable:
+    """
+    Columnar snapshot of many windows: one list per property(or geometry field), aligned with `ids`.
+    A missing property(or a window destroyed during the fetch) is None.
+    """
+
+    __slots__ = ("ids", "columns")
+
+    def __init__(self, ids: list[int], columns: dict[str, list]) -> None:
+        self.ids = ids
+        self.columns = columns
+
+    def __getitem__(self, column: str) -> list:
+        return self.columns[column]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, index: int) -> dict:
+        """
+        Every column of a single window
+        """
+        return {"id": self.ids[index], **{name: column[index] for name, column in self.columns.items()}}
+
+    def rows(self) -> Iterator[dict]:
+        return (self.row(index) for index in range(len(self.ids)))
+
+    def __repr__(self) -> str:
+        return f"<WindowTable windows={len(self.ids)} columns={list(self.columns)}>"
+
+
+def _managed_windows(display: Display, root: int) -> list[int]:
+    """
+    _NET_CLIENT_LIST of the window manager, the children of the root window without one
+    """
+    connection = display.connection
+    client_list = display.atoms.intern("_NET_CLIENT_LIST")
+    reply = connection.request(bds.GET_PROPERTY, False, root, client_list, 0, 0, 1 << 16).reply()
+    if bds.GET_PROPERTY.reply.get(reply, "format") == 32:
+        value_len = bds.GET_PROPERTY.reply.get(reply, "value_len")
+        return list(_cardinals(32, bytes(bds.GET_PROPERTY.reply.tail(reply)[:value_len * 4])))
+
+    reply = connection.request(bds.QUERY_TREE, root).reply()
+    children_len = bds.QUERY_TREE.reply.get(reply, "children_len")
+    return list(struct.unpack_from(f"{bds.BYTE_ORDER}{children_len}I", bds.QUERY_TREE.reply.tail(reply)))
+
+
+def fetch_window_properties(
+    display: Display,
+    properties: Iterable[str] = DEFAULT_PROPERTIES,
+    windows: Iterable[int] | None = None,
+    geometry: bool = True,
+    root: int | None = None,
+) -> WindowTable:
+    """
+    Fetch a set of properties of many windows with a single flush
+    ### Arguments
+    - display (Display): the display of the windows
+    - properties (Iterable): the property names, one column each
+    - windows (Iterable): the windows, the managed windows(_NET_CLIENT_LIST) by default
+    - geometry (bool): add the x, y(root coordinates), width and height columns
+    - root (int): the root window, the root of the first screen by default
+    ### Returns
+    - WindowTable
+    """
+    connection = display.connection
+    atoms = display.atoms
+    root = root if root is not None else connection.setup.roots[0]
+    properties = tuple(properties)
+    windows = list(windows) if windows is not None else _managed_windows(display, root)
+
+    atoms.prefetch(properties)
+    property_atoms = [atoms.intern(name) for name in properties]
+
+    # every request of every window is queued before the first reply is read
+    request = connection.request
+    cookies = []
+    for window in windows:
+        row = [request(bds.GET_PROPERTY, False, window, atom, 0, 0, _PROPERTY_LENGTH) for atom in property_atoms]
+        if geometry:
+            row.append(request(bds.GET_GEOMETRY, window))
+            row.append(request(bds.TRANSLATE_COORDINATES, window, root, 0, 0))
+        cookies.append(row)
+
+    raw: dict[str, list] = {name: [] for name in properties}  # (type, format, value) or None
+    columns: dict[str, list] = {name: [] for name in (*properties, *(GEOMETRY_COLUMNS if geometry else ()))}
+    reply_layout = bds.GET_PROPERTY.reply
+    for row in cookies:
+        for name, cookie in zip(properties, row):
+            reply = cookie.reply(check=False)
+            format = reply_layout.get(reply, "format") if reply is not None else 0
+            if not format:  # the window is gone or the property is not set
+                raw[name].append(None)
+                continue
+            value_len = reply_layout.get(reply, "value_len")
+            value = bytes(reply_layout.tail(reply)[:value_len * (format // 8)])
+            raw[name].append((reply_layout.get(reply, "type"), format, value))
+
+        if geometry:
+            # a reply is only valid until the next one is read, decode it right away
+            reply = row[-2].reply(check=False)
+            size = None if reply is None else (
+                bds.GET_GEOMETRY.reply.get(reply, "width"), bds.GET_GEOMETRY.reply.get(reply, "height")
+            )
+            reply = row[-1].reply(check=False)
+            if size is None or reply is None:
+                for name in GEOMETRY_COLUMNS:
+                    columns[name].append(None)
+                continue
+            columns["x"].append(bds.TRANSLATE_COORDINATES.reply.get(reply, "dst_x"))
+            columns["y"].append(bds.TRANSLATE_COORDINATES.reply.get(reply, "dst_y"))
+            columns["width"].append(size[0])
+            columns["height"].append(size[1])
+
+    # the names of the types and of the atom values are looked up in one more batch, if not cached yet
+    atom_type = atoms.intern("ATOM")
+    unknown = set()
+    for values in raw.values():
+        for entry in values:
+            if entry is not None:
+                unknown.add(entry[0])
+                if entry[0] == atom_type:
+                    unknown.update(_cardinals(32, entry[2]))
+    atoms.prefetch_names(unknown)
+
+    for name, values in raw.items():
+        decoder = PROPERTY_DECODERS.get(name, _default)
+        column = columns[name]
+        for entry in values:
+            if entry is None:
+                column.append(None)
+            elif entry[0] == atom_type:
+                column.append(tuple(atoms.name(atom) for atom in _cardinals(32, entry[2])))
+            else:
+                column.append(decoder(atoms.name(entry[0]), entry[1], entry[2]))
+
+    return WindowTable(windows, columns)
@@ -0,0 +1,140 @@
+# https://www.x.org/releases/X11R7.7/doc/recordproto/record.html
+from __future__ import annotations
+
+import struct
+import time
+from typing import TYPE_CHECKING
+
+# This project
+from slodon.slodonix.systems.input.recorder import Recorder
+from slodon.slodonix.systems.x.errors import *
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.bds import MESSAGE_SIZE
+from slodon.slodonix.systems.x.protocol.connect import Connection
+
+if TYPE_CHECKING:
+    from slodon.slodonix.systems.x.display.display import Display
+
+__all__ = ["InputCapture"]
+
+ALL_CLIENTS = 3  # XRecordAllClients
+# category of the RecordEnableContext replies
+FROM_SERVER = 0
+START_OF_DATA = 4
+END_OF_DATA = 5
+
+KEY_PRESS = 2
+MOTION_NOTIFY = 6
+
+# RECORDRANGE: core requests, core replies, extension requests, extension replies(2 + 2 + 6 + 6 bytes),
+# delivered events, device events, errors, client started, client died
+_RANGE = struct.Struct(bds.BYTE_ORDER + "18xBB2xBB")
+_CARD32 = struct.Struct(bds.BYTE_ORDER + "I")
+_EVENT = struct.Struct(bds.BYTE_ORDER + "BBxxI12xhh")  # code, detail, time, root_x, root_y
+_DATA_OFFSET = bds.RECORD_ENABLE_CONTEXT.reply.size
+
+
+class InputCapture:
+    """
+    Records the real keyboard and pointer input of every client with the RECORD extension.
+
+    The intercepted data arrives on a second connection(RecordEnableContext answers with a reply for every
+    batch of events until the context is disabled), the device events are appended to a Recorder with the
+    times of the server.
+    """
+
+    def __init__(self, display: Display, recorder: Recorder) -> None:
+        """
+        InputCapture initialization
+        ### Arguments
+        - display (Display): the recorded display, it controls the context
+        - recorder (Recorder): receives the input
+        ### Returns
+        - None
+        """
+        connection = self.connection = display.connection
+        if connection.extension("RECORD") is None:
+            raise DisplayError("the RECORD extension is not available")
+        self.recorder = recorder
+        connection.request(bds.RECORD_QUERY_VERSION, 1, 13).reply()
+
+        self.context = connection.xid.alloc()
+        connection.request(
+            bds.RECORD_CREATE_CONTEXT, self.context, 0, 1, 1,
+            tail=_CARD32.pack(ALL_CLIENTS) + _RANGE.pack(KEY_PRESS, MOTION_NOTIFY, 0, 0),
+        )
+        connection.sync()  # the context must exist before the data connection enables it
+
+        self.data = Connection(display.display_name)
+        self.data.query_extensions("RECORD")
+        self._server_start: int | None = None  # server time of StartOfData
+        self._start = 0.0  # recorder time of StartOfData
+        self.enabled = True
+        self.received = 0
+        self.error: BaseException | None = None  # why the interception stopped before close()
+        self.data.request_stream(
+            bds.RECORD_ENABLE_CONTEXT, self.context, callback=self._intercepted, failed=self._failed
+        )
+        self.data.flush()
+
+    def _intercepted(self, reply: bytes) -> bool:
+        category = reply[1]
+        if category == START_OF_DATA:
+            self._server_start = bds.RECORD_ENABLE_CONTEXT.reply.get(reply, "server_time")
+            self._start = self.recorder.elapsed()
+        elif category == FROM_SERVER and self._server_start is not None:
+            append = self.recorder.append
+            for offset in range(_DATA_OFFSET, len(reply) - MESSAGE_SIZE + 1, MESSAGE_SIZE):
+                code, detail, server_time, x, y = _EVENT.unpack_from(reply, offset)
+                code &= 0x7F
+                if KEY_PRESS <= code <= MOTION_NOTIFY:
+                    at = self._start + ((server_time - self._server_start) & 0xFFFFFFFF) / 1000
+                    if code == MOTION_NOTIFY:
+                        append(code, 0, x, y, at)
+                    else:
+                        append(code, detail, 0, 0, at)
+                    self.received += 1
+        elif category == END_OF_DATA:
+            self.enabled = False
+            return True
+        return False
+
+    def _failed(self, error: BaseException) -> None:
+        self.enabled = False  # the context failed or the data connection is gone, nothing else will come
+        self.error = error
+
+    def poll(self, timeout: float = 0.0) -> int:
+        """
+        Record the input intercepted so far(waiting at most timeout seconds), return back the number of
+        recorded events
+        """
+        received = self.received
+        if self.enabled:
+            self.data.poll(timeout)
+        return self.received - received
+
+    def close(self, timeout: float = 1.0) -> None:
+        """
+        Disable and free the context, the input intercepted until then is recorded
+        """
+        if self.context is None:
+            return
+        connection = self.connection
+        connection.request(bds.RECORD_DISABLE_CONTEXT, self.context)
+        connection.request(bds.RECORD_FREE_CONTEXT, self.context)
+        connection.flush()
+        deadline = time.monotonic() + timeout
+        while self.enabled and time.monotonic() < deadline:
+            self.data.poll(deadline - time.monotonic())
+        self.data.close()
+        connection.xid.free(self.context)
+        self.context = None
+
+    def __enter__(self) -> InputCapture:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<InputCapture context={self.context} received={self.received}>"
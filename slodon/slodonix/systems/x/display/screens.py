@@ -0,0 +1,211 @@
+# Screens of the connection setup and the monitor layout of a screen
+# https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#server_information
+from __future__ import annotations
+
+from typing import Iterable, Iterator, NamedTuple
+
+import numpy as np
+
+# This project
+from slodon.slodonix.systems.x.protocol import bds
+
+__all__ = ["Screen", "Monitor", "MonitorLayout", "parse_screens"]
+
+
+class Screen(NamedTuple):
+    """
+    A screen of the display, as described by the connection setup
+    """
+
+    number: int
+    root: int
+    width: int
+    height: int
+    width_mm: int
+    height_mm: int
+    root_depth: int
+    root_visual: int
+    default_colormap: int
+    white_pixel: int
+    black_pixel: int
+
+
+class Monitor(NamedTuple):
+    """
+    A rectangle of the root window shown by a monitor(RandR monitor, Xinerama screen, or the whole screen)
+    """
+
+    name: str
+    x: int
+    y: int
+    width: int
+    height: int
+    width_mm: int = 0
+    height_mm: int = 0
+    primary: bool = False
+
+
+def parse_screens(setup) -> tuple[Screen, ...]:
+    """
+    Decode the screens of the connection setup(see connect.Setup)
+    """
+    data = setup.data
+    offset = setup.screens_offset
+    screens = []
+    for number in range(len(setup.roots)):
+        (root, colormap, white, black, _, width, height, width_mm, height_mm, _, _, visual, _, _, depth,
+         depths_len) = bds.SCREEN.unpack_from(data, offset)
+        screens.append(Screen(number, root, width, height, width_mm, height_mm, depth, visual, colormap, white, black))
+        offset += bds.SCREEN.size
+        for _ in range(depths_len):
+            offset += bds.DEPTH.size + bds.DEPTH.get(data, "visuals_len", offset) * bds.VISUAL.size
+    return tuple(screens)
+
+
+class MonitorLayout:
+    """
+    The monitors of a screen, immutable. The rectangles are also kept as a read-only (n, 4) int32 array, so the
+    lookups of many points are a single broadcast comparison.
+
+    When monitors overlap(mirrored outputs), a point belongs to the first one listed.
+    """
+
+    __slots__ = ("monitors", "rects", "_low", "_high", "_edges")
+
+    def __init__(self, monitors: Iterable[Monitor]) -> None:
+        """
+        MonitorLayout initialization
+        ### Arguments
+        - monitors (Iterable[Monitor]): at least one monitor
+        ### Returns
+        - None
+        """
+        self.monitors: tuple[Monitor, ...] = tuple(monitors)
+        if not self.monitors:
+            raise ValueError("a monitor layout needs at least one monitor")
+        rects = np.array([monitor[1:5] for monitor in self.monitors], dtype=np.int32)
+        self._low = rects[:, :2].astype(np.int64)
+        self._high = self._low + rects[:, 2:]  # exclusive
+        for array in (rects, self._low, self._high):
+            array.flags.writeable = False
+        self.rects = rects
+        self._edges = tuple((x, y, x + width, y + height) for x, y, width, height in rects.tolist())
+
+    @property
+    def primary(self) -> int:
+        """
+        Index of the primary monitor(the first one if none is marked)
+        """
+        return next((index for index, monitor in enumerate(self.monitors) if monitor.primary), 0)
+
+    @property
+    def bounds(self) -> tuple[int, int, int, int]:
+        """
+        (x, y, width, height) of the smallest rectangle containing every monitor
+        """
+        x, y = self._low.min(axis=0).tolist()
+        right, bottom = self._high.max(axis=0).tolist()
+        return x, y, right - x, bottom - y
+
+    @staticmethod
+    def _points(points) -> tuple[np.ndarray, bool]:
+        points = np.asarray(points)
+        return points.reshape(-1, 2).astype(np.int64, copy=False), points.ndim == 1
+
+    def _nearest(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        # distance to every rectangle along each axis, 0 inside
+        low, high = self._low, self._high - 1
+        dx = np.maximum(np.maximum(low[:, 0] - x, x - high[:, 0]), 0)
+        dy = np.maximum(np.maximum(low[:, 1] - y, y - high[:, 1]), 0)
+        return (dx * dx + dy * dy).argmin(axis=1)
+
+    def locate(self, points, nearest: bool = False):
+        """
+        Index of the monitor showing each point
+        ### Arguments
+        - points (array_like): an (x, y) point or (n, 2) points of the root window
+        - nearest (bool): give the points outside every monitor to the closest one instead of -1
+        ### Returns
+        - int | np.ndarray: an index for a single point, an (n,) intp array otherwise
+        """
+        if len(points) == 2 and np.ndim(points) == 1:  # a single point: a few comparisons, no array
+            return self._locate_one(*map(int, points), nearest)
+        points, single = self._points(points)
+        x, y = points[:, 0:1], points[:, 1:2]  # (n, 1) against the (m,) edges: an (n, m) comparison
+        low, high = self._low, self._high
+        inside = (x >= low[:, 0]) & (x < high[:, 0]) & (y >= low[:, 1]) & (y < high[:, 1])
+        indices = inside.argmax(axis=1)
+        found = inside[np.arange(len(indices)), indices]
+        if not found.all():
+            missing = ~found
+            indices[missing] = self._nearest(x[missing], y[missing]) if nearest else -1
+        return int(indices[0]) if single else indices
+
+    def _locate_one(self, x: int, y: int, nearest: bool) -> int:
+        for index, (left, top, right, bottom) in enumerate(self._edges):
+            if left <= x < right and top <= y < bottom:
+                return index
+        if not nearest:
+            return -1
+        gaps = [
+            max(left - x, x - right + 1, 0) ** 2 + max(top - y, y - bottom + 1, 0) ** 2
+            for left, top, right, bottom in self._edges
+        ]
+        return gaps.index(min(gaps))
+
+    def clamp(self, points):
+        """
+        Move each point into the closest monitor(the points already on a monitor are kept)
+        """
+        points, single = self._points(points)
+        indices = self.locate(points, nearest=True)
+        clamped = np.clip(points, self._low[indices], self._high[indices] - 1)
+        return tuple(clamped[0].tolist()) if single else clamped
+
+    def to_local(self, points) -> tuple:
+        """
+        Convert points of the root window into (monitor index, points relative to that monitor), the points
+        outside every monitor are given to the closest one
+        """
+        points, single = self._points(points)
+        indices = self.locate(points, nearest=True)
+        local = points - self._low[indices]
+        return (int(indices[0]), tuple(local[0].tolist())) if single else (indices, local)
+
+    def to_root(self, monitor, points, normalized: bool = False):
+        """
+        Convert points relative to monitors into points of the root window
+        ### Arguments
+        - monitor (int | array_like): the monitor index of all the points, or one per point
+        - points (array_like): an (x, y) point or (n, 2) points, in pixels of the monitor
+        - normalized (bool): the points are fractions(0..1) of the width and height of the monitor
+        ### Returns
+        - tuple | np.ndarray: an (x, y) tuple for a single point, an (n, 2) int64 array otherwise
+        """
+        single = np.ndim(points) == 1
+        indices = np.asarray(monitor, dtype=np.intp)
+        low = self._low[indices]
+        if normalized:
+            size = self._high[indices] - low
+            root = low + np.rint(np.asarray(points, dtype=np.float64).reshape(-1, 2) * (size - 1)).astype(np.int64)
+        else:
+            root = low + np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        return tuple(root[0].tolist()) if single else root
+
+    def __getitem__(self, index: int) -> Monitor:
+        return self.monitors[index]
+
+    def __iter__(self) -> Iterator[Monitor]:
+        return iter(self.monitors)
+
+    def __len__(self) -> int:
+        return len(self.monitors)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, MonitorLayout) and self.monitors == other.monitors
+
+    def __hash__(self) -> int:
+        return hash(self.monitors)
+
+    def __repr__(self) -> str:
+        return f"<MonitorLayout {', '.join(f'{m.name}={m.width}x{m.height}+{m.x}+{m.y}' for m in self.monitors)}>"
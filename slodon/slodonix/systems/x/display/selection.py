@@ -0,0 +1,369 @@
+# https://tronche.com/gui/x/icccm/sec-2.html (Peer-to-Peer Communication by Means of Selections)
+# https://tronche.com/gui/x/icccm/sec-2.html#s-2.7.2 (INCR Properties)
+from __future__ import annotations
+
+import struct
+import time
+from typing import TYPE_CHECKING, Callable
+
+# This project
+from slodon.slodonix.systems.x.errors import *
+from slodon.slodonix.systems.x.protocol import bds
+
+if TYPE_CHECKING:
+    from slodon.slodonix.systems.x.display.display import Display
+
+__all__ = ["SelectionOwner", "PASTE_THRESHOLD", "PASTE_KEYS"]
+
+PASTE_THRESHOLD = 2048  # type_text pastes texts of at least this many characters
+PASTE_KEYS: tuple[str, ...] = ("ctrl", "v")
+
+PROPERTY_CHANGE_MASK = 1 << 22
+CW_EVENT_MASK = 1 << 11
+INPUT_ONLY = 2  # window_class of CreateWindow
+REPLACE = 0  # mode of ChangeProperty
+APPEND = 2
+NEW_VALUE = 0  # state of PropertyNotify
+DELETED = 1
+
+PROPERTY_NOTIFY = 28
+SELECTION_CLEAR = 29
+SELECTION_REQUEST = 30
+SELECTION_NOTIFY = 31
+
+_CARD32 = struct.Struct(bds.BYTE_ORDER + "I")
+_PROPERTY_NOTIFY = bds.EVENTS[PROPERTY_NOTIFY]
+_SELECTION_CLEAR = bds.EVENTS[SELECTION_CLEAR]
+_SELECTION_REQUEST = bds.EVENTS[SELECTION_REQUEST]
+_SELECTION_NOTIFY = bds.EVENTS[SELECTION_NOTIFY]
+
+
+class _Transfer:
+    """
+    An INCR transfer in progress: the next chunk is written when the requestor deletes the property
+    """
+
+    __slots__ = ("requestor", "property", "type", "data", "offset", "mask")
+
+    def __init__(self, requestor: int, property: int, type: int, data: bytes, mask: int) -> None:
+        self.requestor = requestor
+        self.property = property
+        self.type = type
+        self.data = data
+        self.offset = 0
+        self.mask = mask  # the events this client selected on the requestor before the transfer
+
+
+class SelectionOwner:
+    """
+    Owns a selection(CLIPBOARD by default) and serves a text to the clients converting it: TARGETS, TIMESTAMP,
+    UTF8_STRING, STRING and TEXT are answered, any other target is refused. A text longer than chunk_size
+    is sent with the INCR protocol, one chunk per PropertyNotify(Deleted) of the requestor.
+
+    The owner window is an unmapped InputOnly window, the events are read from the connection buffer and
+    the events of the others are given back in their order.
+    """
+
+    def __init__(
+        self,
+        display: Display,
+        text: str,
+        selection: str = "CLIPBOARD",
+        chunk_size: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        SelectionOwner initialization
+        ### Arguments
+        - display (Display): the display of the selection
+        - text (str): the served text
+        - selection (str): the name of the selection(CLIPBOARD, PRIMARY, ...)
+        - chunk_size (int): longest property written at once(bytes), by default the longest request the
+        server accepts
+        - clock (Callable): monotonic time source
+        ### Returns
+        - None
+        """
+        self.display = display
+        self.connection = connection = display.connection
+        self.text = text
+        atoms = display.atoms
+        atoms.prefetch(("UTF8_STRING", "TARGETS", "TIMESTAMP", "TEXT", "INCR", selection))
+        self.selection = atoms[selection]
+        self._utf8 = atoms["UTF8_STRING"]
+        self._targets = atoms["TARGETS"]
+        self._timestamp = atoms["TIMESTAMP"]
+        self._incr = atoms["INCR"]
+        self._text = atoms["TEXT"]
+        self._string = atoms["STRING"]
+        self._atom = atoms["ATOM"]
+        self._integer = atoms["INTEGER"]
+
+        longest = min(connection.setup.max_request_length << 2, 0x3FFFF) - bds.CHANGE_PROPERTY.size
+        self.chunk_size = min(chunk_size or longest, longest) & ~3
+        self._clock = clock
+        self._encoded: dict[int, bytes] = {}  # type -> the text in that encoding
+        self._transfers: dict[tuple[int, int], _Transfer] = {}  # (requestor, property) -> INCR transfer
+
+        self.window = 0
+        self.time = 0  # server time of the ownership
+        self.owned = False
+        self.served = 0  # completed conversions of the text(TARGETS and TIMESTAMP are not counted)
+        self.refused = 0
+
+    # -------------------------------------------------------------------------------------------------------
+    # Ownership
+    # -------------------------------------------------------------------------------------------------------
+
+    def acquire(self, timeout: float = 1.0) -> int:
+        """
+        Create the owner window and become the owner of the selection, return back the server time of the
+        ownership. The time is obtained from the PropertyNotify of a zero-length append(ICCCM 2.1), not
+        CurrentTime.
+        """
+        connection = self.connection
+        request = connection.request
+        self.window = window = connection.xid.alloc()
+        request(
+            bds.CREATE_WINDOW, 0, window, connection.setup.roots[0], -1, -1, 1, 1, 0, INPUT_ONLY, 0,
+            CW_EVENT_MASK, tail=_CARD32.pack(PROPERTY_CHANGE_MASK),
+        )
+        request(bds.CHANGE_PROPERTY, APPEND, window, self._timestamp, self._integer, 32, 0)
+
+        deadline = self._clock() + timeout
+        while not self.time:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                self.close()
+                raise DisplayError("no PropertyNotify received for the selection timestamp")
+            for offset, events in self._take(remaining):
+                self._handle(events, offset)
+
+        request(bds.SET_SELECTION_OWNER, window, self.selection, self.time)
+        owner = bds.GET_SELECTION_OWNER.reply.get(request(bds.GET_SELECTION_OWNER, self.selection).reply(), "owner")
+        if owner != window:
+            self.close()
+            raise DisplayError("the selection ownership was not granted")
+        self.owned = True
+        return self.time
+
+    def close(self) -> None:
+        """
+        Give up the selection(if still owned) and destroy the owner window
+        """
+        if not self.window:
+            return
+        connection = self.connection
+        if self.owned:
+            connection.request(bds.SET_SELECTION_OWNER, 0, self.selection, self.time)
+            self.owned = False
+        for transfer in list(self._transfers.values()):
+            self._end(transfer)
+        connection.request(bds.DESTROY_WINDOW, self.window)
+        connection.flush()
+        connection.xid.free(self.window)
+        self.window = 0
+
+    # -------------------------------------------------------------------------------------------------------
+    # Events
+    # -------------------------------------------------------------------------------------------------------
+
+    @property
+    def busy(self) -> bool:
+        """
+        True while an INCR transfer is in progress
+        """
+        return bool(self._transfers)
+
+    def serve(self, timeout: float, until: Callable[[SelectionOwner], bool] | None = None) -> bool:
+        """
+        Answer the selection requests for at most timeout seconds
+        ### Arguments
+        - timeout (float): seconds
+        - until (Callable): stop as soon as it returns True, by default once the text has been served once
+        and no INCR transfer is left
+        ### Returns
+        - bool: True if stopped by until, False on timeout or when the ownership is lost
+        """
+        if until is None:
+            until = _served_once
+        deadline = self._clock() + timeout
+        while self.owned or self._transfers:
+            if until(self):
+                return True
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return False
+            for offset, events in self._take(remaining):
+                self._handle(events, offset)
+            self.connection.flush()
+        return until(self)
+
+    def _take(self, timeout: float) -> list[tuple[int, bytearray]]:
+        """
+        Wait for the events of the selection(the already buffered ones first), the others are given back
+        """
+        ours = self._split()
+        if not ours:
+            self.connection.poll(timeout)
+            ours = self._split()
+        return ours
+
+    def _split(self) -> list[tuple[int, bytearray]]:
+        ours = []
+
+        def claim(events: bytearray, offset: int) -> bool:
+            if self._mine(events, offset):
+                ours.append((offset, events))
+                return True
+            return False
+
+        self.connection.claim_events(claim)
+        return ours
+
+    def _mine(self, events: bytearray, offset: int) -> bool:
+        code = events[offset] & 0x7F
+        if code == SELECTION_REQUEST:
+            return _SELECTION_REQUEST.get(events, "owner", offset) == self.window
+        if code == SELECTION_CLEAR:
+            return _SELECTION_CLEAR.get(events, "owner", offset) == self.window
+        if code == PROPERTY_NOTIFY:
+            window = _PROPERTY_NOTIFY.get(events, "window", offset)
+            return window == self.window or (window, _PROPERTY_NOTIFY.get(events, "atom", offset)) in self._transfers
+        return False
+
+    def _handle(self, events: bytearray, offset: int) -> None:
+        code = events[offset] & 0x7F
+        if code == SELECTION_REQUEST:
+            self._convert(*_SELECTION_REQUEST.unpack_from(events, offset)[2:])
+        elif code == SELECTION_CLEAR:
+            if _SELECTION_CLEAR.get(events, "selection", offset) == self.selection:
+                self.owned = False
+        else:
+            _, _, window, atom, event_time, state = _PROPERTY_NOTIFY.unpack_from(events, offset)
+            if window == self.window:
+                if not self.time and atom == self._timestamp:
+                    self.time = event_time
+            elif state == DELETED:
+                transfer = self._transfers.get((window, atom))
+                if transfer is not None:  # None: a late event of a completed transfer
+                    self._next_chunk(transfer)
+
+    # -------------------------------------------------------------------------------------------------------
+    # Conversions
+    # -------------------------------------------------------------------------------------------------------
+
+    def _encode(self, target: int) -> tuple[int, bytes] | None:
+        """
+        (type, data) of the text converted to target, None if the target is not supported
+        """
+        if target in (self._utf8, self._text):
+            target = self._utf8
+        elif target != self._string:
+            return None
+        data = self._encoded.get(target)
+        if data is None:
+            if target == self._utf8:
+                data = self.text.encode()
+            else:
+                data = self.text.encode("latin-1", errors="replace")
+            self._encoded[target] = data
+        return target, data
+
+    def _convert(self, request_time: int, owner: int, requestor: int, selection: int, target: int,
+                 property: int) -> None:
+        """
+        Answer a SelectionRequest, always with a SelectionNotify(property None when refused)
+        """
+        request = self.connection.request
+        if not property:
+            property = target  # obsolete clients(ICCCM 2.2)
+
+        if selection != self.selection or not self.owned or (request_time and request_time < self.time):
+            property = 0
+        elif target == self._targets:
+            targets = (self._targets, self._timestamp, self._utf8, self._text, self._string)
+            request(
+                bds.CHANGE_PROPERTY, REPLACE, requestor, property, self._atom, 32, len(targets),
+                tail=struct.pack(f"{bds.BYTE_ORDER}{len(targets)}I", *targets),
+            )
+        elif target == self._timestamp:
+            request(
+                bds.CHANGE_PROPERTY, REPLACE, requestor, property, self._integer, 32, 1, tail=_CARD32.pack(self.time)
+            )
+        else:
+            converted = self._encode(target)
+            if converted is None:
+                property = 0
+            else:
+                type, data = converted
+                if len(data) <= self.chunk_size:
+                    request(bds.CHANGE_PROPERTY, REPLACE, requestor, property, type, 8, len(data), tail=data)
+                    self.served += 1
+                else:
+                    # the chunks are written on the PropertyNotify(Deleted) events of the requestor
+                    mask = self._select_property_change(requestor)
+                    request(
+                        bds.CHANGE_PROPERTY, REPLACE, requestor, property, self._incr, 32, 1,
+                        tail=_CARD32.pack(len(data)),
+                    )
+                    self._transfers[(requestor, property)] = _Transfer(requestor, property, type, data, mask)
+
+        if not property:
+            self.refused += 1
+        event = _SELECTION_NOTIFY.struct.pack(SELECTION_NOTIFY, 0, request_time, requestor, selection, target, property)
+        request(bds.SEND_EVENT, False, requestor, 0, tail=event)
+
+    def _next_chunk(self, transfer: _Transfer) -> None:
+        chunk = transfer.data[transfer.offset:transfer.offset + self.chunk_size]
+        request = self.connection.request
+        request(bds.CHANGE_PROPERTY, REPLACE, transfer.requestor, transfer.property, transfer.type, 8, len(chunk),
+                tail=chunk)
+        transfer.offset += len(chunk)
+        if not chunk:  # the closing zero-length chunk, the transfer is complete
+            self._end(transfer)
+            self.served += 1
+
+    def _select_property_change(self, requestor: int) -> int:
+        """
+        Add PropertyChange to the events this client selects on a requestor, return back the previous mask.
+        A client has a single event mask per window(e.g. the one of a WindowTree following the requestor),
+        it is read from the server and restored by _end.
+        """
+        for transfer in self._transfers.values():
+            if transfer.requestor == requestor:  # already selected for another property
+                return transfer.mask
+        connection = self.connection
+        reply = connection.request(bds.GET_WINDOW_ATTRIBUTES, requestor).reply(check=False)
+        mask = bds.GET_WINDOW_ATTRIBUTES.reply.get(reply, "your_event_mask") if reply is not None else 0
+        if not mask & PROPERTY_CHANGE_MASK:
+            connection.request(
+                bds.CHANGE_WINDOW_ATTRIBUTES, requestor, CW_EVENT_MASK, tail=_CARD32.pack(mask | PROPERTY_CHANGE_MASK)
+            )
+        return mask
+
+    def _end(self, transfer: _Transfer) -> None:
+        """
+        Forget a transfer, the event mask of the requestor is restored after its last transfer
+        """
+        del self._transfers[(transfer.requestor, transfer.property)]
+        if transfer.mask & PROPERTY_CHANGE_MASK:
+            return
+        if all(other.requestor != transfer.requestor for other in self._transfers.values()):
+            self.connection.request(
+                bds.CHANGE_WINDOW_ATTRIBUTES, transfer.requestor, CW_EVENT_MASK, tail=_CARD32.pack(transfer.mask)
+            )
+
+    def __enter__(self) -> SelectionOwner:
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<SelectionOwner window={self.window:#x} owned={self.owned} served={self.served}>"
+
+
+def _served_once(owner: SelectionOwner) -> bool:
+    return owner.served > 0 and not owner.busy
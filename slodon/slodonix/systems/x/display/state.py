@@ -0,0 +1,221 @@
+# Display geometry and pointer position cached on the client
+# https://gitlab.freedesktop.org/xorg/proto/xorgproto/-/blob/master/randrproto.txt
+from __future__ import annotations
+
+import struct
+import time
+from typing import TYPE_CHECKING, Callable
+
+# This project
+from slodon.slodonix.systems.x.display.screens import Monitor, MonitorLayout
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.bds import EVENTS
+
+if TYPE_CHECKING:
+    from slodon.slodonix.systems.x.display.display import Display
+
+__all__ = ["DisplayState", "STATE_EVENT_MASK", "POINTER_TTL"]
+
+# https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#Encoding::Common_Types (SETofEVENT)
+ENTER_WINDOW_MASK = 1 << 4
+LEAVE_WINDOW_MASK = 1 << 5
+POINTER_MOTION_MASK = 1 << 6
+STRUCTURE_NOTIFY_MASK = 1 << 17
+STATE_EVENT_MASK = ENTER_WINDOW_MASK | LEAVE_WINDOW_MASK | POINTER_MOTION_MASK | STRUCTURE_NOTIFY_MASK
+
+# RRSelectInput: RRScreenChangeNotifyMask | RRCrtcChangeNotifyMask | RROutputChangeNotifyMask
+RR_NOTIFY_MASK = 1 | 2 | 4
+
+# seconds a pointer position is trusted without an event: the root window misses the motion over client windows
+POINTER_TTL = 0.5
+
+MOTION_NOTIFY = 6
+ENTER_NOTIFY = 7
+LEAVE_NOTIFY = 8
+CONFIGURE_NOTIFY = 22
+_POINTER_EVENTS = (MOTION_NOTIFY, ENTER_NOTIFY, LEAVE_NOTIFY)
+
+_MOTION = EVENTS[MOTION_NOTIFY]  # the crossing events have root_x/root_y at the same offsets
+_CONFIGURE = EVENTS[CONFIGURE_NOTIFY]
+_MONITOR = struct.Struct(bds.BYTE_ORDER + "IBBHhhHHII")  # MONITORINFO without the outputs
+_XINERAMA_SCREEN = struct.Struct(bds.BYTE_ORDER + "hhHH")
+
+
+class DisplayState:
+    """
+    Screen size, monitor layout and pointer position of a display, cached so the input never waits for a
+    query.
+
+    Each value is fetched once, then kept current by the events: RRScreenChangeNotify(and the other RandR
+    notifications) and the ConfigureNotify of the root window for the geometry, the pointer events of the root
+    window for the pointer, and the moves sent by the display itself(see moved). The events are read without
+    blocking when a value is used, nothing else makes a round trip.
+
+    The pointer events of the root window are only reported while the pointer is not over a client window
+    that takes them: a position nobody confirmed for pointer_ttl seconds is queried again(None trusts it until
+    an event or invalidate(), which is only right while nothing else moves the pointer).
+    """
+
+    def __init__(
+        self, display: Display, pointer_ttl: float | None = POINTER_TTL, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        DisplayState initialization
+        ### Arguments
+        - display (Display): the display of the state
+        - pointer_ttl (float): seconds a pointer position is used without any event confirming it, None for no
+          limit
+        - clock (Callable): monotonic time source
+        ### Returns
+        - None
+        """
+        connection = self.connection = display.connection
+        self.atoms = display.atoms
+        self.screen = display.screens[0]
+        self.root: int = self.screen.root
+        self.pointer_ttl = pointer_ttl
+        self._clock = clock
+        self._size: tuple[int, int] | None = None
+        self._monitors: MonitorLayout | None = None
+        self._pointer: tuple[int, int] | None = None
+        self._pointer_time = 0.0
+        self.queries = 0  # round trips made to fetch a value
+
+        display.select_root_events(self.root, STATE_EVENT_MASK)
+        self._randr_events: tuple[int, ...] = ()
+        self._randr_monitors = False  # RRGetMonitors(RandR 1.5)
+        randr = connection.extension("RANDR")
+        self.randr_selected = randr is not None  # RandR events selected on the root window
+        if randr is not None:
+            reply = connection.request(bds.RANDR_QUERY_VERSION, 1, 5).reply()
+            _, _, _, major, minor = bds.RANDR_QUERY_VERSION.reply.unpack_from(reply)
+            self._randr_monitors = (major, minor) >= (1, 5)
+            if (major, minor) >= (1, 2):  # RRNotify needs 1.2
+                connection.request(bds.RANDR_SELECT_INPUT, self.root, RR_NOTIFY_MASK)
+                self._randr_events = (randr[1], randr[1] + 1)  # RRScreenChangeNotify, RRNotify
+            else:
+                connection.request(bds.RANDR_SELECT_INPUT, self.root, 1)
+                self._randr_events = (randr[1],)
+        connection.flush()
+
+    # -------------------------------------------------------------------------------------------------------
+    # Values
+    # -------------------------------------------------------------------------------------------------------
+
+    def size(self) -> tuple[int, int]:
+        """
+        (width, height) of the root window
+        """
+        self.sync()
+        if self._size is None:
+            self.queries += 1
+            reply = self.connection.request(bds.GET_GEOMETRY, self.root).reply()
+            self._size = bds.GET_GEOMETRY.reply.get(reply, "width"), bds.GET_GEOMETRY.reply.get(reply, "height")
+        return self._size
+
+    def monitors(self) -> MonitorLayout:
+        """
+        The active monitors: RandR monitors, Xinerama screens, or the whole root window when neither is
+        available
+        """
+        self.sync()
+        if self._monitors is None:
+            self.queries += 1
+            monitors = self._fetch_monitors()
+            if not monitors:
+                screen = self.screen
+                width, height = self.size()
+                monitors = (Monitor("screen0", 0, 0, width, height, screen.width_mm, screen.height_mm, True),)
+            self._monitors = MonitorLayout(monitors)
+        return self._monitors
+
+    def _fetch_monitors(self) -> tuple[Monitor, ...]:
+        connection = self.connection
+        if self._randr_monitors:
+            reply = connection.request(bds.RANDR_GET_MONITORS, self.root, True).reply()
+            tail = bds.RANDR_GET_MONITORS.reply.tail(reply)
+            rows = []
+            offset = 0
+            for _ in range(bds.RANDR_GET_MONITORS.reply.get(reply, "n_monitors")):
+                row = _MONITOR.unpack_from(tail, offset)
+                rows.append(row)
+                offset += _MONITOR.size + row[3] * 4  # the outputs of the monitor
+            self.atoms.prefetch_names(row[0] for row in rows if row[0])  # one round trip for every name
+            return tuple(
+                Monitor(
+                    self.atoms.name(name) if name else f"monitor{index}", x, y, width, height, width_mm, height_mm,
+                    bool(primary),
+                )
+                for index, (name, primary, _, _, x, y, width, height, width_mm, height_mm) in enumerate(rows)
+            )
+        if connection.extension("XINERAMA") is not None:
+            reply = connection.request(bds.XINERAMA_QUERY_SCREENS).reply()
+            tail = bds.XINERAMA_QUERY_SCREENS.reply.tail(reply)
+            return tuple(
+                Monitor(f"xinerama{index}", *_XINERAMA_SCREEN.unpack_from(tail, index * _XINERAMA_SCREEN.size),
+                        primary=index == 0)
+                for index in range(bds.XINERAMA_QUERY_SCREENS.reply.get(reply, "number"))
+            )
+        return ()
+
+    def pointer(self) -> tuple[int, int]:
+        """
+        x-y position of the pointer on the root window
+        """
+        self.sync()
+        if self._pointer is None or (
+            self.pointer_ttl is not None and self._clock() - self._pointer_time > self.pointer_ttl
+        ):
+            self.queries += 1
+            reply = self.connection.request(bds.QUERY_POINTER, self.root).reply()
+            self.moved(bds.QUERY_POINTER.reply.get(reply, "root_x"), bds.QUERY_POINTER.reply.get(reply, "root_y"))
+        return self._pointer
+
+    def moved(self, x: int, y: int) -> None:
+        """
+        Record a position of the pointer known without asking the server, e.g. after an XTEST motion
+        """
+        self._pointer = (x, y)
+        self._pointer_time = self._clock()
+
+    def invalidate(self) -> None:
+        """
+        Forget every value, they are fetched again on their next use
+        """
+        self._size = self._monitors = self._pointer = None
+
+    # -------------------------------------------------------------------------------------------------------
+    # Events
+    # -------------------------------------------------------------------------------------------------------
+
+    def sync(self) -> None:
+        """
+        Read whatever the server has sent(without waiting) and take the events of the state, the other events
+        are left in the buffer
+        """
+        self.connection.poll()
+        self.connection.claim_events(self.handle)
+
+    def handle(self, events: bytearray, offset: int = 0) -> bool:
+        """
+        Apply a raw event, return back True if it was one of the state
+        """
+        code = events[offset] & 0x7F
+        if code in _POINTER_EVENTS:
+            if _MOTION.get(events, "event", offset) != self.root:
+                return False
+            self.moved(_MOTION.get(events, "root_x", offset), _MOTION.get(events, "root_y", offset))
+            return True
+        if code == CONFIGURE_NOTIFY:
+            if _CONFIGURE.get(events, "window", offset) != self.root:
+                return False
+            self._size = _CONFIGURE.get(events, "width", offset), _CONFIGURE.get(events, "height", offset)
+            self._monitors = None
+            return True
+        if code in self._randr_events:
+            self._size = self._monitors = None
+            return True
+        return False
+
+    def __repr__(self) -> str:
+        return f"<DisplayState size={self._size} monitors={self._monitors} pointer={self._pointer}>"
@@ -1 +1,2 @@
 from slodon.slodonix.systems.x.errors.main import *
+from slodon.slodonix.systems.x.errors.x_error import *
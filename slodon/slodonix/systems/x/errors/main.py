@@ -1,4 +1,10 @@
-__all__ = ["DisplayNameError", "DisplayConnectionError"]
+__all__ = [
+    "DisplayError",
+    "DisplayNameError",
+    "DisplayConnectionError",
+    "ConnectionClosedError",
+    "ResourceIdError",
+]
 
 
 class DisplayError(Exception):
@@ -15,3 +21,7 @@ class DisplayConnectionError(Exception):
 
 class ConnectionClosedError(Exception):
     pass
+
+
+class ResourceIdError(Exception):
+    pass
@@ -1,9 +1,37 @@
 #: https://tronche.com/gui/x/xlib/event-handling/protocol-errors/default-handlers.html
+from __future__ import annotations
+
 from typing import TYPE_CHECKING
 
 # this project
+from slodon.slodonix.systems.x.protocol.bds import ERROR
+
 if TYPE_CHECKING:
     from slodon.slodonix.systems.x.display.display import Display
+    from slodon.slodonix.systems.x.protocol.bds import Request
+
+__all__ = [
+    "XError",
+    "XErrorEvent",
+    "ERROR_CLASSES",
+    "BadAccess",
+    "BadAlloc",
+    "BadAtom",
+    "BadColor",
+    "BadCursor",
+    "BadDrawable",
+    "BadFont",
+    "BadGC",
+    "BadIDChoice",
+    "BadImplementation",
+    "BadLength",
+    "BadMatch",
+    "BadName",
+    "BadPixmap",
+    "BadRequest",
+    "BadValue",
+    "BadWindow",
+]
 
 
 class XError(Exception):
@@ -31,6 +59,10 @@ class XError(Exception):
         self.request_code = request_code
         self.minor_code = minor_code
         self.resource_id = resource_id
+        super().__init__(
+            f"{type(self).__name__} (code {error_code}) in request {request_code}.{minor_code}, "
+            f"serial {serial}, resource id {resource_id:#x}"
+        )
 
 
 class BadAccess(XError):
@@ -137,3 +169,80 @@ class BadWindow(XError):
     A value for a window argument does not name a defined window
     """
 
+
+# error code -> class: https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#Encoding::Errors
+ERROR_CLASSES: dict[int, type[XError]] = {
+    1: BadRequest,
+    2: BadValue,
+    3: BadWindow,
+    4: BadPixmap,
+    5: BadAtom,
+    6: BadCursor,
+    7: BadFont,
+    8: BadMatch,
+    9: BadDrawable,
+    10: BadAccess,
+    11: BadAlloc,
+    12: BadColor,
+    13: BadGC,
+    14: BadIDChoice,
+    15: BadName,
+    16: BadLength,
+    17: BadImplementation,
+}
+
+
+class XErrorEvent:
+    """
+    An error sent by the server: https://tronche.com/gui/x/xlib/event-handling/protocol-errors/XSetErrorHandler.html
+
+    Keeps the raw 32 bytes, the fields are decoded and the XError exception is built only when someone
+    inspects it, so errors nobody looks at(e.g. BadWindow when probing destroyed windows) cost nothing.
+    """
+
+    __slots__ = ("raw", "sequence", "request", "display")
+
+    def __init__(self, raw: bytes, sequence: int, request: Request | None = None, display: Display = None) -> None:
+        """
+        ### Arguments
+        - raw (bytes): the 32 bytes of the error
+        - sequence (int): the full sequence number of the failed request
+        - request (Request): the layout of the failed request, if known
+        - display (Display): stored in the exception
+        """
+        self.raw = raw
+        self.sequence = sequence
+        self.request = request
+        self.display = display
+
+    @property
+    def code(self) -> int:
+        return self.raw[1]
+
+    @property
+    def resource_id(self) -> int:
+        return ERROR.get(self.raw, "bad_value")
+
+    @property
+    def major_opcode(self) -> int:
+        return ERROR.get(self.raw, "major_opcode")
+
+    @property
+    def minor_opcode(self) -> int:
+        return ERROR.get(self.raw, "minor_opcode")
+
+    @property
+    def error_class(self) -> type[XError]:
+        return ERROR_CLASSES.get(self.code, XError)
+
+    def exception(self) -> XError:
+        """
+        Build the XError exception of this error
+        """
+        return self.error_class(
+            0, self.display, self.sequence, self.code, self.major_opcode, self.minor_opcode, self.resource_id
+        )
+
+    def __repr__(self) -> str:
+        name = self.request.name if self.request is not None else self.major_opcode
+        return f"<XErrorEvent {self.error_class.__name__} request={name} sequence={self.sequence}>"
@@ -0,0 +1,142 @@
+# Event compression, works on the raw 32-byte events before any _EventType record is created
+# https://tronche.com/gui/x/xlib/event-handling/XCheckTypedWindowEvent.html (motion compression in Xt)
+import struct
+
+# This project
+from slodon.slodonix.systems.x.protocol.bds import EVENTS, MESSAGE_SIZE, BYTE_ORDER
+
+__all__ = ["EventCoalescer", "MOTION_NOTIFY", "EXPOSE"]
+
+MOTION_NOTIFY = 6
+EXPOSE = 12
+
+_MOTION_WINDOW = EVENTS[MOTION_NOTIFY].field("event")[0]
+_EXPOSE_WINDOW = EVENTS[EXPOSE].field("window")[0]
+_EXPOSE_RECT_OFFSET = EVENTS[EXPOSE].field("x")[0]
+_EXPOSE_RECT = struct.Struct(BYTE_ORDER + "HHHH")  # x, y, width, height
+_EXPOSE_COUNT = EVENTS[EXPOSE].field("count")[0]
+
+
+class EventCoalescer:
+    """
+    Filtering and compression stage of the event pipeline.
+
+    - consecutive MotionNotify events of the same window are merged(the last position is kept)
+    - overlapping Expose rectangles of the same window are merged into their bounding box(never across another
+      event)
+    - events nobody subscribed to are dropped
+
+    The batch is compacted in place, so it can be used as `connection.event_filter`.
+    """
+
+    def __init__(self, types: set[int] | None = None, motion: bool = True, expose: bool = True) -> None:
+        """
+        EventCoalescer initialization
+        ### Arguments
+        - types (set): the subscribed event types, None to keep every type
+        - motion (bool): merge consecutive MotionNotify events
+        - expose (bool): merge overlapping Expose events
+        ### Returns
+        - None
+        """
+        self.types = types
+        self.motion = motion
+        self.expose = expose
+
+        # counters
+        self.received = 0
+        self.motion_coalesced = 0
+        self.expose_coalesced = 0
+        self.dropped = 0
+
+    def __call__(self, buffer: bytearray) -> bytearray:
+        """
+        Filter and compress a batch of raw events, return back the (same, shortened) buffer
+        """
+        codes = buffer[0::MESSAGE_SIZE]
+        self.received += len(codes)
+
+        types = self.types
+        motion = self.motion
+        expose = self.expose
+        view = memoryview(buffer)
+
+        out = 0  # write offset, never ahead of the read offset
+        last_motion = -1  # write offset of the last kept event if it is a MotionNotify
+        exposes: dict[bytes, int] = {}  # window -> write offset of its last kept Expose
+        read = -MESSAGE_SIZE
+        for code in codes:
+            read += MESSAGE_SIZE
+            code &= 0x7F
+            if types is not None and code not in types:
+                self.dropped += 1
+                continue
+
+            if code == MOTION_NOTIFY and motion:
+                if last_motion >= 0 and (
+                    view[last_motion + _MOTION_WINDOW:last_motion + _MOTION_WINDOW + 4]
+                    == view[read + _MOTION_WINDOW:read + _MOTION_WINDOW + 4]
+                ):
+                    view[last_motion:last_motion + MESSAGE_SIZE] = view[read:read + MESSAGE_SIZE]
+                    self.motion_coalesced += 1
+                    continue
+                last_motion = out
+            else:
+                last_motion = -1
+
+            if code == EXPOSE and expose:
+                window = bytes(view[read + _EXPOSE_WINDOW:read + _EXPOSE_WINDOW + 4])
+                previous = exposes.get(window)
+                if previous is not None and self._merge(buffer, previous, read):
+                    self.expose_coalesced += 1
+                    continue
+                exposes[window] = out
+            elif exposes:
+                exposes.clear()  # never merged across another event, it may concern the same window
+
+            if out != read:
+                view[out:out + MESSAGE_SIZE] = view[read:read + MESSAGE_SIZE]
+            out += MESSAGE_SIZE
+
+        view.release()
+        del buffer[out:]
+        return buffer
+
+    @staticmethod
+    def _merge(buffer: bytearray, target: int, source: int) -> bool:
+        """
+        Merge the Expose rectangle at source into the one at target if they overlap(or touch). The merged event
+        takes the count of the later one: the number of Expose events still to come after it.
+        """
+        x1, y1, w1, h1 = _EXPOSE_RECT.unpack_from(buffer, target + _EXPOSE_RECT_OFFSET)
+        x2, y2, w2, h2 = _EXPOSE_RECT.unpack_from(buffer, source + _EXPOSE_RECT_OFFSET)
+        if x2 > x1 + w1 or x1 > x2 + w2 or y2 > y1 + h1 or y1 > y2 + h2:
+            return False
+
+        x, y = min(x1, x2), min(y1, y2)
+        _EXPOSE_RECT.pack_into(
+            buffer,
+            target + _EXPOSE_RECT_OFFSET,
+            x,
+            y,
+            max(x1 + w1, x2 + w2) - x,
+            max(y1 + h1, y2 + h2) - y,
+        )
+        count = source + _EXPOSE_COUNT
+        buffer[target + _EXPOSE_COUNT:target + _EXPOSE_COUNT + 2] = buffer[count:count + 2]
+        return True
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return back the counters of coalesced and dropped events
+        """
+        return {
+            "received": self.received,
+            "motion_coalesced": self.motion_coalesced,
+            "expose_coalesced": self.expose_coalesced,
+            "dropped": self.dropped,
+            "delivered": self.received - self.motion_coalesced - self.expose_coalesced - self.dropped,
+        }
+
+    def __repr__(self) -> str:
+        return f"<EventCoalescer {self.stats()}>"
@@ -1,25 +1,133 @@
 # https://tronche.com/gui/x/xlib/events/
-from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator
+
 # This project
+from slodon.slodonix.systems.x.protocol.bds import EVENTS, MESSAGE_SIZE, Event
+
 if TYPE_CHECKING:
     from slodon.slodonix.systems.x.display.display import Display
-    from slodon.slodonix.systems.x.xobjects.window import XWindow
+
+__all__ = ["decode_events", "SEND_EVENT_BIT"]
+
+SEND_EVENT_BIT = 0x80  # set in the code of events generated by SendEvent
+
+# The field used as XAnyEvent.window: https://tronche.com/gui/x/xlib/events/structures.html
+_WINDOW_FIELDS = ("event", "parent", "window", "requestor", "owner", "drawable")
+
+
+def _window_field(layout: Event) -> str | None:
+    for name in _WINDOW_FIELDS:
+        if name in layout.names:
+            return name
+    return None
+
+
+_WINDOW_FIELD: dict[str, str | None] = {}  # layout name -> name of its window field
 
 
-@dataclass
 class _EventType:
     """
     Represents an X event:
     https://tronche.com/gui/x/xlib/events/structures.html
+
+    A compact record over the raw 32 bytes of the event, the fields(`event.x`, `event.state`, ...) are
+    decoded when accessed, so the unused ones are never unpacked.
     """
 
-    type: int  # The type of event
-    serial: int  # last request processed by serve
-    send_event: bool
-    display: Display
-    window: XWindow
+    __slots__ = ("type", "display", "_buffer", "_offset", "_layout")
+
+    def __init__(self, type: int, buffer, offset: int, layout: Event, display: Display = None) -> None:
+        self.type = type  # The type of event
+        self.display = display
+        self._buffer = buffer  # the batch, it must not be modified while the record is used
+        self._offset = offset
+        self._layout = layout
+
+    @property
+    def name(self) -> str:
+        return self._layout.name
+
+    @property
+    def serial(self) -> int:
+        """
+        Last request processed by the server(lower 16 bits)
+        """
+        return self._layout.get(self._buffer, "sequence", self._offset)
+
+    @property
+    def send_event(self) -> bool:
+        return bool(self._buffer[self._offset] & SEND_EVENT_BIT)
+
+    @property
+    def window(self) -> int | None:
+        """
+        The window the event was reported relative to(XAnyEvent.window)
+        """
+        layout = self._layout
+        try:
+            field = _WINDOW_FIELD[layout.name]
+        except KeyError:
+            field = _WINDOW_FIELD[layout.name] = _window_field(layout)
+        return None if field is None else layout.get(self._buffer, field, self._offset)
+
+    def get(self, name: str):
+        """
+        Decode a single field by its layout name, even when a property shadows it(e.g. the `window` field of
+        DestroyNotify, where `event.window` is the `event` field)
+        """
+        return self._layout.get(self._buffer, name, self._offset)
+
+    def raw(self) -> memoryview:
+        """
+        The raw 32 bytes of the event
+        """
+        return memoryview(self._buffer)[self._offset:self._offset + MESSAGE_SIZE]
+
+    def fields(self) -> dict:
+        """
+        Decode every field at once
+        """
+        return dict(zip(self._layout.names, self._layout.unpack_from(self._buffer, self._offset)))
+
+    def __getattr__(self, name: str):
+        # only called for the fields of the layout(the slots are found before)
+        try:
+            return self._layout.get(self._buffer, name, self._offset)
+        except KeyError:
+            raise AttributeError(f"{self._layout.name} event has no field {name!r}") from None
+
+    def __repr__(self) -> str:
+        return f"<{self._layout.name} {self.fields()}>"
 
 
 class _XEvent:
     pass
+
+
+def decode_events(
+    buffer, layouts: dict[int, Event] = EVENTS, display: Display = None, types: set[int] | None = None
+) -> Iterator[_EventType]:
+    """
+    Turn a buffer of raw 32-byte events into a stream of _EventType records
+    ### Arguments
+    - buffer (bytearray | bytes): the raw events(a multiple of 32 bytes), it must not be modified while the
+    records are used
+    - layouts (dict): event code -> layout
+    - display (Display): stored in the records
+    - types (set): only these event types are yielded, None for every known type
+    ### Returns
+    - generator of _EventType
+    """
+    codes = buffer[0::MESSAGE_SIZE]  # the code of every event in one pass
+    get = layouts.get
+    offset = -MESSAGE_SIZE
+    for code in codes:
+        offset += MESSAGE_SIZE
+        code &= ~SEND_EVENT_BIT
+        if types is not None and code not in types:
+            continue
+        layout = get(code)
+        if layout is not None:
+            yield _EventType(code, buffer, offset, layout, display)
@@ -0,0 +1,299 @@
+# asyncio counterpart of connect.Connection
+# https://docs.python.org/3/library/asyncio-eventloop.html#working-with-socket-objects-directly
+import asyncio
+import os
+import socket
+
+# This project
+from slodon.slodonix.systems.x.errors import *
+from slodon.slodonix.systems.x.protocol.auth import get_auth
+from slodon.slodonix.systems.x.protocol.bds import *
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.events.event import decode_events
+from slodon.slodonix.systems.x.resources.xid import XIDAllocator
+from slodon.slodonix.systems.x.protocol.connect import (
+    SUPPORTED_PROTOCOLS,
+    BaseConnection,
+    Cookie,
+    Setup,
+    setup_request,
+    parse_setup,
+)
+
+__all__ = ["AsyncConnection", "AsyncCookie"]
+
+
+async def _connect(loop: asyncio.AbstractEventLoop, family: int, address) -> socket.SocketType:
+    s = socket.socket(family, socket.SOCK_STREAM)
+    s.setblocking(False)
+    if family == socket.AF_INET:
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    try:
+        await loop.sock_connect(s, address)
+    except BaseException:
+        s.close()
+        raise
+    return s
+
+
+async def _get_socket(loop: asyncio.AbstractEventLoop, display) -> socket.SocketType:
+    """
+    Make a non-blocking connection to a display(same rules as connect._get_socket)
+    """
+    display, protocol, host, dno, screen = display
+
+    assert protocol in SUPPORTED_PROTOCOLS, f"Protocol {protocol} not supported"
+
+    try:
+        if (protocol is None or protocol != "unix") and host and host != "unix":
+            return await _connect(loop, socket.AF_INET, (host, 6000 + dno))
+
+        address = "/tmp/.X11-unix/X%d" % dno
+        if not os.path.exists(address):
+            # Use abstract address.
+            address = "\0" + address
+
+        try:
+            return await _connect(loop, socket.AF_UNIX, address)
+        except socket.error:
+            if not protocol and not host:
+                # If no protocol/host was specified, fallback to TCP.
+                return await _connect(loop, socket.AF_INET, (host, 6000 + dno))
+            raise
+    except socket.error as val:
+        raise DisplayConnectionError(display, str(val))
+
+
+class AsyncCookie(Cookie):
+    """
+    Cookie of an AsyncConnection, the reply is awaitable
+    """
+
+    __slots__ = ("future",)
+
+    def __init__(self, connection: "AsyncConnection", sequence: int, request: Request) -> None:
+        super().__init__(connection, sequence, request)
+        self.future: asyncio.Future | None = None  # created only when someone awaits the reply
+
+    async def reply(self, check: bool = True) -> bytes | None:
+        return await self.connection.wait(self, check)
+
+    def __await__(self):
+        return self.reply().__await__()
+
+
+class AsyncConnection(BaseConnection):
+    """
+    Non-blocking connection to a display driven by the running event loop.
+    Replies are awaitable, events are delivered through an async iterator.
+
+    Use `await AsyncConnection.open(name)` to create one.
+    """
+
+    def __init__(self, display: str = None) -> None:
+        super().__init__(display)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._spare = WriteBuffer()  # swapped with _out while a flush is in progress
+        self._flush_lock = asyncio.Lock()
+        self._events_ready = asyncio.Event()
+        self._lost: BaseException | None = None  # the reason why the connection is not usable anymore
+        self._tasks: set[asyncio.Task] = set()  # strong references of the auto flush tasks
+        self.error_queue: asyncio.Queue = asyncio.Queue(maxsize=1024)  # unhandled errors(XErrorEvent)
+
+    @classmethod
+    async def open(cls, display: str = None) -> "AsyncConnection":
+        """
+        Connect to the display and do the connection setup without blocking the event loop
+        """
+        connection = cls(display)
+        await connection._connect()
+        return connection
+
+    async def _connect(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._connection = await _get_socket(self._loop, self._display_info)
+        self._status = True
+
+        await self._loop.sock_sendall(self._connection, setup_request(*get_auth(self._display_info)))
+        prefix = await self._recv_exact(SETUP_PREFIX.size)
+        length = SETUP_PREFIX.get(prefix, "length")
+        self.setup: Setup = parse_setup(prefix, await self._recv_exact(length * 4), self._pure_display)
+        # no XC-MISC refresh here, it would need a round trip inside alloc()
+        self.xid = XIDAllocator(self.setup.resource_id_base, self.setup.resource_id_mask)
+
+        self._loop.add_reader(self._connection.fileno(), self._on_readable)
+        self.meta = self._make_meta()
+
+    async def _recv_exact(self, n: int) -> bytes:
+        chunks = bytearray()
+        while len(chunks) < n:
+            data = await self._loop.sock_recv(self._connection, n - len(chunks))
+            if not data:
+                raise ConnectionClosedError(self._pure_display)
+            chunks += data
+        return bytes(chunks)
+
+    def _cookie(self, sequence: int, request: Request) -> AsyncCookie:
+        return AsyncCookie(self, sequence, request)
+
+    # -------------------------------------------------------------------------------------------------------
+    # Requests
+    # -------------------------------------------------------------------------------------------------------
+
+    def _auto_flush(self) -> None:
+        task = self._loop.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """
+        Send every queued request in one sock_sendall, requests queued meanwhile go to the next flush
+        """
+        async with self._flush_lock:
+            if not len(self._out):
+                return
+            if self._lost is not None:
+                raise self._lost
+
+            out, self._out = self._out, self._spare
+            self._flushed = self._sequence
+            try:
+                with out.view() as view:
+                    await self._loop.sock_sendall(self._connection, view)
+            finally:
+                out.clear()
+                self._spare = out
+
+    async def wait(self, cookie: AsyncCookie, check: bool = True) -> bytes | None:
+        """
+        Return back the raw reply of the cookie(flushes the queue if needed).
+        If the request failed its XError is raised, or None is returned back if check is False.
+        """
+        if not cookie.done:
+            if self._lost is not None:
+                raise self._lost
+            if cookie.future is None:
+                cookie.future = self._loop.create_future()
+            if cookie.sequence > self._flushed:
+                await self.flush()
+            await cookie.future
+
+        if cookie._error is not None:
+            if check:
+                raise cookie.error().exception()
+            return None
+        return cookie._reply
+
+    async def sync(self) -> None:
+        """
+        Make a round trip, every error of the already queued requests is received after it
+        """
+        await self.request(bds.GET_INPUT_FOCUS).reply()
+
+    async def query_extensions(self, *names: str) -> None:
+        """
+        Query many extensions in one round trip, extension requests can be queued only after this
+        """
+        for name, cookie in self._queue_extension_queries(names):
+            self._store_extension(name, await cookie.reply())
+
+    # -------------------------------------------------------------------------------------------------------
+    # Responses
+    # -------------------------------------------------------------------------------------------------------
+
+    def _on_readable(self) -> None:
+        """
+        Reader callback of the event loop
+        """
+        try:
+            received = self._ring.recv_into(self._connection)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as error:
+            self._connection_lost(DisplayConnectionError(self._pure_display, str(error)))
+            return
+
+        if not received:
+            self._connection_lost(ConnectionClosedError(self._pure_display))
+            return
+        self._drain()  # replies are awaited later, they are always copied out of the buffer
+
+    def _completed(self, cookie: AsyncCookie) -> None:
+        if cookie.future is not None and not cookie.future.done():
+            cookie.future.set_result(None)
+
+    def _event_received(self) -> None:
+        self._events_ready.set()
+
+    def _unhandled_error(self, error: XErrorEvent) -> None:
+        # never block the reader callback: a synchronous error_handler still wins, otherwise the errors are
+        # queued for next_error() and the oldest ones are dropped if nobody reads them
+        if self.error_handler is not None:
+            self.error_handler(error)
+            return
+        if self.error_queue.full():
+            self.error_queue.get_nowait()
+        self.error_queue.put_nowait(error)
+
+    async def next_error(self) -> XErrorEvent:
+        """
+        Wait for the next error of a request nobody waits for
+        """
+        return await self.error_queue.get()
+
+    def _connection_lost(self, error: BaseException) -> None:
+        if self._lost is not None:
+            return
+        self._lost = error
+        self._status = False
+        if self._loop is not None and self._connection is not None and self._connection.fileno() != -1:
+            self._loop.remove_reader(self._connection.fileno())
+
+        for cookie in self._pending.values():
+            if cookie.future is not None and not cookie.future.done():
+                cookie.future.set_exception(error)
+        self._pending.clear()
+        self._fail_streams(error)
+        self._events_ready.set()  # wake up the event iterators
+
+    async def next_events(self) -> bytearray:
+        """
+        Wait until at least one event is buffered and return back every buffered raw event
+        """
+        while True:
+            while not self.events:
+                if self._lost is not None:
+                    raise self._lost
+                self._events_ready.clear()
+                await self._events_ready.wait()
+            events = self.take_events()
+            if events:  # the whole batch can be filtered out
+                return events
+
+    async def _iter_events(self):
+        while True:
+            try:
+                batch = await self.next_events()
+            except (ConnectionClosedError, DisplayConnectionError, OSError):
+                self.close()  # the socket failed or was closed, the iteration ends
+                return
+            for event in decode_events(batch, self.event_layouts):
+                yield event
+
+    def __aiter__(self):
+        """
+        Iterate over the events(_EventType records) as they arrive
+        """
+        return self._iter_events()
+
+    def close(self) -> None:
+        if self._lost is None:
+            self._connection_lost(ConnectionClosedError(self._pure_display))
+        if self._connection is not None:  # None before the connection is made
+            self._connection.close()
+
+    async def __aenter__(self) -> "AsyncConnection":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -0,0 +1,69 @@
+# Inspired by: https://github.com/python-xlib/python-xlib/blob/master/Xlib/xauth.py
+import os
+import socket
+import struct
+
+__all__ = ["get_auth"]
+
+FAMILY_INTERNET = 0
+FAMILY_LOCAL = 256
+FAMILY_WILD = 65535
+
+MIT_MAGIC_COOKIE = b"MIT-MAGIC-COOKIE-1"
+
+
+def _read_entries(path: str) -> list[tuple[int, bytes, bytes, bytes, bytes]]:
+    """
+    Parse an Xauthority file into (family, address, number, name, data) entries
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+
+    entries = []
+    offset = 0
+    try:
+        while offset < len(data):
+            (family,) = struct.unpack_from(">H", data, offset)
+            offset += 2
+            fields = []
+            for _ in range(4):
+                (length,) = struct.unpack_from(">H", data, offset)
+                offset += 2
+                fields.append(data[offset:offset + length])
+                offset += length
+            entries.append((family, *fields))
+    except struct.error:
+        pass  # truncated file, use what we have
+
+    return entries
+
+
+def get_auth(display_info: tuple) -> tuple[bytes, bytes]:
+    """
+    Return back the (auth name, auth data) pair for a display, empty if there is no matching cookie
+    ### Arguments
+    - display_info (tuple): the result of get_display()
+    ### Returns
+    - (name, data)
+    """
+    _, protocol, host, dno, _ = display_info
+    path = os.environ.get("XAUTHORITY") or os.path.join(os.path.expanduser("~"), ".Xauthority")
+
+    try:
+        entries = _read_entries(path)
+    except OSError:
+        return b"", b""
+
+    number = str(dno).encode()
+    if host and protocol != "unix" and host != "unix":
+        family, address = FAMILY_INTERNET, socket.inet_aton(socket.gethostbyname(host))
+    else:
+        family, address = FAMILY_LOCAL, socket.gethostname().encode()
+
+    for entry_family, entry_address, entry_number, name, data in entries:
+        if name != MIT_MAGIC_COOKIE or entry_number not in (number, b""):
+            continue
+        if entry_family == FAMILY_WILD or (entry_family == family and entry_address == address):
+            return name, data
+
+    return b"", b""
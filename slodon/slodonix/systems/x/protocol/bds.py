@@ -1,13 +1,530 @@
 # binary data structure
+# https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#Encoding::Requests
+"""
+Declarative description of the X11 wire format.
 
+Every request, reply, event and error layout is written down once and compiled into a cached
+`struct.Struct`. Requests are packed straight into a reusable `WriteBuffer`, replies/events/errors are
+unpacked from `memoryview` slices, so no intermediate `bytes` objects are created on the hot path.
+"""
+import struct
 
+__all__ = [
+    "BYTE_ORDER",
+    "pad",
+    "Layout",
+    "Request",
+    "Reply",
+    "Event",
+    "WriteBuffer",
+    "REQUESTS",
+    "EVENTS",
+    "EXTENSION_EVENTS",
+    "ERROR",
+    "MESSAGE_SIZE",
+    "SETUP_REQUEST",
+    "SETUP_PREFIX",
+    "SETUP",
+    "PIXMAP_FORMAT",
+    "SCREEN",
+    "DEPTH",
+    "VISUAL",
+    "ERROR_KIND",
+    "REPLY_KIND",
+    "GENERIC_EVENT_KIND",
+]
 
+BYTE_ORDER = "<"  # the connection setup always announces LSB first ("l")
+MESSAGE_SIZE = 32  # size of every event, error and of the fixed part of every reply
 
+# Kinds of messages coming from the server (first byte)
+ERROR_KIND = 0
+REPLY_KIND = 1
+GENERIC_EVENT_KIND = 35  # X Generic Event Extension: 32 bytes and a length, like a reply
 
 
+def pad(n: int) -> int:
+    """
+    Return the number of bytes needed to pad n to a multiple of 4
+    """
+    return -n & 3
 
 
+def _parse(spec: str) -> tuple:
+    """
+    Parse a layout spec: "name:fmt" tokens are named fields, bare tokens ("2x") are padding.
+    """
+    fields = []
+    for token in spec.split():
+        name, _, fmt = token.rpartition(":")
+        fields.append((name or None, fmt))
+    return tuple(fields)
 
 
+class Layout:
+    """
+    Fixed size part of a message, compiled once into a struct.Struct.
+    """
 
+    __slots__ = ("name", "names", "struct", "size", "_fields")
 
+    def __init__(self, name: str, fields: tuple, min_size: int = 0) -> None:
+        """
+        Layout initialization
+        ### Arguments
+        - name (str): the name of the message (as in the protocol specification)
+        - fields (tuple): (name | None, struct format) pairs, None for padding
+        - min_size (int): the layout is padded up to this size
+        ### Returns
+        - None
+        """
+        self.name = name
+        self._fields = {}  # name -> (offset, Struct) for lazy access of a single field
+
+        offset = 0
+        for field_name, fmt in fields:
+            if field_name is not None:
+                self._fields[field_name] = (offset, struct.Struct(BYTE_ORDER + fmt))
+            offset += struct.calcsize(BYTE_ORDER + fmt)
+
+        fmt = BYTE_ORDER + "".join(fmt for _, fmt in fields)
+        if offset < min_size:
+            fmt += f"{min_size - offset}x"
+
+        self.struct = struct.Struct(fmt)
+        self.size = self.struct.size
+        self.names = tuple(field_name for field_name, _ in fields if field_name is not None)
+
+    def pack_into(self, buffer, offset: int, *values) -> None:
+        self.struct.pack_into(buffer, offset, *values)
+
+    def unpack_from(self, buffer, offset: int = 0) -> tuple:
+        """
+        Decode every named field (header included) from buffer[offset:]
+        """
+        return self.struct.unpack_from(buffer, offset)
+
+    def field(self, name: str) -> tuple[int, struct.Struct]:
+        """
+        Return back the (offset, Struct) pair of a single field
+        """
+        return self._fields[name]
+
+    def get(self, buffer, name: str, offset: int = 0):
+        """
+        Decode a single field without touching the others
+        """
+        field_offset, field_struct = self._fields[name]
+        return field_struct.unpack_from(buffer, offset + field_offset)[0]
+
+    def index(self, name: str) -> int:
+        """
+        Position of the field in the tuple returned by unpack_from
+        """
+        return self.names.index(name)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name} size={self.size}>"
+
+
+class WriteBuffer:
+    """
+    Growable, reusable output buffer. Requests are packed in place, flushed, then the buffer is cleared
+    without being freed.
+    """
+
+    __slots__ = ("buffer", "length")
+
+    def __init__(self, size: int = 4096) -> None:
+        self.buffer = bytearray(size)
+        self.length = 0  # number of used bytes
+
+    def reserve(self, n: int) -> int:
+        """
+        Reserve n bytes at the end of the buffer and return back their offset
+        """
+        offset = self.length
+        end = offset + n
+        if end > len(self.buffer):
+            self.buffer.extend(bytes(max(end, 2 * len(self.buffer)) - len(self.buffer)))
+        self.length = end
+        return offset
+
+    def write(self, data) -> None:
+        offset = self.reserve(len(data))
+        self.buffer[offset:offset + len(data)] = data
+
+    def view(self) -> memoryview:
+        """
+        The used part of the buffer, release it before writing again
+        """
+        return memoryview(self.buffer)[:self.length]
+
+    def clear(self) -> None:
+        self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+
+class Request(Layout):
+    """
+    Layout of a request: opcode(B), data or minor opcode(B), length(H) and the fields.
+    """
+
+    __slots__ = ("opcode", "minor", "extension", "reply", "_has_data")
+
+    def __init__(self, opcode: int | None, name: str, spec: str = "", data: str | None = None,
+                 reply: "Reply" = None, extension: str | None = None) -> None:
+        """
+        Request initialization
+        ### Arguments
+        - opcode (int): the major opcode, or the minor opcode for extension requests
+        - name (str): the name of the request
+        - spec (str): the fields after the header
+        - data (str): a "name:B" field stored in the second header byte (core requests only)
+        - reply (Reply): the layout of the reply, None for requests without reply
+        - extension (str): the name of the extension, the major opcode is resolved by the connection
+        ### Returns
+        - None
+        """
+        if extension:
+            slot = ("minor", "B")
+        else:
+            slot = _parse(data)[0] if data else (None, "x")
+        super().__init__(name, (("opcode", "B"), slot, ("length", "H")) + _parse(spec))
+
+        self.extension = extension
+        self.opcode = None if extension else opcode
+        self.minor = opcode if extension else None
+        self.reply = reply
+        self._has_data = data is not None
+        # only the fields passed to encode(), the header is filled automatically
+        self.names = tuple(n for n in self.names if n not in ("opcode", "minor", "length"))
+
+    def encode(self, out: WriteBuffer, *values, tail=b"", opcode: int | None = None) -> int:
+        """
+        Pack the request (and its variable length tail) at the end of out
+        ### Arguments
+        - out (WriteBuffer): the output buffer
+        - values: the fields of the request in declaration order(data field first)
+        - tail: the variable length part, padded automatically
+        - opcode (int): the major opcode of extension requests
+        ### Returns
+        - the size of the encoded request in bytes
+        """
+        size = self.size + len(tail)
+        total = size + pad(size)
+        if total > 0x3FFFF:
+            raise ValueError(f"{self.name} request is too long ({total} bytes)")
+
+        buffer = out.buffer
+        offset = out.reserve(total)
+        if self.extension:
+            self.struct.pack_into(buffer, offset, opcode, self.minor, total >> 2, *values)
+        elif self._has_data:
+            self.struct.pack_into(buffer, offset, self.opcode, values[0], total >> 2, *values[1:])
+        else:
+            self.struct.pack_into(buffer, offset, self.opcode, total >> 2, *values)
+
+        if tail:
+            start = offset + self.size
+            buffer[start:start + len(tail)] = tail
+            buffer[start + len(tail):offset + total] = bytes(total - size)
+        return total
+
+
+class Reply(Layout):
+    """
+    Layout of a reply: 1(B), data(B), sequence(H), length(I) and the fields, at least 32 bytes.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, name: str, spec: str = "", data: str | None = None) -> None:
+        header = (("reply", "B"), _parse(data)[0] if data else (None, "x"), ("sequence", "H"), ("length", "I"))
+        super().__init__(name, header + _parse(spec), min_size=MESSAGE_SIZE)
+
+    @staticmethod
+    def total_size(buffer, offset: int = 0) -> int:
+        """
+        Full size of the reply at buffer[offset:], variable length part included
+        """
+        return MESSAGE_SIZE + (_REPLY_LENGTH.unpack_from(buffer, offset + 4)[0] << 2)
+
+    def tail(self, view: memoryview, offset: int = 0) -> memoryview:
+        """
+        The variable length part of the reply as a memoryview(no copy)
+        """
+        start = offset + self.size
+        return view[start:offset + self.total_size(view, offset)]
+
+
+class Event(Layout):
+    """
+    Layout of an event: code(B), detail(B), sequence(H) and the fields, always 32 bytes.
+    """
+
+    __slots__ = ("code",)
+
+    def __init__(self, code: int, name: str, spec: str = "", detail: str | None = None) -> None:
+        header = (("code", "B"), _parse(detail)[0] if detail else (None, "x"), ("sequence", "H"))
+        super().__init__(name, header + _parse(spec), min_size=MESSAGE_SIZE)
+        self.code = code
+
+
+_REPLY_LENGTH = struct.Struct(BYTE_ORDER + "I")
+
+ERROR = Layout(
+    "Error",
+    _parse("error:B code:B sequence:H bad_value:I minor_opcode:H major_opcode:B"),
+    min_size=MESSAGE_SIZE,
+)
+
+# -----------------------------------------------------------------------------------------------------------
+# Connection setup: https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#Encoding::Connection_Setup
+# -----------------------------------------------------------------------------------------------------------
+
+SETUP_REQUEST = Layout(
+    "SetupRequest",
+    _parse("byte_order:B x protocol_major:H protocol_minor:H auth_name_len:H auth_data_len:H 2x"),
+)
+SETUP_PREFIX = Layout("SetupPrefix", _parse("status:B reason_len:B protocol_major:H protocol_minor:H length:H"))
+SETUP = Layout(
+    "Setup",
+    _parse(
+        "release:I resource_id_base:I resource_id_mask:I motion_buffer_size:I vendor_len:H max_request_length:H "
+        "roots_len:B pixmap_formats_len:B image_byte_order:B bitmap_bit_order:B scanline_unit:B scanline_pad:B "
+        "min_keycode:B max_keycode:B 4x"
+    ),
+)
+PIXMAP_FORMAT = Layout("Format", _parse("depth:B bits_per_pixel:B scanline_pad:B 5x"))
+SCREEN = Layout(
+    "Screen",
+    _parse(
+        "root:I default_colormap:I white_pixel:I black_pixel:I current_input_masks:I width:H height:H "
+        "width_mm:H height_mm:H min_installed_maps:H max_installed_maps:H root_visual:I backing_stores:B "
+        "save_unders:B root_depth:B allowed_depths_len:B"
+    ),
+)
+DEPTH = Layout("Depth", _parse("depth:B x visuals_len:H 4x"))
+VISUAL = Layout(
+    "Visual",
+    _parse("visual_id:I visual_class:B bits_per_rgb:B colormap_entries:H red_mask:I green_mask:I blue_mask:I 4x"),
+)
+
+# -----------------------------------------------------------------------------------------------------------
+# Core requests
+# -----------------------------------------------------------------------------------------------------------
+
+CREATE_WINDOW = Request(
+    1, "CreateWindow",
+    "wid:I parent:I x:h y:h width:H height:H border_width:H window_class:H visual:I value_mask:I",
+    data="depth:B",
+)
+CHANGE_WINDOW_ATTRIBUTES = Request(2, "ChangeWindowAttributes", "window:I value_mask:I")
+GET_WINDOW_ATTRIBUTES = Request(
+    3, "GetWindowAttributes", "window:I",
+    reply=Reply(
+        "GetWindowAttributes",
+        "visual:I window_class:H bit_gravity:B win_gravity:B backing_planes:I backing_pixel:I save_under:B "
+        "map_is_installed:B map_state:B override_redirect:B colormap:I all_event_masks:I your_event_mask:I "
+        "do_not_propagate_mask:H 2x",
+        data="backing_store:B",
+    ),
+)
+DESTROY_WINDOW = Request(4, "DestroyWindow", "window:I")
+MAP_WINDOW = Request(8, "MapWindow", "window:I")
+GET_GEOMETRY = Request(
+    14, "GetGeometry", "drawable:I",
+    reply=Reply("GetGeometry", "root:I x:h y:h width:H height:H border_width:H", data="depth:B"),
+)
+QUERY_TREE = Request(
+    15, "QueryTree", "window:I",
+    reply=Reply("QueryTree", "root:I parent:I children_len:H"),
+)
+INTERN_ATOM = Request(
+    16, "InternAtom", "name_len:H 2x", data="only_if_exists:B",
+    reply=Reply("InternAtom", "atom:I"),
+)
+GET_ATOM_NAME = Request(17, "GetAtomName", "atom:I", reply=Reply("GetAtomName", "name_len:H"))
+CHANGE_PROPERTY = Request(
+    18, "ChangeProperty", "window:I property:I type:I format:B 3x data_len:I", data="mode:B",
+)
+DELETE_PROPERTY = Request(19, "DeleteProperty", "window:I property:I")
+GET_PROPERTY = Request(
+    20, "GetProperty", "window:I property:I type:I long_offset:I long_length:I", data="delete:B",
+    reply=Reply("GetProperty", "type:I bytes_after:I value_len:I", data="format:B"),
+)
+SET_SELECTION_OWNER = Request(22, "SetSelectionOwner", "owner:I selection:I time:I")
+GET_SELECTION_OWNER = Request(
+    23, "GetSelectionOwner", "selection:I", reply=Reply("GetSelectionOwner", "owner:I"),
+)
+CONVERT_SELECTION = Request(24, "ConvertSelection", "requestor:I selection:I target:I property:I time:I")
+SEND_EVENT = Request(25, "SendEvent", "destination:I event_mask:I", data="propagate:B")
+QUERY_POINTER = Request(
+    38, "QueryPointer", "window:I",
+    reply=Reply(
+        "QueryPointer", "root:I child:I root_x:h root_y:h win_x:h win_y:h mask:H", data="same_screen:B",
+    ),
+)
+TRANSLATE_COORDINATES = Request(
+    40, "TranslateCoordinates", "src_window:I dst_window:I src_x:h src_y:h",
+    reply=Reply("TranslateCoordinates", "child:I dst_x:h dst_y:h", data="same_screen:B"),
+)
+WARP_POINTER = Request(
+    41, "WarpPointer",
+    "src_window:I dst_window:I src_x:h src_y:h src_width:H src_height:H dst_x:h dst_y:h",
+)
+GET_INPUT_FOCUS = Request(43, "GetInputFocus", reply=Reply("GetInputFocus", "focus:I", data="revert_to:B"))
+CREATE_PIXMAP = Request(53, "CreatePixmap", "pid:I drawable:I width:H height:H", data="depth:B")
+FREE_PIXMAP = Request(54, "FreePixmap", "pixmap:I")
+CREATE_GC = Request(55, "CreateGC", "cid:I drawable:I value_mask:I")
+FREE_GC = Request(60, "FreeGC", "gc:I")
+GET_IMAGE = Request(
+    73, "GetImage", "drawable:I x:h y:h width:H height:H plane_mask:I", data="format:B",
+    reply=Reply("GetImage", "visual:I", data="depth:B"),
+)
+QUERY_EXTENSION = Request(
+    98, "QueryExtension", "name_len:H 2x",
+    reply=Reply("QueryExtension", "present:B major_opcode:B first_event:B first_error:B"),
+)
+GET_KEYBOARD_MAPPING = Request(
+    101, "GetKeyboardMapping", "first_keycode:B count:B 2x",
+    reply=Reply("GetKeyboardMapping", data="keysyms_per_keycode:B"),
+)
+GET_MODIFIER_MAPPING = Request(
+    119, "GetModifierMapping", reply=Reply("GetModifierMapping", data="keycodes_per_modifier:B"),
+)
+NO_OPERATION = Request(127, "NoOperation")
+
+# -----------------------------------------------------------------------------------------------------------
+# Extension requests, the major opcode is granted by the server(QueryExtension)
+# -----------------------------------------------------------------------------------------------------------
+
+XTEST_GET_VERSION = Request(
+    0, "XTestGetVersion", "major_version:B x minor_version:H", extension="XTEST",
+    reply=Reply("XTestGetVersion", "minor_version:H", data="major_version:B"),
+)
+XTEST_FAKE_INPUT = Request(
+    2, "XTestFakeInput", "type:B detail:B 2x time:I root:I 8x root_x:h root_y:h 7x deviceid:B",
+    extension="XTEST",
+)
+XC_MISC_GET_XID_RANGE = Request(
+    1, "XCMiscGetXIDRange", extension="XC-MISC", reply=Reply("XCMiscGetXIDRange", "start_id:I count:I"),
+)
+SHM_QUERY_VERSION = Request(
+    0, "ShmQueryVersion", extension="MIT-SHM",
+    reply=Reply(
+        "ShmQueryVersion", "major_version:H minor_version:H uid:H gid:H pixmap_format:B",
+        data="shared_pixmaps:B",
+    ),
+)
+SHM_ATTACH = Request(1, "ShmAttach", "shmseg:I shmid:I read_only:B 3x", extension="MIT-SHM")
+SHM_DETACH = Request(2, "ShmDetach", "shmseg:I", extension="MIT-SHM")
+SHM_GET_IMAGE = Request(
+    4, "ShmGetImage",
+    "drawable:I x:h y:h width:H height:H plane_mask:I format:B 3x shmseg:I offset:I", extension="MIT-SHM",
+    reply=Reply("ShmGetImage", "visual:I size:I", data="depth:B"),
+)
+RANDR_QUERY_VERSION = Request(
+    0, "RRQueryVersion", "major_version:I minor_version:I", extension="RANDR",
+    reply=Reply("RRQueryVersion", "major_version:I minor_version:I"),
+)
+RANDR_SELECT_INPUT = Request(4, "RRSelectInput", "window:I enable:H 2x", extension="RANDR")
+RANDR_GET_MONITORS = Request(
+    42, "RRGetMonitors", "window:I get_active:B 3x", extension="RANDR",
+    reply=Reply("RRGetMonitors", "timestamp:I n_monitors:I n_outputs:I"),
+)
+XINERAMA_QUERY_SCREENS = Request(
+    5, "XineramaQueryScreens", extension="XINERAMA", reply=Reply("XineramaQueryScreens", "number:I"),
+)
+DAMAGE_QUERY_VERSION = Request(
+    0, "DamageQueryVersion", "major_version:I minor_version:I", extension="DAMAGE",
+    reply=Reply("DamageQueryVersion", "major_version:I minor_version:I"),
+)
+DAMAGE_CREATE = Request(1, "DamageCreate", "damage:I drawable:I level:B 3x", extension="DAMAGE")
+DAMAGE_DESTROY = Request(2, "DamageDestroy", "damage:I", extension="DAMAGE")
+DAMAGE_SUBTRACT = Request(3, "DamageSubtract", "damage:I repair:I parts:I", extension="DAMAGE")
+RECORD_QUERY_VERSION = Request(
+    0, "RecordQueryVersion", "major_version:H minor_version:H", extension="RECORD",
+    reply=Reply("RecordQueryVersion", "major_version:H minor_version:H"),
+)
+RECORD_CREATE_CONTEXT = Request(
+    1, "RecordCreateContext", "context:I element_header:B 3x num_client_specs:I num_ranges:I", extension="RECORD",
+)
+RECORD_ENABLE_CONTEXT = Request(
+    5, "RecordEnableContext", "context:I", extension="RECORD",
+    reply=Reply(
+        "RecordEnableContext", "element_header:B client_swapped:B 2x id_base:I server_time:I rec_sequence_num:I",
+        data="category:B",
+    ),
+)
+RECORD_DISABLE_CONTEXT = Request(6, "RecordDisableContext", "context:I", extension="RECORD")
+RECORD_FREE_CONTEXT = Request(7, "RecordFreeContext", "context:I", extension="RECORD")
+
+REQUESTS: dict[str, Request] = {
+    value.name: value for value in list(globals().values()) if isinstance(value, Request)
+}
+
+# -----------------------------------------------------------------------------------------------------------
+# Core events: https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#Encoding::Events
+# -----------------------------------------------------------------------------------------------------------
+
+_INPUT = (
+    "time:I root:I event:I child:I root_x:h root_y:h event_x:h event_y:h state:H same_screen:B"
+)
+_CROSSING = (
+    "time:I root:I event:I child:I root_x:h root_y:h event_x:h event_y:h state:H mode:B flags:B"
+)
+
+EVENTS: dict[int, Event] = {
+    event.code: event
+    for event in (
+        Event(2, "KeyPress", _INPUT, detail="detail:B"),
+        Event(3, "KeyRelease", _INPUT, detail="detail:B"),
+        Event(4, "ButtonPress", _INPUT, detail="detail:B"),
+        Event(5, "ButtonRelease", _INPUT, detail="detail:B"),
+        Event(6, "MotionNotify", _INPUT, detail="detail:B"),
+        Event(7, "EnterNotify", _CROSSING, detail="detail:B"),
+        Event(8, "LeaveNotify", _CROSSING, detail="detail:B"),
+        Event(9, "FocusIn", "event:I mode:B", detail="detail:B"),
+        Event(10, "FocusOut", "event:I mode:B", detail="detail:B"),
+        Event(12, "Expose", "window:I x:H y:H width:H height:H count:H"),
+        Event(15, "VisibilityNotify", "window:I state:B"),
+        Event(
+            16, "CreateNotify",
+            "parent:I window:I x:h y:h width:H height:H border_width:H override_redirect:B",
+        ),
+        Event(17, "DestroyNotify", "event:I window:I"),
+        Event(18, "UnmapNotify", "event:I window:I from_configure:B"),
+        Event(19, "MapNotify", "event:I window:I override_redirect:B"),
+        Event(21, "ReparentNotify", "event:I window:I parent:I x:h y:h override_redirect:B"),
+        Event(
+            22, "ConfigureNotify",
+            "event:I window:I above_sibling:I x:h y:h width:H height:H border_width:H override_redirect:B",
+        ),
+        Event(28, "PropertyNotify", "window:I atom:I time:I state:B"),
+        Event(29, "SelectionClear", "time:I owner:I selection:I"),
+        Event(30, "SelectionRequest", "time:I owner:I requestor:I selection:I target:I property:I"),
+        Event(31, "SelectionNotify", "time:I requestor:I selection:I target:I property:I"),
+        Event(33, "ClientMessage", "window:I type:I data:20s", detail="format:B"),
+        Event(34, "MappingNotify", "request:B first_keycode:B count:B"),
+    )
+}
+
+# Extension events, keyed by (extension name, offset from the first event code granted by the server)
+EXTENSION_EVENTS: dict[tuple[str, int], Event] = {
+    ("RANDR", 0): Event(
+        0, "RRScreenChangeNotify",
+        "timestamp:I config_timestamp:I root:I window:I size_id:H subpixel_order:H width:H height:H "
+        "mwidth:H mheight:H",
+        detail="rotation:B",
+    ),
+    ("DAMAGE", 0): Event(
+        0, "DamageNotify",
+        "drawable:I damage:I timestamp:I x:h y:h width:H height:H "
+        "geometry_x:h geometry_y:h geometry_width:H geometry_height:H",
+        detail="level:B",
+    ),
+}
@@ -0,0 +1,151 @@
+# Receive buffer of the X socket
+# https://docs.python.org/3/library/socket.html#socket.socket.recv_into
+import socket
+
+# This project
+from slodon.slodonix.systems.x.protocol.bds import GENERIC_EVENT_KIND, MESSAGE_SIZE, REPLY_KIND, Reply
+
+__all__ = ["RingBuffer"]
+
+
+class RingBuffer:
+    """
+    Preallocated receive buffer filled with recv_into.
+
+    Complete messages(32-byte events/errors, variable length replies and generic events) are handed out as memoryviews
+    over the buffer, without copying. A handed out view is valid until the next recv_into: the unread
+    bytes are moved back to the start of the buffer when the free space at the end runs out, and the
+    buffer only grows when a single message(or the unread data) does not fit into it.
+    """
+
+    __slots__ = (
+        "buffer",
+        "view",
+        "start",
+        "end",
+        "wanted",
+        "min_free",
+        "high_water",
+        "largest_message",
+        "fills",
+        "compactions",
+        "grows",
+    )
+
+    def __init__(self, capacity: int = 1 << 16, min_free: int = 4096) -> None:
+        """
+        RingBuffer initialization
+        ### Arguments
+        - capacity (int): the initial size of the buffer in bytes
+        - min_free (int): the unread bytes are moved back to the start when less space is free at the end
+        ### Returns
+        - None
+        """
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # first unread byte
+        self.end = 0  # end of the received data
+        self.wanted = MESSAGE_SIZE  # size of the (possibly incomplete) message at start
+        self.min_free = min(min_free, capacity // 2)
+
+        # high-water marks and counters
+        self.high_water = 0  # the most bytes buffered at once
+        self.largest_message = 0
+        self.fills = 0  # recv_into calls
+        self.compactions = 0  # moves of the unread bytes to the start
+        self.grows = 0  # reallocations because of a message larger than the buffer
+
+    @property
+    def capacity(self) -> int:
+        return len(self.buffer)
+
+    def __len__(self) -> int:
+        """
+        Number of received but not yet consumed bytes
+        """
+        return self.end - self.start
+
+    def _make_room(self) -> None:
+        capacity = len(self.buffer)
+        pending = self.end - self.start
+        needed = max(self.wanted, pending + self.min_free)
+
+        if needed > capacity:
+            size = capacity
+            while size < needed:
+                size *= 2
+            buffer = bytearray(size)
+            buffer[:pending] = self.view[self.start:self.end]
+            self.buffer, self.view = buffer, memoryview(buffer)
+            self.grows += 1
+        elif self.start:
+            self.view[:pending] = self.view[self.start:self.end]  # memmove, no temporary object
+            self.compactions += 1
+
+        self.start = 0
+        self.end = pending
+
+    def recv_into(self, sock: socket.SocketType, flags: int = 0) -> int:
+        """
+        Receive as much as fits into the free space at the end of the buffer
+        ### Arguments
+        - sock (socket.SocketType): the socket to read from
+        - flags (int): flags of socket.recv_into
+        ### Returns
+        - the number of received bytes, 0 if the connection has been closed
+        """
+        capacity = len(self.buffer)
+        if self.start + self.wanted > capacity or capacity - self.end < self.min_free:
+            self._make_room()
+
+        n = sock.recv_into(self.view[self.end:], 0, flags)
+        self.end += n
+        self.fills += 1
+        if self.end - self.start > self.high_water:
+            self.high_water = self.end - self.start
+        return n
+
+    def next_message(self) -> memoryview | None:
+        """
+        Consume the next complete message, None if it has not been fully received yet
+        """
+        available = self.end - self.start
+        if available < MESSAGE_SIZE:
+            self.wanted = MESSAGE_SIZE
+            return None
+
+        start = self.start
+        kind = self.buffer[start]
+        if kind == REPLY_KIND or kind & 0x7F == GENERIC_EVENT_KIND:
+            size = Reply.total_size(self.buffer, start)
+        else:
+            size = MESSAGE_SIZE
+        if available < size:
+            self.wanted = size
+            return None
+
+        if size > self.largest_message:
+            self.largest_message = size
+        self.wanted = MESSAGE_SIZE
+        if size == available:
+            self.start = self.end = 0  # empty, start over at the beginning without moving anything
+        else:
+            self.start = start + size
+        return self.view[start:start + size]
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return back the high-water marks and counters, useful to size the buffer for a workload
+        """
+        return {
+            "capacity": len(self.buffer),
+            "buffered": self.end - self.start,
+            "high_water": self.high_water,
+            "largest_message": self.largest_message,
+            "fills": self.fills,
+            "compactions": self.compactions,
+            "grows": self.grows,
+        }
+
+    def __repr__(self) -> str:
+        return f"<RingBuffer {self.stats()}>"
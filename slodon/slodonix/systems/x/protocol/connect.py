@@ -1,14 +1,22 @@
 # Inspired by: https://github.com/python-xlib/python-xlib/blob/master/Xlib/support/unix_connect.py
 import socket
+import select
 import re
 import os
-from typing import Type
-import uuid
-from uuid import UUID
+from typing import Callable, Type, NamedTuple
+import itertools
+import functools
+import collections
 
 # This project
 from slodon.slodonix.systems.x.utils.func import is_socket_connected
 from slodon.slodonix.systems.x.errors import *
+from slodon.slodonix.systems.x.protocol.auth import get_auth
+from slodon.slodonix.systems.x.protocol.bds import *
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.buffer import RingBuffer
+from slodon.slodonix.systems.x.events.event import decode_events
+from slodon.slodonix.systems.x.resources.xid import XIDAllocator
 
 
 def get_tcp(address: str, dno: int) -> socket.SocketType:
@@ -19,6 +27,7 @@ def get_tcp(address: str, dno: int) -> socket.SocketType:
     :return: TCP socket connection to address
     """
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # pipelined requests are flushed explicitly
     s.connect((address, 6000 + dno))
     return s
 
@@ -34,6 +43,7 @@ def get_unix(address: str) -> socket.SocketType:
     return s
 
 
+@functools.lru_cache(maxsize=64)
 def get_display(display) -> tuple[str, str, str, int, int]:
     # https://github.com/python-xlib/python-xlib/blob/master/Xlib/support/unix_connect.py#L40
     # display CAN'T be None in this case
@@ -139,8 +149,134 @@ class Socket:
         return self._socket
 
 
-class Connection:
-    """Connection to a display"""
+class Setup(NamedTuple):
+    """
+    Information sent back by the server in the connection setup
+    https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#server_information
+    """
+
+    protocol_major: int
+    protocol_minor: int
+    release: int
+    resource_id_base: int
+    resource_id_mask: int
+    max_request_length: int  # in 4 byte units
+    min_keycode: int
+    max_keycode: int
+    image_byte_order: int
+    vendor: str
+    pixmap_formats: tuple[tuple[int, int, int], ...]  # (depth, bits_per_pixel, scanline_pad)
+    roots: tuple[int, ...]  # root window of each screen
+    data: bytes  # the raw setup data, screens start at screens_offset
+    screens_offset: int
+
+
+def setup_request(auth_name: bytes = b"", auth_data: bytes = b"") -> bytes:
+    """
+    Encode the connection setup request
+    """
+    out = WriteBuffer(SETUP_REQUEST.size + len(auth_name) + len(auth_data) + 8)
+    offset = out.reserve(SETUP_REQUEST.size)
+    SETUP_REQUEST.pack_into(out.buffer, offset, ord("l"), 11, 0, len(auth_name), len(auth_data))
+    for part in (auth_name, auth_data):
+        out.write(part)
+        out.write(bytes(pad(len(part))))
+    return bytes(out.view())
+
+
+def parse_setup(prefix: bytes, data: bytes, display: str = None) -> Setup:
+    """
+    Parse the server answer to the connection setup request
+    ### Arguments
+    - prefix (bytes): the first 8 bytes of the answer
+    - data (bytes): the rest of the answer
+    - display (str): the name of the display(used in the error messages)
+    ### Returns
+    - Setup
+    """
+    status, reason_len, major, minor, _ = SETUP_PREFIX.unpack_from(prefix)
+    if status != 1:
+        reason = bytes(data[:reason_len] if status == 0 else data).rstrip(b"\0").decode(errors="replace")
+        raise DisplayConnectionError(display, reason or "authentication required")
+
+    (release, base, mask, _, vendor_len, max_length, roots_len, formats_len, byte_order, _, _, _, min_keycode,
+     max_keycode) = SETUP.unpack_from(data)
+
+    offset = SETUP.size
+    vendor = bytes(data[offset:offset + vendor_len]).decode(errors="replace")
+    offset += vendor_len + pad(vendor_len)
+
+    formats = []
+    for _ in range(formats_len):
+        formats.append(PIXMAP_FORMAT.unpack_from(data, offset))
+        offset += PIXMAP_FORMAT.size
+
+    screens_offset = offset
+    roots = []
+    for _ in range(roots_len):
+        screen = SCREEN.unpack_from(data, offset)
+        roots.append(screen[0])
+        offset += SCREEN.size
+        for _ in range(screen[-1]):  # allowed depths
+            visuals_len = DEPTH.get(data, "visuals_len", offset)
+            offset += DEPTH.size + visuals_len * VISUAL.size
+
+    return Setup(
+        major, minor, release, base, mask, max_length, min_keycode, max_keycode, byte_order, vendor,
+        tuple(formats), tuple(roots), bytes(data), screens_offset,
+    )
+
+
+class Cookie:
+    """
+    A queued request, its reply(or error) is matched back by the sequence number
+    """
+
+    __slots__ = ("connection", "sequence", "request", "_reply", "_error")
+
+    def __init__(self, connection: "BaseConnection", sequence: int, request: Request) -> None:
+        self.connection = connection
+        self.sequence = sequence  # full sequence number(not truncated to 16 bits)
+        self.request = request
+        self._reply = None
+        self._error = None
+
+    @property
+    def done(self) -> bool:
+        return self._reply is not None or self._error is not None
+
+    def reply(self, check: bool = True, copy: bool = True) -> bytes | memoryview | None:
+        """
+        Wait for the reply(flushes the queue if needed) and return back the raw reply.
+        If check is False a failed request returns back None instead of raising its XError.
+        Without copy the reply may be a memoryview over the receive buffer, only valid until the next read of
+        the connection(the next wait): decode it before waiting for anything else.
+        """
+        return self.connection.wait(self, check, copy)
+
+    def error(self) -> XErrorEvent | None:
+        """
+        The error of a completed request, None if it succeeded(or is not completed yet)
+        """
+        if self._error is None:
+            return None
+        return XErrorEvent(self._error, self.sequence, self.request)
+
+    def __repr__(self) -> str:
+        return f"<Cookie {self.request.name} sequence={self.sequence}>"
+
+
+_connection_ids = itertools.count(1)
+
+# requests in a row without a reply before a GetInputFocus is queued(see BaseConnection._queue_sync)
+_MAX_WITHOUT_REPLY = 0xFFFE
+
+
+class BaseConnection:
+    """
+    Protocol state shared by the blocking and the asyncio connection: request queue, sequence numbers,
+    reply matching and event buffering. No I/O happens here.
+    """
 
     class Meta:
         """Hold metadata about the connection"""
@@ -153,7 +289,7 @@ class Connection:
 
     def __init__(self, display: str = None) -> None:
         """
-        Connection initialization
+        BaseConnection initialization
 
         ### Arguments
         - display (str): the full display name(string) -> protocol/hostname:number.screen_number
@@ -165,16 +301,31 @@ class Connection:
             display  # the actual basic display name(without any processing)
         )
         self._display_info: tuple = get_display(display)  # the display info(tuple)
-        self._connection: socket.SocketType = self._make_connection(
-            self._display_info
-        )  # make the connection
-        self._status: bool = is_socket_connected(
-            self._connection
-        )  # check if the connection is opened or closed
+        self._connection: socket.SocketType | None = None  # set by the subclasses
+        self._status: bool = False
         self._protocol: str = self._display_info[2]  # protocol as a string
-        self._id: UUID = uuid.uuid4()  # unique id for the connection
-
-        self.meta = self.Meta(
+        self._id: int = next(_connection_ids)  # unique id for the connection(in this process)
+
+        self._out = WriteBuffer()  # queued requests, sent in one sendall by flush()
+        self._ring = RingBuffer()  # received but not yet routed messages
+        self._sequence: int = 0  # sequence number of the last queued request
+        self._flushed: int = 0  # sequence number of the last sent request
+        self._last_reply: int = 0  # sequence number of the last queued request with a reply
+        self._received: int = 0  # sequence number of the last routed reply or error
+        self._pending: dict[int, Cookie] = {}  # requests waiting for a reply, by sequence number
+        self._streams: dict[int, tuple] = {}  # requests answered by many replies -> (callback, failed)
+        self._extensions: dict[str, tuple | None] = {}  # QueryExtension cache
+        self.events = bytearray()  # raw 32-byte events received while waiting for replies
+        self.event_layouts: dict[int, Event] = dict(EVENTS)  # event code -> layout, extensions included
+        self.event_filter = None  # called with every raw batch taken, e.g. an EventCoalescer
+        self.errors: collections.deque[XErrorEvent] = collections.deque(maxlen=1024)  # unhandled errors
+        self.error_handler = None  # called with the XErrorEvent of every request nobody waits for
+        self.flush_threshold: int = 1 << 16  # auto flush the queue above this size(bytes)
+        self.setup: Setup | None = None
+        self.xid: XIDAllocator | None = None  # resource ids of the connection, set after the setup
+
+    def _make_meta(self) -> Meta:
+        return self.Meta(
             pure_display=self._pure_display,
             display_info=self._display_info,
             connection=self._connection,
@@ -183,9 +334,279 @@ class Connection:
             id=self._id,
         )
 
-    # noinspection PyMethodMayBeStatic
-    def _make_connection(self, display_info) -> socket.SocketType:
-        return Socket(display_info).get_socket()
+    # -------------------------------------------------------------------------------------------------------
+    # Requests
+    # -------------------------------------------------------------------------------------------------------
+
+    def request(self, request: Request, *values, tail=b"") -> Cookie:
+        """
+        Queue a request, it is sent by the next flush(or when a reply is needed)
+        ### Arguments
+        - request (Request): the layout of the request(from protocol.bds)
+        - values: the fields of the request
+        - tail: the variable length part of the request
+        ### Returns
+        - Cookie: the reply can be obtained from it later
+        """
+        opcode = None
+        if request.extension:
+            opcode = self.extension_opcode(request.extension)
+
+        if request.reply is None and self._sequence - self._last_reply >= _MAX_WITHOUT_REPLY:
+            self._queue_sync()
+        request.encode(self._out, *values, tail=tail, opcode=opcode)
+        self._sequence += 1
+        cookie = self._cookie(self._sequence, request)
+        if request.reply is not None:
+            self._pending[self._sequence] = cookie
+            self._last_reply = self._sequence
+
+        if len(self._out) >= self.flush_threshold:
+            self._auto_flush()
+        return cookie
+
+    def request_batch(self, request: Request, rows) -> int:
+        """
+        Queue many requests of the same layout without a reply(e.g. XTestFakeInput), no cookie is made and the
+        queue is only checked for an auto flush after the last one
+        ### Arguments
+        - request (Request): the layout of the requests, without a reply
+        - rows (Iterable): the fields of every request
+        ### Returns
+        - int: the number of queued requests
+        """
+        if request.reply is not None:
+            raise ValueError(f"{request.name} has a reply, use request()")
+        opcode = None
+        if request.extension:
+            opcode = self.extension_opcode(request.extension)
+
+        encode = request.encode
+        out = self._out
+        count = 0
+        sequence = self._sequence
+        limit = self._last_reply + _MAX_WITHOUT_REPLY
+        for values in rows:
+            if sequence >= limit:
+                self._sequence = sequence
+                self._queue_sync()
+                sequence = self._sequence
+                limit = sequence + _MAX_WITHOUT_REPLY
+            encode(out, *values, opcode=opcode)
+            sequence += 1
+            count += 1
+        self._sequence = sequence
+
+        if len(out) >= self.flush_threshold:
+            self._auto_flush()
+        return count
+
+    def request_stream(self, request: Request, *values, callback: Callable[[bytes], bool], tail=b"",
+                       failed: Callable[[BaseException], None] | None = None) -> int:
+        """
+        Queue a request answered by a series of replies(e.g. RecordEnableContext): callback is called with a
+        copy of every reply until it returns True
+        ### Arguments
+        - request (Request): the layout of the request
+        - values: the fields of the request
+        - callback (Callable): callback(reply) -> True after the last reply
+        - tail: the variable length part of the request
+        - failed (Callable): failed(exception) when no other reply will come, the XError of the request or the
+          loss of the connection(without it the errors go to error_handler/errors)
+        ### Returns
+        - int: the sequence number of the request
+        """
+        opcode = None
+        if request.extension:
+            opcode = self.extension_opcode(request.extension)
+        request.encode(self._out, *values, tail=tail, opcode=opcode)
+        self._sequence += 1
+        self._streams[self._sequence] = (callback, failed)
+        self._last_reply = self._sequence
+        return self._sequence
+
+    def _queue_sync(self) -> None:
+        """
+        Queue a GetInputFocus nobody waits for: the server answers at least one request in every 65536, so the
+        16-bit sequence numbers it sends can always be widened(like xcb does)
+        """
+        bds.GET_INPUT_FOCUS.encode(self._out)
+        self._sequence += 1
+        self._last_reply = self._sequence
+
+    def _cookie(self, sequence: int, request: Request) -> Cookie:
+        return Cookie(self, sequence, request)
+
+    def _auto_flush(self) -> None:
+        raise NotImplementedError
+
+    def extension(self, name: str) -> tuple | None:
+        """
+        Return back the (major opcode, first event, first error) of an already queried extension,
+        None if not present
+        """
+        try:
+            return self._extensions[name]
+        except KeyError:
+            raise DisplayError(f"{name} extension has not been queried yet") from None
+
+    def extension_opcode(self, name: str) -> int:
+        info = self.extension(name)
+        if info is None:
+            raise DisplayError(f"{name} extension is not supported by {self._pure_display}")
+        return info[0]
+
+    def _queue_extension_queries(self, names) -> list[tuple[str, Cookie]]:
+        cookies = []
+        for name in names:
+            encoded = name.encode()
+            cookies.append((name, self.request(bds.QUERY_EXTENSION, len(encoded), tail=encoded)))
+        return cookies
+
+    def _store_extension(self, name: str, reply) -> None:
+        _, _, _, present, major, first_event, first_error = bds.QUERY_EXTENSION.reply.unpack_from(reply)
+        self._extensions[name] = (major, first_event, first_error) if present else None
+        if present:
+            for (extension, offset), layout in EXTENSION_EVENTS.items():
+                if extension == name:
+                    self.event_layouts[first_event + offset] = layout
+
+    def take_events(self) -> bytearray:
+        """
+        Return back the buffered raw events(a multiple of 32 bytes, passed through event_filter) and start
+        a new buffer
+        """
+        self._drain()
+        events, self.events = self.events, bytearray()
+        if self.event_filter is not None:
+            events = self.event_filter(events)
+        return events
+
+    def claim_events(self, handle: Callable[[bytearray, int], bool]) -> int:
+        """
+        Pass every buffered raw event to handle(events, offset), the events it returns False for are given back
+        in their order(before anything received meanwhile) and go through event_filter only when taken
+        ### Arguments
+        - handle (Callable): called with the taken buffer and the offset of an event
+        ### Returns
+        - int: the number of claimed events
+        """
+        self._drain()
+        if not self.events:
+            return 0
+        events, self.events = self.events, bytearray()
+        others = bytearray()
+        for offset in range(0, len(events), MESSAGE_SIZE):
+            if not handle(events, offset):
+                others += events[offset:offset + MESSAGE_SIZE]
+        self.events[:0] = others
+        return (len(events) - len(others)) // MESSAGE_SIZE
+
+    def decoded_events(self, display=None, types: set[int] | None = None):
+        """
+        Take the buffered events and decode them into a stream of _EventType records
+        """
+        return decode_events(self.take_events(), self.event_layouts, display, types)
+
+    def _unhandled_error(self, error: XErrorEvent) -> None:
+        """
+        Called with the errors of the requests without a cookie waiting for them
+        """
+        if self.error_handler is not None:
+            self.error_handler(error)
+        else:
+            self.errors.append(error)
+
+    # -------------------------------------------------------------------------------------------------------
+    # Responses
+    # -------------------------------------------------------------------------------------------------------
+
+    def _widen(self, sequence: int) -> int:
+        """
+        Extend the 16-bit sequence number of a reply or an error to the full sequence number: they come in the
+        order of the requests, less than 65536 requests after the previous one(see _queue_sync)
+        """
+        received = self._received
+        received += (sequence - received) & 0xFFFF
+        self._received = received
+        return received
+
+    def _drain(self, until: Cookie | None = None) -> None:
+        """
+        Route the complete messages of the receive buffer. Replies are copied out of the buffer, except
+        the reply of `until`: draining stops right after it, and it is kept as a memoryview over the buffer
+        (valid until the next read).
+        """
+        ring = self._ring
+        while True:
+            message = ring.next_message()
+            if message is None:
+                return
+            if self._route(message, until):
+                return
+
+    def _route(self, message: memoryview, until: Cookie | None = None) -> bool:
+        """
+        Route a single message, return back True if it completed `until`
+        """
+        kind = message[0]
+        if kind == REPLY_KIND or kind == ERROR_KIND:
+            sequence = self._widen(ERROR.get(message, "sequence"))
+            if self._streams and sequence in self._streams:
+                callback, failed = self._streams[sequence]
+                if kind == REPLY_KIND:
+                    if callback(bytes(message)):
+                        del self._streams[sequence]
+                    return False
+                del self._streams[sequence]
+                error = XErrorEvent(bytes(message), sequence)
+                if failed is not None:
+                    failed(error.exception())
+                else:
+                    self._unhandled_error(error)
+                return False
+            cookie = self._pending.pop(sequence, None)
+            if cookie is None:
+                if kind == ERROR_KIND:
+                    self._unhandled_error(XErrorEvent(bytes(message), sequence))
+                return False
+            if kind == REPLY_KIND:
+                cookie._reply = message if cookie is until else bytes(message)
+            else:
+                cookie._error = bytes(message)
+            self._completed(cookie)
+            return cookie is until
+        if len(message) > MESSAGE_SIZE:  # a generic event: only its header is kept, nothing here selects them
+            message = message[:MESSAGE_SIZE]
+        self.events += message
+        self._event_received()
+        return False
+
+    def _fail_streams(self, error: BaseException) -> None:
+        """
+        End every request answered by many replies, their next replies will never come
+        """
+        streams = list(self._streams.values())
+        self._streams.clear()
+        for _, failed in streams:
+            if failed is not None:
+                failed(error)
+
+    def receive_stats(self) -> dict[str, int]:
+        """
+        Return back the high-water marks of the receive buffer(see RingBuffer.stats)
+        """
+        return self._ring.stats()
+
+    def _completed(self, cookie: Cookie) -> None:
+        """
+        Called when the reply or the error of a cookie arrived
+        """
+
+    def _event_received(self) -> None:
+        """
+        Called when an event has been buffered
+        """
 
     @property
     def status(self) -> _STATUS.STATUS:
@@ -196,10 +617,6 @@ class Connection:
         """
         return _OPEN if self._status else _CLOSE
 
-    def close(self):
-        self._connection.close()
-        self._status = is_socket_connected(self._connection)
-
     def __repr__(self) -> str:
         keys = ["display", "protocol", "host", "dno"]
         _text = ""
@@ -215,4 +632,146 @@ class Connection:
         return self._display_info
 
     def __str__(self) -> str:
-        return f"<Connection={self.status().__name__}|| protocol={self._protocol} || id={self._id}>"
+        return f"<{type(self).__name__}={self.status.__name__}|| protocol={self._protocol} || id={self._id}>"
+
+
+class Connection(BaseConnection):
+    """Connection to a display"""
+
+    def __init__(self, display: str = None) -> None:
+        """
+        Connection initialization
+
+        ### Arguments
+        - display (str): the full display name(string) -> protocol/hostname:number.screen_number
+        ### Returns
+        - None
+        """
+        super().__init__(display)
+        self._connection: socket.SocketType = self._make_connection(
+            self._display_info
+        )  # make the connection
+        self._status: bool = is_socket_connected(
+            self._connection
+        )  # check if the connection is opened or closed
+
+        self.setup: Setup = self._handshake()
+        self.xid = XIDAllocator(self.setup.resource_id_base, self.setup.resource_id_mask, self._xid_range)
+        self.meta = self._make_meta()
+
+    # noinspection PyMethodMayBeStatic
+    def _make_connection(self, display_info) -> socket.SocketType:
+        return Socket(display_info).get_socket()
+
+    def _handshake(self) -> Setup:
+        """
+        Send the connection setup request and parse the answer
+        """
+        self._connection.sendall(setup_request(*get_auth(self._display_info)))
+        prefix = self._recv_exact(SETUP_PREFIX.size)
+        length = SETUP_PREFIX.get(prefix, "length")
+        return parse_setup(prefix, self._recv_exact(length * 4), self._pure_display)
+
+    def _recv_exact(self, n: int) -> bytes:
+        chunks = bytearray()
+        while len(chunks) < n:
+            data = self._connection.recv(n - len(chunks))
+            if not data:
+                raise ConnectionClosedError(self._pure_display)
+            chunks += data
+        return bytes(chunks)
+
+    def _auto_flush(self) -> None:
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Send every queued request in one sendall
+        """
+        if not len(self._out):
+            return
+        with self._out.view() as view:
+            self._connection.sendall(view)
+        self._out.clear()
+        self._flushed = self._sequence
+
+    def wait(self, cookie: Cookie, check: bool = True, copy: bool = True) -> bytes | memoryview | None:
+        """
+        Return back the raw reply of the cookie, reading(and routing) everything before it.
+        The reply is bytes, unless copy is False: then it can be a memoryview over the receive buffer, valid
+        until the next read of the connection(decode it right away).
+        If the request failed its XError is raised, or None is returned back if check is False.
+        """
+        if cookie.sequence > self._flushed:
+            self.flush()
+        if not cookie.done:
+            self._drain(cookie)
+        while not cookie.done:
+            self._read()
+            self._drain(cookie)
+
+        if cookie._error is not None:
+            if check:
+                raise cookie.error().exception()
+            return None
+        if copy and isinstance(cookie._reply, memoryview):
+            cookie._reply = bytes(cookie._reply)  # kept by the caller(and the cookie) past the next read
+        return cookie._reply
+
+    def sync(self) -> None:
+        """
+        Make a round trip, every error of the already queued requests is received after it
+        """
+        self.request(bds.GET_INPUT_FOCUS).reply()
+
+    def poll(self, timeout: float = 0.0) -> int:
+        """
+        Read whatever the server has sent(waiting at most timeout seconds) and return back the number of
+        buffered events
+        """
+        self.flush()
+        self._drain()
+        readable, _, _ = select.select([self._connection], [], [], timeout)
+        if readable:
+            self._read()
+            self._drain()
+        return len(self.events) // MESSAGE_SIZE
+
+    def _xid_range(self) -> tuple[int, int]:
+        """
+        Ask for a range of unused resource ids once the granted range is exhausted
+        """
+        if self.extension("XC-MISC") is None:
+            return 0, 0
+        reply = self.request(bds.XC_MISC_GET_XID_RANGE).reply()
+        _, _, _, start_id, count = bds.XC_MISC_GET_XID_RANGE.reply.unpack_from(reply)
+        return start_id, count
+
+    def extension(self, name: str) -> tuple | None:
+        """
+        Return back the (major opcode, first event, first error) of an extension, None if not present
+        """
+        if name not in self._extensions:
+            self.query_extensions(name)
+        return self._extensions[name]
+
+    def query_extensions(self, *names: str) -> None:
+        """
+        Query many extensions in one round trip
+        """
+        for name, cookie in self._queue_extension_queries(names):
+            self._store_extension(name, cookie.reply())
+
+    def _read(self) -> None:
+        """
+        Receive data from the server (blocking) into the receive buffer
+        """
+        if not self._ring.recv_into(self._connection):
+            self._status = False
+            error = ConnectionClosedError(self._pure_display)
+            self._fail_streams(error)
+            raise error
+
+    def close(self):
+        self._connection.close()
+        self._status = is_socket_connected(self._connection)
@@ -1,7 +1,17 @@
-import uuid
+import itertools
+import struct
 
 # This project
+from . import bds
 from .connect import Connection
+from slodon.slodonix.systems.x.display.atoms import AtomTable
+from slodon.slodonix.systems.x.display.screens import Screen, parse_screens
+from slodon.slodonix.systems.x.errors import *
+
+_display_ids = itertools.count(1)
+
+CW_EVENT_MASK = 1 << 11  # value_mask bit of ChangeWindowAttributes
+_CARD32 = struct.Struct(bds.BYTE_ORDER + "I")
 
 
 class BaseDisplay:
@@ -16,21 +26,27 @@ class BaseDisplay:
         def __str__(self):
             return str(self.data)
 
-    def __init__(self, display=None) -> None:
+    def __init__(self, display=None, connection=None) -> None:
         """
         DISPLAY initialization
 
         ### Arguments
         - display (str): the full display name(string) -> protocol/hostname:number.screen_number
+        - connection (BaseConnection): an already opened connection to use instead of making a new one
         ### Returns
         - None
         """
         self.display_name = display  # the display name
-        self.default_screen = "TBD"
-        self.id = uuid.uuid4()  # obtain custom id
+        self.id = next(_display_ids)  # obtain custom id(unique in this process)
         # Connection here
 
-        self.connection = Connection(display)  # create the connection
+        self.connection = connection or Connection(display)  # create the connection
+        self.screens: tuple[Screen, ...] = parse_screens(self.connection.setup)
+        self.default_screen: int = self.connection.display_info[4]  # the screen number of the display name
+        if self.default_screen >= len(self.screens):
+            raise DisplayError(f"{display}: the display has no screen {self.default_screen}")
+        self.atoms = AtomTable(self.connection)  # cached InternAtom/GetAtomName results
+        self.root_event_masks: dict[int, int] = {}  # root window -> events selected on it by this client
 
         self.meta = self.Meta(
             display_name=self.display_name,
@@ -38,6 +54,23 @@ class BaseDisplay:
             connection=self.connection,
         )
 
+    @property
+    def screen(self) -> Screen:
+        """
+        The default screen
+        """
+        return self.screens[self.default_screen]
+
+    def select_root_events(self, root: int, mask: int) -> None:
+        """
+        Add events to the ones this client selects on a root window. A client has a single event mask per
+        window, so the users of a root window(WindowTree, DisplayState, ...) select through here and keep the
+        events of each other.
+        """
+        mask |= self.root_event_masks.get(root, 0)
+        self.root_event_masks[root] = mask
+        self.connection.request(bds.CHANGE_WINDOW_ATTRIBUTES, root, CW_EVENT_MASK, tail=_CARD32.pack(mask))
+
     def close(self):
         """Close the display"""
         self.connection.close()
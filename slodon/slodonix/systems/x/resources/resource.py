@@ -1,20 +1,28 @@
 # https://gitlab.freedesktop.org/xorg/lib/libx11/-/blob/master/include/X11/Xresource.h
-import uuid
+from slodon.slodonix.systems.x.resources.xid import XIDAllocator
 
 
 class XResource:
     # Represent a resource in the x window system.
-    def __init__(self):
-        self.id = uuid.uuid4()  # int
+    __slots__ = ("id", "_allocator")
+
+    def __init__(self, allocator: XIDAllocator) -> None:
+        """
+        ### Arguments
+        - allocator (XIDAllocator): the allocator of the connection(connection.xid)
+        """
+        self._allocator = allocator
+        self.id: int = allocator.alloc()
 
     def __str__(self) -> str:
         return self.__repr__()
 
     def __repr__(self) -> str:
-        return f"<XResource id={self.id}>"
+        return f"<XResource id={self.id:#x}>"
 
-    def __dispose(self) -> uuid.UUID:
+    def __dispose(self) -> int:
         """
-        Serve as the resource.
+        Serve as the resource, the id can be reused afterwards.
         """
+        self._allocator.free(self.id)
         return self.id
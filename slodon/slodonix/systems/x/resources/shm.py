@@ -0,0 +1,99 @@
+# https://www.x.org/releases/X11R7.7/doc/xextproto/shm.html
+# https://man7.org/linux/man-pages/man2/shmget.2.html
+import ctypes
+import ctypes.util
+import os
+
+# This project
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.resources.resource import XResource
+
+__all__ = ["ShmSegment"]
+
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+
+_libc = None
+
+
+def _get_libc() -> ctypes.CDLL:
+    global _libc
+    if _libc is None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.shmget.argtypes = (ctypes.c_int, ctypes.c_size_t, ctypes.c_int)
+        libc.shmget.restype = ctypes.c_int
+        libc.shmat.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_int)
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = (ctypes.c_void_p,)
+        libc.shmctl.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_void_p)
+        _libc = libc
+    return _libc
+
+
+def _check(result: int) -> int:
+    if result == -1 or result == ctypes.c_void_p(-1).value:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    return result
+
+
+class ShmSegment(XResource):
+    """
+    A System V shared memory segment attached by the client and by the server(ShmAttach), the server writes
+    the ShmGetImage pixels straight into it. `buffer` is a ctypes array over the whole segment(no copy).
+    """
+
+    __slots__ = ("connection", "size", "shmid", "address", "buffer")
+
+    def __init__(self, connection, size: int) -> None:
+        """
+        Create, map and attach a segment, the attach is queued(not flushed)
+        ### Arguments
+        - connection (BaseConnection): a local connection with the MIT-SHM extension
+        - size (int): the size of the segment in bytes
+        ### Returns
+        - None
+        """
+        libc = _get_libc()
+        shmid = _check(libc.shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600))
+        try:
+            address = _check(libc.shmat(shmid, None, 0))
+        except OSError:
+            libc.shmctl(shmid, IPC_RMID, None)
+            raise
+
+        super().__init__(connection.xid)
+        self.connection = connection
+        self.size = size
+        self.shmid = shmid
+        self.address = address
+        self.buffer = (ctypes.c_ubyte * size).from_address(address)
+        connection.request(bds.SHM_ATTACH, self.id, shmid, False)
+
+    def mark_removed(self) -> None:
+        """
+        Let the kernel free the segment once both sides detached, call it after the server attached
+        """
+        _get_libc().shmctl(self.shmid, IPC_RMID, None)
+
+    def close(self, detach: bool = True) -> None:
+        """
+        Detach(on both sides) and free the segment
+        ### Arguments
+        - detach (bool): send ShmDetach, False when the ShmAttach of the server failed
+        ### Returns
+        - None
+        """
+        if self.address is None:
+            return
+        if detach and self.connection._status:
+            self.connection.request(bds.SHM_DETACH, self.id)
+        self.buffer = None  # views over the segment must not be used after this
+        _get_libc().shmdt(self.address)
+        _get_libc().shmctl(self.shmid, IPC_RMID, None)
+        self.address = None
+        self._allocator.free(self.id)
+
+    def __repr__(self) -> str:
+        return f"<ShmSegment id={self.id:#x} shmid={self.shmid} size={self.size}>"
@@ -0,0 +1,100 @@
+# https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#Resource_IDs
+# https://www.x.org/releases/X11R7.7/doc/xcmiscproto/xc-misc.html
+from typing import Callable
+
+# This project
+from slodon.slodonix.systems.x.errors import ResourceIdError
+
+__all__ = ["XIDAllocator"]
+
+
+class XIDAllocator:
+    """
+    Allocates resource ids(XIDs) from the range granted by the server in the connection setup:
+    resource_id_base | (n * increment), where increment is the lowest bit of resource_id_mask.
+
+    Freed ids are reused first(LIFO free-list), a bitmap over the range tracks the allocated ids. When the
+    range is exhausted, `refresh` is called to obtain a new (start_id, count) range of unused ids from the
+    server(XC-MISC GetXIDRange).
+    """
+
+    __slots__ = ("base", "mask", "increment", "_shift", "_next", "_max", "_free", "_bitmap", "_refresh", "allocated")
+
+    def __init__(self, base: int, mask: int, refresh: Callable[[], tuple[int, int]] | None = None) -> None:
+        """
+        XIDAllocator initialization
+        ### Arguments
+        - base (int): resource_id_base of the connection setup
+        - mask (int): resource_id_mask of the connection setup
+        - refresh (Callable): returns a new (start_id, count) range, None if not supported
+        ### Returns
+        - None
+        """
+        if not mask:
+            raise ResourceIdError("empty resource id mask")
+        self.base = base
+        self.mask = mask
+        self.increment = mask & -mask
+        self._shift = self.increment.bit_length() - 1
+        self._next = base  # next never allocated id
+        self._max = base | mask  # last id of the current range
+        self._free: list[int] = []
+        self._bitmap = bytearray()  # bit n is set if (base | n << shift) is allocated
+        self._refresh = refresh
+        self.allocated = 0  # number of ids in use
+
+    def _index(self, xid: int) -> int:
+        return (xid & self.mask) >> self._shift
+
+    def _mark(self, index: int) -> None:
+        byte = index >> 3
+        if byte >= len(self._bitmap):
+            self._bitmap.extend(bytes(max(byte + 1 - len(self._bitmap), len(self._bitmap))))
+        self._bitmap[byte] |= 1 << (index & 7)
+
+    def is_allocated(self, xid: int) -> bool:
+        index = self._index(xid)
+        byte = index >> 3
+        return byte < len(self._bitmap) and bool(self._bitmap[byte] & (1 << (index & 7)))
+
+    def alloc(self) -> int:
+        """
+        Return back an unused resource id
+        """
+        if self._free:
+            xid = self._free.pop()
+        else:
+            if self._next > self._max:
+                self._new_range()
+            xid = self._next
+            self._next += self.increment
+
+        self._mark(self._index(xid))
+        self.allocated += 1
+        return xid
+
+    def free(self, xid: int) -> None:
+        """
+        Give back a resource id(after the resource has been destroyed on the server)
+        """
+        index = self._index(xid)
+        byte = index >> 3
+        bit = 1 << (index & 7)
+        if (xid & ~self.mask) != self.base or byte >= len(self._bitmap) or not self._bitmap[byte] & bit:
+            raise ResourceIdError(f"resource id {xid:#x} is not allocated")
+
+        self._bitmap[byte] &= ~bit
+        self._free.append(xid)
+        self.allocated -= 1
+
+    def _new_range(self) -> None:
+        if self._refresh is None:
+            raise ResourceIdError("resource ids exhausted")
+        start, count = self._refresh()
+        if not count:
+            raise ResourceIdError("resource ids exhausted, the server has no unused range")
+        self._next = start
+        self._max = start + (count - 1) * self.increment
+
+    def __repr__(self) -> str:
+        return f"<XIDAllocator base={self.base:#x} mask={self.mask:#x} allocated={self.allocated}>"
@@ -0,0 +1,53 @@
+# Micro-benchmark of the X11 wire codec(protocol/bds.py)
+# usage: python -m slodon.slodonix.systems.x.tests.bench_bds [number]
+import sys
+import timeit
+
+# This project
+from slodon.slodonix.systems.x.protocol.bds import *
+
+
+def _request_args(request: Request) -> tuple:
+    return tuple(0 for _ in request.names)
+
+
+def bench_encode(number: int) -> None:
+    """
+    Encode every request into one reusable buffer(cleared per batch of 1000 requests)
+    """
+    out = WriteBuffer()
+    for request in REQUESTS.values():
+        args = _request_args(request)
+        opcode = 128 if request.extension else None
+        encode = request.encode
+
+        def run():
+            for _ in range(1000):
+                encode(out, *args, opcode=opcode)
+            out.clear()
+
+        seconds = timeit.timeit(run, number=number // 1000 or 1)
+        print(f"encode {request.name:<28} {number / seconds:>14,.0f} msg/s")
+
+
+def bench_decode(number: int) -> None:
+    """
+    Decode replies and events from a memoryview over a single buffer
+    """
+    layouts = [request.reply for request in REQUESTS.values() if request.reply] + list(EVENTS.values())
+    buffer = bytearray(64)
+    view = memoryview(buffer)
+    for layout in layouts:
+        unpack_from = layout.unpack_from
+        seconds = timeit.timeit(lambda: unpack_from(view, 0), number=number)
+        print(f"decode {layout.name:<28} {number / seconds:>14,.0f} msg/s")
+
+    get = EVENTS[6].get
+    seconds = timeit.timeit(lambda: get(view, "event", 0), number=number)
+    print(f"decode {'MotionNotify.event (lazy)':<28} {number / seconds:>14,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    bench_encode(n)
+    bench_decode(n)
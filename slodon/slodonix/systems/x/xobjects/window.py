@@ -1,7 +1,41 @@
 # https://tronche.com/gui/x/xlib/window/
 # https://tronche.com/gui/x/xlib/window/attributes
+# https://tronche.com/gui/x/xlib/window-information/XQueryTree.html
+from __future__ import annotations
 
-__all__ = ["create_window", "destroy_window", "XWindow"]
+import struct
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+# This project
+from slodon.slodonix.systems.x.protocol import bds
+
+if TYPE_CHECKING:
+    from slodon.slodonix.systems.x.display.display import Display
+    from slodon.slodonix.systems.x.events.event import _EventType
+
+__all__ = ["create_window", "destroy_window", "XWindow", "WindowNode", "WindowTree"]
+
+# https://www.x.org/releases/X11R7.7/doc/xproto/x11protocol.html#Encoding::Common_Types (SETofEVENT)
+SUBSTRUCTURE_NOTIFY_MASK = 1 << 19
+PROPERTY_CHANGE_MASK = 1 << 22
+CW_EVENT_MASK = 1 << 11  # value_mask bit of ChangeWindowAttributes
+
+# map_state of GetWindowAttributes
+IS_UNMAPPED = 0
+
+CREATE_NOTIFY = 16
+DESTROY_NOTIFY = 17
+UNMAP_NOTIFY = 18
+MAP_NOTIFY = 19
+REPARENT_NOTIFY = 21
+CONFIGURE_NOTIFY = 22
+PROPERTY_NOTIFY = 28
+_TREE_EVENTS = frozenset(
+    (CREATE_NOTIFY, DESTROY_NOTIFY, UNMAP_NOTIFY, MAP_NOTIFY, REPARENT_NOTIFY, CONFIGURE_NOTIFY, PROPERTY_NOTIFY)
+)
+
+_CARD32 = struct.Struct(bds.BYTE_ORDER + "I")
+_NAME_LENGTH = 256  # longest name fetched, in 4-byte units
 
 
 class XWindow:
@@ -61,3 +95,432 @@ def create_window(simple=False):
 def destroy_window():
     # https://tronche.com/gui/x/xlib/window/destroy.html
     pass
+
+
+class WindowNode:
+    """
+    Cached state of a window of a WindowTree. The position is relative to the parent(like XWindowAttributes.x/y),
+    children are in stacking order(bottom first).
+    """
+
+    __slots__ = (
+        "id", "parent", "children", "x", "y", "width", "height", "border_width", "mapped", "override_redirect",
+        "name",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        parent: int,
+        x: int = 0,
+        y: int = 0,
+        width: int = 0,
+        height: int = 0,
+        border_width: int = 0,
+        mapped: bool = False,
+        override_redirect: bool = False,
+    ) -> None:
+        self.id = id
+        self.parent = parent  # 0 for the root window
+        self.children: list[int] = []
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.border_width = border_width
+        self.mapped = mapped
+        self.override_redirect = override_redirect
+        self.name: str | None = None  # _NET_WM_NAME, or WM_NAME
+
+    def __repr__(self) -> str:
+        return (
+            f"<WindowNode {self.id:#x} name={self.name!r} parent={self.parent:#x} "
+            f"{self.width}x{self.height}+{self.x}+{self.y} mapped={self.mapped}>"
+        )
+
+
+class _Watch:
+    """
+    Queued requests of a window entering the tree, their replies are applied when they arrive
+    """
+
+    __slots__ = ("window", "parent", "tree", "attributes", "geometry", "net_name", "name")
+
+    def __init__(self, window: int, parent: int, tree=None, attributes=None, geometry=None, net_name=None, name=None):
+        self.window = window
+        self.parent = parent
+        self.tree = tree  # None: only the name is refreshed
+        self.attributes = attributes
+        self.geometry = geometry
+        self.net_name = net_name
+        self.name = name
+
+    @property
+    def done(self) -> bool:
+        # replies come back in order, the last queued one is enough
+        last = self.name or self.geometry or self.tree
+        return last is None or last.done
+
+
+class WindowTree:
+    """
+    Window hierarchy of a screen cached on the client.
+
+    `seed()` reads the whole tree with one pipelined QueryTree/GetWindowAttributes/GetGeometry batch per level
+    and selects SubstructureNotify on every window. Afterwards the tree is kept current by the
+    Create/Destroy/Map/Unmap/Reparent/ConfigureNotify events(and PropertyNotify for the names), so the lookups
+    by id, by name and by point never make a round trip: perception costs O(changes) instead of O(windows).
+    """
+
+    def __init__(self, display: Display, root: int | None = None, names: bool = True) -> None:
+        """
+        WindowTree initialization
+        ### Arguments
+        - display (Display): the display of the windows
+        - root (int): the root window of the tree, the root of the first screen by default
+        - names (bool): also cache the window names(_NET_WM_NAME or WM_NAME) and follow their changes
+        ### Returns
+        - None
+        """
+        self.display = display
+        self.connection = display.connection
+        self.root: int = root if root is not None else self.connection.setup.roots[0]
+        self.names = names
+        self.windows: dict[int, WindowNode] = {}
+        self._by_name: dict[str, set[int]] = {}
+        self._watching: list[_Watch] = []  # windows whose replies have not arrived yet
+        self._mask = SUBSTRUCTURE_NOTIFY_MASK | (PROPERTY_CHANGE_MASK if names else 0)
+        self._name_atoms: tuple[int, int] = (0, 0)
+
+    # -------------------------------------------------------------------------------------------------------
+    # Requests
+    # -------------------------------------------------------------------------------------------------------
+
+    def _queue(self, window: int, parent: int, full: bool) -> _Watch:
+        """
+        Select the events of a window and queue the requests describing it. The events are selected first, so
+        no change is missed between the replies and the first event.
+        """
+        request = self.connection.request
+        if window in self.connection.setup.roots:  # shared with the other users of the root window
+            self.display.select_root_events(window, self._mask)
+        else:
+            request(bds.CHANGE_WINDOW_ATTRIBUTES, window, CW_EVENT_MASK, tail=_CARD32.pack(self._mask))
+        watch = _Watch(window, parent, request(bds.QUERY_TREE, window))
+        if full:
+            watch.attributes = request(bds.GET_WINDOW_ATTRIBUTES, window)
+            watch.geometry = request(bds.GET_GEOMETRY, window)
+        if self.names:
+            self._queue_names(watch)
+        return watch
+
+    def _queue_names(self, watch: _Watch) -> None:
+        net_name, name = self._name_atoms
+        request = self.connection.request
+        watch.net_name = request(bds.GET_PROPERTY, False, watch.window, net_name, 0, 0, _NAME_LENGTH)
+        watch.name = request(bds.GET_PROPERTY, False, watch.window, name, 0, 0, _NAME_LENGTH)
+
+    def _apply(self, watch: _Watch) -> list[int]:
+        """
+        Store the replies of a watched window, return back its children unknown so far(an empty list if the
+        window has been destroyed meanwhile)
+        """
+        window = watch.window
+        if watch.tree is None:
+            node = self.windows.get(window)
+            name = self._name_of(watch.net_name) or self._name_of(watch.name, "latin-1")
+            if node is not None:
+                self._set_name(node, name)
+            return []
+
+        tree = watch.tree.reply(check=False)
+        if tree is None:  # destroyed before the requests were processed, the errors are dropped
+            for cookie in (watch.attributes, watch.geometry, watch.net_name, watch.name):
+                if cookie is not None:
+                    cookie.reply(check=False)
+            if window in self.windows:
+                self._remove(window)
+            elif watch.parent in self.windows:  # listed by the QueryTree of its parent
+                self._detach(WindowNode(window, watch.parent))
+            return []
+        children_len = bds.QUERY_TREE.reply.get(tree, "children_len")
+        children = struct.unpack_from(f"{bds.BYTE_ORDER}{children_len}I", bds.QUERY_TREE.reply.tail(tree))
+
+        node = self.windows.get(window)
+        if node is None:
+            if watch.parent and watch.parent not in self.windows:  # the parent is gone meanwhile
+                return []
+            node = self.windows[window] = WindowNode(window, watch.parent)
+            if watch.parent:
+                self._attach(node, watch.parent, top=True)
+        if watch.attributes is not None:
+            # decoded before waiting on the geometry, whatever the lifetime of the reply buffer
+            attributes = watch.attributes.reply(check=False)
+            if attributes is not None:
+                reply = bds.GET_WINDOW_ATTRIBUTES.reply
+                mapped = reply.get(attributes, "map_state") != IS_UNMAPPED
+                override_redirect = bool(reply.get(attributes, "override_redirect"))
+            geometry = watch.geometry.reply(check=False)
+            if attributes is not None and geometry is not None:
+                node.mapped = mapped
+                node.override_redirect = override_redirect
+                _, _, _, _, _, node.x, node.y, node.width, node.height, node.border_width = (
+                    bds.GET_GEOMETRY.reply.unpack_from(geometry)
+                )
+        if watch.name is not None:
+            self._set_name(node, self._name_of(watch.net_name) or self._name_of(watch.name, "latin-1"))
+
+        # the reply has the stacking order, children created after it are only known from their CreateNotify
+        listed = set(children)
+        node.children = list(children) + [
+            child for child in node.children if child not in listed and child in self.windows
+        ]
+        return [child for child in children if child not in self.windows]
+
+    @staticmethod
+    def _name_of(cookie, encoding: str = "utf-8") -> str | None:
+        reply = cookie.reply(check=False)
+        if reply is None or not bds.GET_PROPERTY.reply.get(reply, "format"):
+            return None
+        value_len = bds.GET_PROPERTY.reply.get(reply, "value_len")
+        return bytes(bds.GET_PROPERTY.reply.tail(reply)[:value_len]).decode(encoding, errors="replace")
+
+    # -------------------------------------------------------------------------------------------------------
+    # Seeding and updating
+    # -------------------------------------------------------------------------------------------------------
+
+    def seed(self) -> None:
+        """
+        (Re)read the whole tree: one flush and one round trip per level of the hierarchy
+        """
+        atoms = self.display.atoms
+        if self.names:
+            atoms.prefetch(("_NET_WM_NAME", "WM_NAME"))
+            self._name_atoms = (atoms["_NET_WM_NAME"], atoms["WM_NAME"])
+        self.windows.clear()
+        self._by_name.clear()
+        self._watching.clear()
+
+        level = [(self.root, 0)]
+        while level:
+            watches = [self._queue(window, parent, True) for window, parent in level]
+            level = [(child, watch.window) for watch in watches for child in self._apply(watch)]
+
+    def refresh(self) -> int:
+        """
+        Read whatever the server has sent and apply it, without waiting. Every buffered event of the connection
+        is consumed: if the events are dispatched elsewhere, pass them to handle() instead.
+        Returns back the number of events applied.
+        """
+        self.connection.poll()
+        applied = sum(self.handle(event) for event in self.connection.decoded_events(self.display))
+        self.resolve()
+        return applied
+
+    def resolve(self) -> None:
+        """
+        Apply the replies received so far for the windows created since the seed(never blocks)
+        """
+        if not self._watching:
+            return
+        self.connection.flush()
+        waiting = []
+        for watch in self._watching:
+            if not watch.done:
+                waiting.append(watch)
+                continue
+            for child in self._apply(watch):
+                waiting.append(self._queue(child, watch.window, True))
+        self._watching = waiting
+
+    def handle(self, event: _EventType) -> bool:
+        """
+        Apply an event to the tree, return back True if it was relevant. Events of windows outside the tree
+        are ignored, and every event can be applied more than once(ReparentNotify is reported to both parents).
+        """
+        code = event.type
+        if code not in _TREE_EVENTS:
+            return False
+        windows = self.windows
+        window = event.get("window")  # `event.window` is the window the event was reported to
+        if code == CONFIGURE_NOTIFY:
+            node = windows.get(window)
+            if node is None:
+                return False
+            node.x, node.y, node.width, node.height = event.x, event.y, event.width, event.height
+            node.border_width = event.border_width
+            node.override_redirect = bool(event.override_redirect)
+            self._restack(node, event.above_sibling)
+        elif code == MAP_NOTIFY or code == UNMAP_NOTIFY:
+            node = windows.get(window)
+            if node is None:
+                return False
+            node.mapped = code == MAP_NOTIFY
+        elif code == CREATE_NOTIFY:
+            parent = event.parent
+            if parent not in windows:
+                return False
+            node = windows.get(window)
+            if node is None:
+                node = windows[window] = WindowNode(window, parent)
+                self._attach(node, parent, top=True)
+                self._watching.append(self._queue(window, parent, False))
+            node.x, node.y, node.width, node.height = event.x, event.y, event.width, event.height
+            node.border_width = event.border_width
+            node.override_redirect = bool(event.override_redirect)
+        elif code == DESTROY_NOTIFY:
+            if window not in windows:
+                return False
+            self._remove(window)
+        elif code == REPARENT_NOTIFY:
+            node = windows.get(window)
+            parent = event.parent
+            if node is None:
+                return False
+            if parent not in windows:  # moved out of the tree
+                self._remove(node.id)
+                return True
+            if node.parent != parent:
+                self._detach(node)
+                self._attach(node, parent, top=True)
+            node.x, node.y = event.x, event.y
+            node.override_redirect = bool(event.override_redirect)
+        elif code == PROPERTY_NOTIFY:
+            if not self.names or event.atom not in self._name_atoms or window not in windows:
+                return False
+            watch = _Watch(window, windows[window].parent)
+            self._queue_names(watch)
+            self._watching.append(watch)
+        return True
+
+    # -------------------------------------------------------------------------------------------------------
+    # Tree maintenance
+    # -------------------------------------------------------------------------------------------------------
+
+    def _attach(self, node: WindowNode, parent: int, top: bool) -> None:
+        node.parent = parent
+        siblings = self.windows[parent].children
+        if node.id not in siblings:
+            if top:
+                siblings.append(node.id)
+            else:
+                siblings.insert(0, node.id)
+
+    def _detach(self, node: WindowNode) -> None:
+        parent = self.windows.get(node.parent)
+        if parent is not None and node.id in parent.children:
+            parent.children.remove(node.id)
+
+    def _restack(self, node: WindowNode, above: int) -> None:
+        siblings = self.windows[node.parent].children if node.parent in self.windows else None
+        if siblings is None or node.id not in siblings:
+            return
+        siblings.remove(node.id)
+        if not above or above not in siblings:
+            siblings.insert(0, node.id)  # bottom of the stack
+        else:
+            siblings.insert(siblings.index(above) + 1, node.id)
+
+    def _remove(self, window: int) -> None:
+        node = self.windows.get(window)
+        if node is None:
+            return
+        self._detach(node)
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            self.windows.pop(node.id, None)
+            self._set_name(node, None)
+            stack.extend(self.windows[child] for child in node.children if child in self.windows)
+
+    def _set_name(self, node: WindowNode, name: str | None) -> None:
+        if node.name == name:
+            return
+        if node.name is not None:
+            ids = self._by_name.get(node.name)
+            if ids is not None:
+                ids.discard(node.id)
+                if not ids:
+                    del self._by_name[node.name]
+        node.name = name
+        if name is not None and node.id in self.windows:
+            self._by_name.setdefault(name, set()).add(node.id)
+
+    # -------------------------------------------------------------------------------------------------------
+    # Lookups, no round trip
+    # -------------------------------------------------------------------------------------------------------
+
+    def get(self, window: int) -> WindowNode | None:
+        return self.windows.get(window)
+
+    def __getitem__(self, window: int) -> WindowNode:
+        return self.windows[window]
+
+    def __contains__(self, window: int) -> bool:
+        return window in self.windows
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    def __iter__(self) -> Iterator[WindowNode]:
+        return iter(self.windows.values())
+
+    def find(self, name: str, exact: bool = True) -> list[WindowNode]:
+        """
+        Return back the windows named name(or whose name contains it if not exact)
+        """
+        if exact:
+            ids: Iterable[int] = self._by_name.get(name, ())
+        else:
+            ids = [window for key, ids in self._by_name.items() if name in key for window in ids]
+        return [self.windows[window] for window in ids]
+
+    def top_level(self) -> list[WindowNode]:
+        """
+        The children of the root window, in stacking order(bottom first)
+        """
+        windows = self.windows
+        return [windows[window] for window in windows[self.root].children if window in windows]
+
+    def position(self, window: int) -> tuple[int, int]:
+        """
+        Position of the inside of a window(border excluded) in root coordinates
+        """
+        x = y = 0
+        node = self.windows[window]
+        while node.parent:
+            x += node.x + node.border_width
+            y += node.y + node.border_width
+            node = self.windows[node.parent]
+        return x, y
+
+    def at(self, x: int, y: int, top_level: bool = False) -> WindowNode | None:
+        """
+        Return back the deepest(or the top-level) viewable window containing the point(root coordinates)
+        """
+        windows = self.windows
+        node = windows.get(self.root)
+        if node is None:
+            return None
+        found = None
+        origin_x = origin_y = 0  # inside corner of node in root coordinates
+        while True:
+            for child in reversed(node.children):  # topmost first
+                child = windows.get(child)
+                if child is None or not child.mapped:
+                    continue
+                left = origin_x + child.x
+                top = origin_y + child.y
+                border = 2 * child.border_width
+                if left <= x < left + child.width + border and top <= y < top + child.height + border:
+                    break
+            else:
+                return found
+            found = node = child
+            if top_level:
+                return found
+            origin_x = left + child.border_width
+            origin_y = top + child.border_width
+
+    def __repr__(self) -> str:
+        return f"<WindowTree root={self.root:#x} windows={len(self.windows)} pending={len(self._watching)}>"
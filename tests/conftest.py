@@ -0,0 +1,39 @@
+import os
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from tests.fakex import SOCKET_DIR, FakeX, free_display_number
+
+
+@pytest.fixture
+def fake_x():
+    server = FakeX()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def xvfb():
+    """
+    Name of a fresh 800x600x24 Xvfb display with a black root window, the test is skipped when Xvfb is not
+    installed
+    """
+    if shutil.which("Xvfb") is None:
+        pytest.skip("Xvfb is not installed")
+    number = free_display_number()
+    server = subprocess.Popen(
+        ["Xvfb", f":{number}", "-screen", "0", "800x600x24", "-br", "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 10.0
+        while not os.path.exists(f"{SOCKET_DIR}/X{number}"):
+            assert server.poll() is None and time.monotonic() < deadline, "Xvfb did not start"
+            time.sleep(0.05)
+        yield f":{number}"
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,357 @@
+# A scripted X server on a unix socket, enough of the protocol to test the client without Xvfb
+import ctypes
+import ctypes.util
+import os
+import socket
+import struct
+import threading
+
+__all__ = ["FakeX", "free_display_number"]
+
+SOCKET_DIR = "/tmp/.X11-unix"
+
+ROOT = 0x100
+COLORMAP = 0x20
+VISUAL = 0x21
+
+
+def free_display_number(start: int = 90) -> int:
+    number = start
+    while os.path.exists(f"{SOCKET_DIR}/X{number}") or os.path.exists(f"/tmp/.X{number}-lock"):
+        number += 1
+    return number
+
+
+class FakeX:
+    """
+    Answers the requests of every client from a thread: the core requests used by the library, and the
+    extensions listed in `extensions`(name -> (major opcode, first event, first error)). `handlers` overrides
+    the answer of an opcode: handler(client, sequence, data, body) -> bytes | None.
+    Every request is recorded in `requests` as (opcode, data, body).
+    """
+
+    def __init__(self, number: int | None = None, width: int = 1920, height: int = 1080, shm: bool = False) -> None:
+        self.number = free_display_number() if number is None else number
+        self.name = f":{self.number}"
+        self.path = f"{SOCKET_DIR}/X{self.number}"
+        self.width, self.height = width, height
+        self.root = ROOT
+        self.pointer = (11, 22)
+        self.geometry = {ROOT: (0, 0, width, height)}
+        self.children: dict[int, list[int]] = {ROOT: []}  # bottom to top
+        self.unmapped: set[int] = set()
+        self.event_masks: dict[int, int] = {}  # window -> events selected by the clients(a single mask for all)
+        self.selections: dict[int, int] = {}  # selection atom -> owner window
+        self.time = 1000  # server time of the generated events
+        self.properties: dict[tuple[int, int], tuple[int, int, bytes]] = {}  # (window, atom) -> (type, format, value)
+        # keycode -> (keysym, shifted keysym): a..z from 38, shift and control as on a PC keyboard
+        self.keymap = {38 + index: (ord("a") + index, ord("A") + index) for index in range(26)}
+        self.keymap.update({50: (0xFFE1, 0), 37: (0xFFE3, 0)})
+        self.modifier_map = ((50,), (), (37,), (), (), (), (), ())
+        self.atoms: dict[bytes, int] = {}
+        self.atom_names: dict[int, bytes] = {}
+        self.extensions = {b"XTEST": (140, 0, 0), b"RANDR": (142, 89, 147)}
+        self.randr_version = (1, 5)
+        self.resource_id_base, self.resource_id_mask = 0x200000, 0x1FFFFF
+        self.xid_ranges: list[tuple[int, int]] = []  # XCMiscGetXIDRange answers, (0, 0) once empty
+        self.monitors: list[tuple] = []  # RRGetMonitors: (name atom, primary, x, y, width, height)
+        self.xinerama_screens: list[tuple[int, int, int, int]] = []  # XineramaQueryScreens: (x, y, width, height)
+        self.record_streams: dict[int, tuple[socket.socket, int]] = {}  # enabled RECORD context -> (client, sequence)
+        if shm:  # the segments are attached in this process, like a local server would
+            self.extensions[b"MIT-SHM"] = (145, 65, 128)
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            self._libc.shmat.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_int)
+            self._libc.shmat.restype = ctypes.c_void_p
+            self._libc.shmdt.argtypes = (ctypes.c_void_p,)
+        self.segments: dict[int, int] = {}  # MIT-SHM segment -> address
+        self.handlers = {}
+        self.requests: list[tuple[int, int, bytes]] = []
+        self.clients: list[socket.socket] = []
+
+        os.makedirs(SOCKET_DIR, exist_ok=True)
+        self._server = socket.socket(socket.AF_UNIX)
+        self._server.bind(self.path)
+        self._server.listen(8)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def intern(self, name: bytes) -> int:
+        if name not in self.atoms:
+            atom = 100 + len(self.atoms)
+            self.atoms[name] = atom
+            self.atom_names[atom] = name
+        return self.atoms[name]
+
+    def requests_of(self, opcode: int) -> list[tuple[int, bytes]]:
+        return [(data, body) for op, data, body in self.requests if op == opcode]
+
+    @staticmethod
+    def pixels(x: int, y: int, width: int, height: int) -> bytes:
+        """
+        BGRX pixels of a region of the screen: the pixel at (x, y) is (x, y, x ^ y, 0xFF)
+        """
+        pixels = bytearray()
+        for row in range(y, y + height):
+            for column in range(x, x + width):
+                pixels += bytes((column & 0xFF, row & 0xFF, (column ^ row) & 0xFF, 0xFF))
+        return bytes(pixels)
+
+    def send_event(self, event: bytes, client: int = 0) -> None:
+        """
+        Send a raw 32-byte event to a client
+        """
+        assert len(event) == 32
+        self.clients[client].sendall(event)
+
+    def intercept(self, context: int, events: bytes, category: int = 0) -> None:
+        """
+        Send intercepted data(FromServer by default) on the stream of an enabled RECORD context
+        """
+        client, sequence = self.record_streams[context]
+        client.sendall(self._record_reply(sequence, category, events))
+
+    def _record_reply(self, sequence: int, category: int, data: bytes = b"") -> bytes:
+        return self.reply(sequence, category, struct.pack("<BB2xIII", 0, 0, 0, self.time, 0), data)
+
+    # -------------------------------------------------------------------------------------------------------
+    # Wire
+    # -------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def reply(sequence: int, data: int = 0, body: bytes = b"", tail: bytes = b"") -> bytes:
+        body = body.ljust(24, b"\0")
+        extra = len(body) - 24 + len(tail)
+        extra += -extra & 3
+        return struct.pack("<BBHI", 1, data, sequence & 0xFFFF, extra // 4) + body + tail + bytes(-len(tail) & 3)
+
+    @staticmethod
+    def error(sequence: int, code: int, value: int, major: int) -> bytes:
+        return struct.pack("<BBHIHB21x", 0, code, sequence & 0xFFFF, value, 0, major)
+
+    def _setup(self) -> bytes:
+        vendor = b"FakeX"
+        screen = struct.pack(
+            "<IIIIIHHHHHHIBBBB", ROOT, COLORMAP, 0xFFFFFF, 0, 0, self.width, self.height, 500, 300, 1, 1, VISUAL,
+            0, 0, 24, 1,
+        )
+        depth = struct.pack("<BxHxxxx", 24, 1) + struct.pack("<IBBHIIIxxxx", VISUAL, 4, 8, 256, 0xFF0000, 0xFF00, 0xFF)
+        pixmap_format = struct.pack("<BBBxxxxx", 24, 32, 32)
+        body = struct.pack(
+            "<IIIIHHBBBBBBBBxxxx", 12000000, self.resource_id_base, self.resource_id_mask, 256, len(vendor), 65535, 1, 1, 0, 0, 32, 32, 8, 255,
+        )
+        body += vendor + bytes(-len(vendor) & 3) + pixmap_format + screen + depth
+        return struct.pack("<BxHHH", 1, 11, 0, len(body) // 4) + body
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            self.clients.append(client)
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    @staticmethod
+    def _receive(client: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = client.recv(size - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return data
+
+    def _serve(self, client: socket.socket) -> None:
+        try:
+            header = self._receive(client, 12)
+            name_len, data_len = struct.unpack_from("<HH", header, 6)
+            self._receive(client, name_len + (-name_len & 3) + data_len + (-data_len & 3))
+            client.sendall(self._setup())
+            sequence = 0
+            while True:
+                opcode, data, length = struct.unpack("<BBH", self._receive(client, 4))
+                body = self._receive(client, length * 4 - 4)
+                sequence += 1
+                self.requests.append((opcode, data, body))
+                answer = self._answer(client, sequence, opcode, data, body)
+                if answer:
+                    client.sendall(answer)
+        except (EOFError, OSError):
+            pass
+
+    def _answer(self, client: socket.socket, sequence: int, opcode: int, data: int, body: bytes) -> bytes | None:
+        if opcode in self.handlers:
+            return self.handlers[opcode](client, sequence, data, body)
+        if opcode == 1:  # CreateWindow
+            window, parent, x, y, width, height, _, _, _, value_mask = struct.unpack_from("<IIhhHHHHII", body)
+            self.geometry[window] = (x, y, width, height)
+            self.children.setdefault(parent, []).append(window)
+            if value_mask & 1 << 11:
+                index = bin(value_mask & (1 << 11) - 1).count("1")
+                self.event_masks[window] = struct.unpack_from("<I", body, 28 + 4 * index)[0]
+            return None
+        if opcode == 4:  # DestroyWindow
+            (window,) = struct.unpack_from("<I", body)
+            self.geometry.pop(window, None)
+            for children in self.children.values():
+                if window in children:
+                    children.remove(window)
+            return None
+        if opcode == 18:  # ChangeProperty, PropertyNotify(NewValue) for the windows selecting PropertyChange
+            window, atom, type, format, length = struct.unpack_from("<IIIB3xI", body)
+            value = body[20:20 + length * format // 8]
+            if data == 2 and (window, atom) in self.properties:  # Append
+                value = self.properties[window, atom][2] + value
+            self.properties[window, atom] = (type, format, value)
+            if self.event_masks.get(window, 0) & 1 << 22:
+                self.time += 1
+                return struct.pack("<BxHIIIB", 28, sequence & 0xFFFF, window, atom, self.time, 0).ljust(32, b"\0")
+            return None
+        if opcode == 22:  # SetSelectionOwner
+            owner, selection = struct.unpack_from("<II", body)
+            self.selections[selection] = owner
+            return None
+        if opcode == 23:  # GetSelectionOwner
+            (selection,) = struct.unpack_from("<I", body)
+            return self.reply(sequence, body=struct.pack("<I", self.selections.get(selection, 0)))
+        if opcode == 2:  # ChangeWindowAttributes
+            window, value_mask = struct.unpack_from("<II", body)
+            if value_mask & 1 << 11:  # the event mask, after the values of the lower bits
+                index = bin(value_mask & (1 << 11) - 1).count("1")
+                self.event_masks[window] = struct.unpack_from("<I", body, 8 + 4 * index)[0]
+            return None
+        if opcode == 3:  # GetWindowAttributes
+            (window,) = struct.unpack_from("<I", body)
+            if window not in self.geometry:
+                return self.error(sequence, 3, window, opcode)
+            map_state = 0 if window in self.unmapped else 2
+            mask = self.event_masks.get(window, 0)
+            return self.reply(
+                sequence, 0,
+                struct.pack("<IHBBIIBBBBIIIHxx", VISUAL, 1, 0, 0, 0, 0, 0, 1, map_state, 0, COLORMAP, mask, mask, 0),
+            )
+        if opcode == 15:  # QueryTree
+            (window,) = struct.unpack_from("<I", body)
+            if window not in self.geometry:
+                return self.error(sequence, 3, window, opcode)
+            children = self.children.get(window, [])
+            parent = next((parent for parent, listed in self.children.items() if window in listed), 0)
+            return self.reply(
+                sequence, body=struct.pack("<IIH", ROOT, parent, len(children)),
+                tail=struct.pack(f"<{len(children)}I", *children),
+            )
+        if opcode == 20:  # GetProperty
+            window, atom = struct.unpack_from("<II", body)
+            if window not in self.geometry:
+                return self.error(sequence, 3, window, opcode)
+            if (window, atom) not in self.properties:
+                return self.reply(sequence, 0, bytes(12))
+            type, format, value = self.properties[window, atom]
+            return self.reply(sequence, format, struct.pack("<III", type, 0, len(value) * 8 // format), value)
+        if opcode == 14:  # GetGeometry
+            (drawable,) = struct.unpack_from("<I", body)
+            if drawable not in self.geometry:
+                return self.error(sequence, 9, drawable, opcode)
+            x, y, width, height = self.geometry[drawable]
+            return self.reply(sequence, 24, struct.pack("<IhhHHH", ROOT, x, y, width, height, 0))
+        if opcode == 16:  # InternAtom
+            (length,) = struct.unpack_from("<H", body)
+            name = body[4:4 + length]
+            if data and name not in self.atoms:
+                return self.reply(sequence, body=struct.pack("<I", 0))
+            return self.reply(sequence, body=struct.pack("<I", self.intern(name)))
+        if opcode == 17:  # GetAtomName
+            (atom,) = struct.unpack_from("<I", body)
+            if atom not in self.atom_names:
+                return self.error(sequence, 5, atom, opcode)
+            name = self.atom_names[atom]
+            return self.reply(sequence, body=struct.pack("<H", len(name)), tail=name)
+        if opcode == 38:  # QueryPointer
+            x, y = self.pointer
+            return self.reply(sequence, 1, struct.pack("<IIhhhhH", ROOT, 0, x, y, x, y, 0))
+        if opcode == 40:  # TranslateCoordinates, only to the root window
+            window, _, x, y = struct.unpack_from("<IIhh", body)
+            if window not in self.geometry:
+                return self.error(sequence, 3, window, opcode)
+            while window != ROOT:
+                x += self.geometry[window][0]
+                y += self.geometry[window][1]
+                window = next(parent for parent, listed in self.children.items() if window in listed)
+            return self.reply(sequence, 1, struct.pack("<Ihh", 0, x, y))
+        if opcode == 43:  # GetInputFocus
+            return self.reply(sequence, 1, struct.pack("<I", ROOT))
+        if opcode == 73:  # GetImage
+            _, x, y, width, height, _ = struct.unpack_from("<IhhHHI", body)
+            return self.reply(sequence, 24, struct.pack("<I", VISUAL), self.pixels(x, y, width, height))
+        if opcode == self.extensions.get(b"MIT-SHM", (None,))[0]:
+            if data == 1:  # ShmAttach
+                segment, shmid = struct.unpack_from("<II", body)
+                self.segments[segment] = self._libc.shmat(shmid, None, 0)
+            elif data == 2:  # ShmDetach
+                self._libc.shmdt(self.segments.pop(struct.unpack_from("<I", body)[0]))
+            elif data == 4:  # ShmGetImage
+                _, x, y, width, height, _, _, segment, offset = struct.unpack_from("<IhhHHIB3xII", body)
+                if segment not in self.segments:
+                    return self.error(sequence, 128, segment, opcode)
+                pixels = self.pixels(x, y, width, height)
+                ctypes.memmove(self.segments[segment] + offset, pixels, len(pixels))
+                return self.reply(sequence, 24, struct.pack("<II", VISUAL, len(pixels)))
+            return None
+        if opcode == self.extensions.get(b"RANDR", (None,))[0]:
+            if data == 0:  # RRQueryVersion
+                return self.reply(sequence, body=struct.pack("<II", *self.randr_version))
+            if data == 42:  # RRGetMonitors, without outputs
+                tail = b"".join(
+                    struct.pack("<IBBHhhHHII", name, primary, 0, 0, x, y, width, height, 0, 0)
+                    for name, primary, x, y, width, height in self.monitors
+                )
+                return self.reply(sequence, body=struct.pack("<III", 0, len(self.monitors), 0), tail=tail)
+            return None
+        if opcode == self.extensions.get(b"DAMAGE", (None,))[0]:
+            if data == 0:  # DamageQueryVersion
+                return self.reply(sequence, body=struct.pack("<II", 1, 1))
+            return None
+        if opcode == self.extensions.get(b"XINERAMA", (None,))[0]:
+            if data == 5:  # XineramaQueryScreens
+                tail = b"".join(struct.pack("<hhHH", *screen) for screen in self.xinerama_screens)
+                return self.reply(sequence, body=struct.pack("<I", len(self.xinerama_screens)), tail=tail)
+            return None
+        if opcode == self.extensions.get(b"RECORD", (None,))[0]:
+            if data == 0:  # RecordQueryVersion
+                return self.reply(sequence, body=struct.pack("<HH", 1, 13))
+            (context,) = struct.unpack_from("<I", body)
+            if data == 5:  # RecordEnableContext: StartOfData, the stream goes on with intercept()
+                self.record_streams[context] = (client, sequence)
+                return self._record_reply(sequence, 4)
+            if data == 6 and context in self.record_streams:  # RecordDisableContext: EndOfData on the stream
+                self.intercept(context, b"", 5)
+                del self.record_streams[context]
+            return None
+        if opcode == self.extensions.get(b"XC-MISC", (None,))[0]:
+            if data == 1:  # XCMiscGetXIDRange
+                start, count = self.xid_ranges.pop(0) if self.xid_ranges else (0, 0)
+                return self.reply(sequence, body=struct.pack("<II", start, count))
+            return None
+        if opcode == 101:  # GetKeyboardMapping
+            first, count = struct.unpack_from("<BB", body)
+            keysyms = [keysym for code in range(first, first + count) for keysym in self.keymap.get(code, (0, 0))]
+            return self.reply(sequence, 2, tail=struct.pack(f"<{len(keysyms)}I", *keysyms))
+        if opcode == 119:  # GetModifierMapping, one keycode per modifier
+            return self.reply(sequence, 1, tail=bytes(row[0] if row else 0 for row in self.modifier_map))
+        if opcode == 98:  # QueryExtension
+            (length,) = struct.unpack_from("<H", body)
+            name = body[4:4 + length]
+            if name in self.extensions:
+                return self.reply(sequence, body=struct.pack("<BBBB", 1, *self.extensions[name]))
+            return self.reply(sequence, body=bytes(4))
+        return None
+
+    def close(self) -> None:
+        self._server.close()
+        for client in self.clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)  # wakes up the serving thread, close() alone would not
+                client.close()
+            except OSError:
+                pass
+        if os.path.exists(self.path):
+            os.unlink(self.path)
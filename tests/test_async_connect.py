@@ -0,0 +1,97 @@
+import asyncio
+import socket
+
+import pytest
+
+from slodon.slodonix.systems.x.errors import BadDrawable, BadWindow, ConnectionClosedError
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.async_connect import AsyncConnection
+
+from tests.fakex import FakeX
+
+
+def test_close_before_connect_and_twice():
+    connection = AsyncConnection(":99")
+    connection.close()
+    connection.close()
+    assert not connection._status
+
+
+def test_socket_error_ends_the_event_iteration():
+    async def run():
+        connection = AsyncConnection(":99")
+        connection._loop = asyncio.get_running_loop()
+        connection._connection, peer = socket.socketpair()
+
+        async def fail():
+            raise OSError("connection reset")
+
+        connection.next_events = fail
+        events = [event async for event in connection]
+        peer.close()
+        return connection, events
+
+    connection, events = asyncio.run(run())
+    assert events == []
+    assert connection._lost is not None
+    assert connection._connection.fileno() == -1  # closed by the iterator
+
+
+def test_request_reply_round_trip(fake_x: FakeX):
+    async def run():
+        async with await AsyncConnection.open(fake_x.name) as connection:
+            geometry = connection.request(bds.GET_GEOMETRY, fake_x.root)
+            pointer = connection.request(bds.QUERY_POINTER, fake_x.root)
+            # awaited out of order: both are sent by the first flush, the replies are matched by sequence
+            assert bds.QUERY_POINTER.reply.get(await pointer, "root_x") == fake_x.pointer[0]
+            assert geometry.done
+            assert bds.GET_GEOMETRY.reply.get(await geometry, "width") == fake_x.width
+            await connection.query_extensions("XTEST", "XC-MISC")
+            assert connection.extension("XTEST") == (140, 0, 0)
+            assert connection.extension("XC-MISC") is None
+
+    asyncio.run(run())
+
+
+def test_error_reply_fails_only_its_cookie(fake_x: FakeX):
+    async def run():
+        async with await AsyncConnection.open(fake_x.name) as connection:
+            bad = connection.request(bds.GET_GEOMETRY, 0x999)
+            good = connection.request(bds.GET_GEOMETRY, fake_x.root)
+            with pytest.raises(BadDrawable):
+                await bad
+            assert await bad.reply(check=False) is None
+            assert bds.GET_GEOMETRY.reply.get(await good, "height") == fake_x.height
+            # an error nobody waits for is queued
+            connection.request(bds.MAP_WINDOW, 0x999)
+            fake_x.handlers[8] = lambda client, sequence, data, body: fake_x.error(sequence, 3, 0x999, 8)
+            await connection.sync()
+            error = await asyncio.wait_for(connection.next_error(), 1.0)
+            assert error.error_class is BadWindow and error.resource_id == 0x999
+
+    asyncio.run(run())
+
+
+def test_connection_loss_fails_the_pending_requests(fake_x: FakeX):
+    fake_x.handlers[14] = lambda client, sequence, data, body: None  # never answered
+    failures = []
+
+    async def run():
+        connection = await AsyncConnection.open(fake_x.name)
+        connection.request_stream(
+            bds.GET_GEOMETRY, fake_x.root, callback=lambda reply: False, failed=failures.append
+        )
+        cookie = connection.request(bds.GET_GEOMETRY, fake_x.root)
+        waiting = asyncio.ensure_future(cookie.reply())
+        while len(fake_x.requests_of(14)) < 2:
+            await asyncio.sleep(0.01)
+        fake_x.close()
+        with pytest.raises(ConnectionClosedError):
+            await asyncio.wait_for(waiting, 1.0)
+        assert not connection._streams
+        with pytest.raises(ConnectionClosedError):
+            await connection.request(bds.GET_INPUT_FOCUS).reply()
+        connection.close()
+
+    asyncio.run(run())
+    assert len(failures) == 1 and isinstance(failures[0], ConnectionClosedError)
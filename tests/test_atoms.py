@@ -0,0 +1,78 @@
+import asyncio
+
+from slodon.slodonix.systems.x.display.atoms import AtomTable
+from slodon.slodonix.systems.x.protocol.async_connect import AsyncConnection
+from slodon.slodonix.systems.x.protocol.connect import Connection
+
+from tests.fakex import FakeX
+
+INTERN_ATOM = 16
+GET_ATOM_NAME = 17
+
+
+def test_predefined_atoms_need_no_round_trip(fake_x: FakeX):
+    atoms = AtomTable(Connection(fake_x.name))
+    assert atoms["WM_NAME"] == 39 and atoms.name(39) == "WM_NAME"
+    assert atoms.name(0) == "None"
+    assert not fake_x.requests_of(INTERN_ATOM) and not fake_x.requests_of(GET_ATOM_NAME)
+
+
+def test_intern_is_cached(fake_x: FakeX):
+    atoms = AtomTable(Connection(fake_x.name))
+    atom = atoms.intern("_NET_WM_STATE")
+    assert atom == fake_x.atoms[b"_NET_WM_STATE"]
+    assert atoms["_NET_WM_STATE"] == atom and atoms.name(atom) == "_NET_WM_STATE"
+    assert "_NET_WM_STATE" in atoms and atoms.get("_NET_WM_STATE") == atom
+    assert len(fake_x.requests_of(INTERN_ATOM)) == 1 and not fake_x.requests_of(GET_ATOM_NAME)
+
+
+def test_only_if_exists_does_not_cache_a_missing_atom(fake_x: FakeX):
+    atoms = AtomTable(Connection(fake_x.name))
+    assert atoms.intern("_SLODON_MISSING", only_if_exists=True) == 0
+    assert "_SLODON_MISSING" not in atoms
+    fake_x.intern(b"_SLODON_MISSING")  # created by another client
+    assert atoms.intern("_SLODON_MISSING", only_if_exists=True) == fake_x.atoms[b"_SLODON_MISSING"]
+
+
+def test_names_are_not_padded(fake_x: FakeX):
+    atoms = AtomTable(Connection(fake_x.name))
+    names = [b"HDMI-1", b"DP-1", b"eDP-1-1", b"X"]  # every length modulo 4
+    created = [fake_x.intern(name) for name in names]
+    assert [atoms.name(atom) for atom in created] == [name.decode() for name in names]
+    assert atoms.get("HDMI-1") == created[0]  # cached in both directions, without the padding
+
+
+def test_prefetch_is_one_flush(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    atoms = AtomTable(connection)
+    names = ["UTF8_STRING", "CLIPBOARD", "TARGETS", "WM_NAME"]
+    atoms.prefetch(names)
+    assert len(fake_x.requests_of(INTERN_ATOM)) == 3  # WM_NAME is predefined
+    assert connection._flushed == 3  # sent together, the replies were read afterwards
+    assert all(atoms.get(name) == fake_x.atoms.get(name.encode(), 39) for name in names)
+    atoms.prefetch(names)
+    assert len(fake_x.requests_of(INTERN_ATOM)) == 3
+
+    created = [fake_x.intern(name) for name in (b"A", b"BB", b"CCC")]
+    atoms.prefetch_names(created + [39])
+    assert len(fake_x.requests_of(GET_ATOM_NAME)) == 3
+    assert [atoms.name(atom) for atom in created] == ["A", "BB", "CCC"]
+    assert len(fake_x.requests_of(GET_ATOM_NAME)) == 3
+
+
+def test_async_atoms(fake_x: FakeX):
+    created = fake_x.intern(b"HDMI-1")
+
+    async def run():
+        async with await AsyncConnection.open(fake_x.name) as connection:
+            atoms = AtomTable(connection)
+            await atoms.aprefetch(["UTF8_STRING", "CLIPBOARD"])
+            assert await atoms.aintern("UTF8_STRING") == fake_x.atoms[b"UTF8_STRING"]
+            assert await atoms.aintern("_SLODON_MISSING", only_if_exists=True) == 0
+            assert await atoms.aname(created) == "HDMI-1"
+            await atoms.aprefetch_names([created, 39])
+            return atoms
+
+    atoms = asyncio.run(run())
+    assert atoms.get("HDMI-1") == created
+    assert len(fake_x.requests_of(INTERN_ATOM)) == 3 and len(fake_x.requests_of(GET_ATOM_NAME)) == 1
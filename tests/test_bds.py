@@ -0,0 +1,100 @@
+import struct
+
+import pytest
+
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.bds import EVENTS, WriteBuffer
+
+
+def encode(request: bds.Request, *values, tail=b"", opcode=None) -> bytes:
+    out = WriteBuffer(16)
+    request.encode(out, *values, tail=tail, opcode=opcode)
+    return bytes(out.view())
+
+
+def test_core_request():
+    assert encode(bds.GET_GEOMETRY, 0x1234) == bytes((14, 0, 2, 0)) + struct.pack("<I", 0x1234)
+    assert encode(bds.NO_OPERATION) == bytes((127, 0, 1, 0))
+
+
+def test_request_with_data_and_padded_tail():
+    wire = encode(bds.INTERN_ATOM, 1, 7, tail=b"WM_NAME")
+    assert wire == bytes((16, 1, 4, 0)) + struct.pack("<H2x", 7) + b"WM_NAME\0"
+
+
+def test_padding_is_cleared_when_the_buffer_is_reused():
+    out = WriteBuffer(64)
+    out.write(b"\xff" * 64)
+    out.clear()
+    total = bds.CHANGE_PROPERTY.encode(out, 0, 0x400, 39, 31, 8, 5, tail=b"hello")
+    assert total == 32
+    assert bytes(out.view()) == (
+        bytes((18, 0, 8, 0)) + struct.pack("<IIIB3xI", 0x400, 39, 31, 8, 5) + b"hello\0\0\0"
+    )
+
+
+def test_extension_request_takes_the_granted_opcode():
+    wire = encode(bds.XTEST_FAKE_INPUT, 6, 0, 0, 0x100, 300, 400, 0, opcode=140)
+    assert len(wire) == 36
+    assert wire == bytes((140, 2, 9, 0)) + struct.pack("<BB2xII8xhh7xB", 6, 0, 0, 0x100, 300, 400, 0)
+
+
+def test_requests_are_appended_and_the_buffer_grows():
+    out = WriteBuffer(4)
+    for window in range(100):
+        bds.MAP_WINDOW.encode(out, window)
+    assert len(out) == 800
+    assert struct.unpack_from("<BxHI", out.buffer, 99 * 8) == (8, 2, 99)
+
+
+def test_too_long_request():
+    with pytest.raises(ValueError):
+        encode(bds.CHANGE_PROPERTY, 0, 1, 2, 3, 8, 0x40000, tail=bytes(0x40000))
+
+
+def test_reply_fields_and_tail():
+    # GetAtomName of "HDMI-1": 6 bytes of name, padded to 8
+    reply = struct.pack("<BxHIH22x", 1, 7, 2, 6) + b"HDMI-1\0\0"
+    layout = bds.GET_ATOM_NAME.reply
+    assert layout.total_size(reply) == 40
+    assert layout.get(reply, "sequence") == 7
+    assert layout.get(reply, "name_len") == 6
+    tail = layout.tail(memoryview(reply))
+    assert bytes(tail) == b"HDMI-1\0\0"  # the padding is part of the tail, the length field says what is used
+    assert bytes(tail[:layout.get(reply, "name_len")]) == b"HDMI-1"
+
+
+def test_reply_data_field_and_tail_at_an_offset():
+    # a QueryTree reply after another message, with two children
+    reply = struct.pack("<BxHIIIH14x", 1, 3, 2, 0x100, 0, 2) + struct.pack("<II", 0x200, 0x300)
+    buffer = memoryview(bytes(32) + reply + bytes(32))
+    layout = bds.QUERY_TREE.reply
+    assert layout.get(buffer, "children_len", 32) == 2
+    assert struct.unpack("<2I", layout.tail(buffer, 32)) == (0x200, 0x300)
+
+    geometry = struct.pack("<BBHIIhhHHH10x", 1, 24, 9, 0, 0x100, -5, 6, 640, 480, 1)
+    assert bds.GET_GEOMETRY.reply.unpack_from(geometry) == (1, 24, 9, 0, 0x100, -5, 6, 640, 480, 1)
+    assert bds.GET_GEOMETRY.reply.get(geometry, "depth") == 24
+    assert bds.GET_GEOMETRY.reply.tail(memoryview(geometry)) == b""
+
+
+def test_event_layout():
+    motion = EVENTS[6]
+    assert motion.size == 32
+    wire = struct.pack("<BBHIIIIhhhhHB3x", 6, 1, 5, 1000, 0x100, 0x100, 0x200, -3, 400, 7, 8, 0x10, 1)
+    assert motion.unpack_from(wire) == (6, 1, 5, 1000, 0x100, 0x100, 0x200, -3, 400, 7, 8, 0x10, 1)
+    assert motion.get(wire, "root_x") == -3
+    assert motion.get(bytes(32) + wire, "root_y", 32) == 400
+    offset, field = motion.field("child")
+    assert offset == 16 and field.unpack_from(wire, offset)[0] == 0x200
+
+    message = EVENTS[33]
+    wire = struct.pack("<BBHII20s", 33, 32, 0, 0x300, 99, bytes(range(20)))
+    assert message.get(wire, "format") == 32
+    assert message.get(wire, "data") == bytes(range(20))
+
+
+def test_error_layout():
+    wire = struct.pack("<BBHIHB21x", 0, 3, 0x1234, 0x500, 0, 14)
+    assert bds.ERROR.unpack_from(wire) == (0, 3, 0x1234, 0x500, 0, 14)
+    assert bds.ERROR.get(wire, "major_opcode") == 14
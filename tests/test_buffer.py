@@ -0,0 +1,92 @@
+import socket
+import struct
+
+import pytest
+
+from slodon.slodonix.systems.x.protocol.buffer import RingBuffer
+
+
+def event(number: int) -> bytes:
+    return struct.pack("<BxHI", 2, number & 0xFFFF, number).ljust(32, b"\0")
+
+
+def reply(sequence: int, tail: bytes) -> bytes:
+    return struct.pack("<BxHI24x", 1, sequence, len(tail) // 4) + tail
+
+
+@pytest.fixture
+def pair():
+    ours, theirs = socket.socketpair()
+    yield ours, theirs
+    ours.close()
+    theirs.close()
+
+
+def drain(ring: RingBuffer) -> list[bytes]:
+    messages = []
+    while (message := ring.next_message()) is not None:
+        messages.append(bytes(message))
+    return messages
+
+
+def test_message_split_across_reads(pair):
+    ours, theirs = pair
+    ring = RingBuffer(256)
+    message = reply(1, bytes(range(40)))
+    theirs.sendall(message[:20])
+    ring.recv_into(ours)
+    assert ring.next_message() is None
+    theirs.sendall(message[20:50])
+    ring.recv_into(ours)
+    assert ring.next_message() is None and ring.wanted == 72  # the length of the reply is known now
+    theirs.sendall(message[50:] + event(2))
+    ring.recv_into(ours)
+    assert drain(ring) == [message, event(2)]
+    assert len(ring) == 0 and ring.start == ring.end == 0
+
+
+def test_messages_are_views_over_the_buffer(pair):
+    ours, theirs = pair
+    ring = RingBuffer(256)
+    theirs.sendall(event(1))
+    ring.recv_into(ours)
+    message = ring.next_message()
+    assert isinstance(message, memoryview) and message.obj is ring.buffer
+
+
+def test_unread_bytes_are_moved_back_to_the_start(pair):
+    ours, theirs = pair
+    ring = RingBuffer(256, min_free=64)
+    received = []
+    for number in range(40):
+        # a message and a half each time: the unread half is kept across the reads
+        theirs.sendall(event(number)[16:] if number else b"")
+        theirs.sendall(event(number + 1)[:16])
+        ring.recv_into(ours)
+        received += drain(ring)
+    assert received == [event(number) for number in range(1, 40)]
+    assert ring.compactions > 0 and ring.grows == 0 and ring.capacity == 256
+
+
+def test_grows_for_a_reply_larger_than_the_buffer(pair):
+    ours, theirs = pair
+    ring = RingBuffer(64)
+    message = reply(7, bytes(range(256)) * 2)
+    theirs.sendall(event(1) + message)
+    received = []
+    while len(received) < 2:
+        ring.recv_into(ours)
+        received += drain(ring)
+    assert received == [event(1), message]
+    assert ring.grows >= 1 and ring.capacity >= len(message)
+    stats = ring.stats()
+    assert stats["largest_message"] == len(message) and stats["buffered"] == 0
+    assert stats["high_water"] >= len(message) - 32
+
+
+def test_closed_peer(pair):
+    ours, theirs = pair
+    ring = RingBuffer(64)
+    theirs.close()
+    assert ring.recv_into(ours) == 0
+    assert ring.next_message() is None
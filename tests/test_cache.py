@@ -0,0 +1,74 @@
+import numpy as np
+
+from slodon.slodonix.systems.vision.cache import RegionCache, perceptual_hash
+
+
+def screen(seed: int = 0, height: int = 360, width: int = 640) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 4), 220, dtype=np.uint8)
+    for _ in range(600):
+        x, y = rng.integers(0, width), rng.integers(0, height)
+        frame[y:y + rng.integers(1, 16), x:x + rng.integers(2, 40), :3] = rng.integers(0, 256, 3)
+    return frame
+
+
+def test_memoize_hits_on_the_same_look():
+    cache = RegionCache()
+    frame = screen()
+    calls = []
+
+    def analyse(pixels: np.ndarray) -> float:
+        calls.append(pixels.shape)
+        return float(pixels.mean())
+
+    first = cache.memoize("mean", (0, 0, 640, 360), frame, analyse)
+    noisy = frame.copy()
+    noisy[100, 100, 0] ^= 1  # another capture of the same screen
+    assert perceptual_hash(noisy) == perceptual_hash(frame)
+    assert cache.memoize("mean", (0, 0, 640, 360), noisy, analyse) == first
+    assert len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+
+    cache.memoize("mean", (0, 0, 640, 360), noisy, analyse, exact=True)  # the exact pixels are another key
+    assert len(calls) == 2
+
+
+def test_locate_all_misses_after_a_small_shift():
+    cache = RegionCache()
+    background = np.zeros((1080, 1920, 4), dtype=np.uint8)
+    background[..., :3] = (np.arange(1920) * 200 // 1920 + 20)[None, :, None]  # a horizontal gradient
+    template = np.random.default_rng(1).integers(0, 256, (40, 64, 4), dtype=np.uint8)
+    frame, shifted = background.copy(), background.copy()
+    frame[500:540, 900:964] = template
+    shifted[503:543, 904:968] = template  # moved by (4, 3): the perceptual hash does not see it
+    assert perceptual_hash(shifted) == perceptual_hash(frame)
+
+    (match,) = cache.locate_all(template, frame)
+    assert (match.left, match.top) == (900, 500)
+    assert cache.locate_all(template, frame) == [match] and cache.hits == 1
+    (match,) = cache.locate_all(template, shifted)
+    assert (match.left, match.top) == (904, 503)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # a region: the boxes are in the coordinates of the image
+    (match,) = cache.locate_all(template, shifted, (800, 400, 400, 300))
+    assert (match.left, match.top) == (904, 503)
+
+
+def test_least_recently_used_values_are_evicted_above_the_budget():
+    cache = RegionCache(max_bytes=3000)
+    for name in "abc":
+        cache.put((name,), np.zeros(1000, dtype=np.uint8))
+    assert cache.get(("a",)) is not None  # now the most recently used
+    cache.put(("d",), np.zeros(1000, dtype=np.uint8))
+    assert cache.get(("b",)) is None
+    assert [cache.get((name,)) is not None for name in "acd"] == [True, True, True]
+    assert (cache.bytes, cache.evictions, len(cache)) == (3000, 1, 3)
+
+    cache.put(("e",), b"", size=2500)
+    assert len(cache) == 1 and cache.bytes == 2500 and cache.evictions == 4
+    cache.put(("f",), np.zeros(4000, dtype=np.uint8))  # larger than the budget: not cached
+    assert cache.get(("f",)) is None and len(cache) == 1
+    cache.put(("e",), b"", size=10)  # replaced, its size counted once
+    assert cache.bytes == 10
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.bytes == 0
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from slodon.slodonix.systems.x.display.capture import ScreenCapture
+from slodon.slodonix.systems.x.display.display import Display
+
+from tests.fakex import FakeX
+
+
+def expected(x: int, y: int, width: int, height: int) -> np.ndarray:
+    rows, columns = np.mgrid[y:y + height, x:x + width]
+    return np.stack([columns & 0xFF, rows & 0xFF, (columns ^ rows) & 0xFF, np.full_like(rows, 0xFF)], axis=-1)
+
+
+@pytest.mark.parametrize("shm", [False, True])
+def test_capture_is_a_height_width_4_frame(shm: bool):
+    server = FakeX(width=64, height=48, shm=shm)
+    display = Display(server.name)
+    try:
+        frame = display.capture()
+        assert display._capture.shm is shm
+        assert display._capture.drawable == display.screen.root
+        assert frame.shape == (48, 64, 4) and frame.dtype == np.uint8
+        assert np.array_equal(frame, expected(0, 0, 64, 48))
+        region = display.capture(5, 7, 20, 10, copy=True)
+        assert np.array_equal(region, expected(5, 7, 20, 10))
+    finally:
+        display.close()
+        server.close()
+
+
+def test_capture_in_chunks(fake_x: FakeX):
+    display = Display(fake_x.name)
+    display.capture(0, 0, 1, 1)
+    display._capture.chunk_bytes = 3 * 30 * 4  # three rows of 30 pixels per GetImage
+    frame = display.capture(100, 200, 30, 10)
+    assert len(fake_x.requests_of(73)) == 1 + 4
+    assert np.array_equal(frame, expected(100, 200, 30, 10))
+    display.close()
+
+
+def test_failed_shm_attach_falls_back_to_get_image():
+    server = FakeX(width=32, height=16, shm=True)
+    shm_opcode = server.extensions[b"MIT-SHM"][0]
+
+    def refuse(client, sequence, data, body):
+        # the server can not attach our segment(e.g. another IPC namespace): BadAccess, then BadShmSeg
+        if data == 1:
+            return server.error(sequence, 10, 0, shm_opcode)
+        if data == 4:
+            return server.error(sequence, 128, 0, shm_opcode)
+        return None
+
+    server.handlers[shm_opcode] = refuse
+    display = Display(server.name)
+    try:
+        frame = display.capture()
+        assert np.array_equal(frame, expected(0, 0, 32, 16))
+        assert display._capture.shm is False and display._capture._segment is None
+        display.connection.sync()
+        assert [data for data, _ in server.requests_of(shm_opcode)] == [1, 4]  # no ShmDetach
+        assert [error.code for error in display.connection.errors] == [10]  # only the attach failed
+    finally:
+        display.close()
+        server.close()
+
+
+@pytest.mark.parametrize("shm", [False, True])
+def test_capture_on_xvfb(xvfb: str, shm: bool):
+    display = Display(xvfb)
+    capture = ScreenCapture(display, shm=shm)
+    try:
+        frame = capture.capture(copy=True)
+        assert capture.shm is shm
+        assert frame.shape == (600, 800, 4) and frame.dtype == np.uint8
+        assert not frame[..., :3].any()  # the black root window of -br
+        region = capture.capture(100, 50, 64, 40)
+        assert np.array_equal(region, frame[50:90, 100:164])
+    finally:
+        capture.close()
+        display.close()
@@ -0,0 +1,160 @@
+import struct
+
+import numpy as np
+import pytest
+
+from slodon.slodonix.systems.x.display.changes import DamageTracker, TileDiff, _damage_mask, watch_changes
+from slodon.slodonix.systems.x.display.display import Display
+from slodon.slodonix.systems.x.protocol.bds import EVENTS, EXTENSION_EVENTS
+
+from tests.fakex import FakeX
+
+DAMAGE = (146, 91, 149)  # major opcode, DamageNotify, BadDamage
+DAMAGE_CREATE, DAMAGE_SUBTRACT = 1, 3
+
+
+def damage_notify(x: int, y: int, width: int, height: int) -> bytes:
+    data = bytearray(32)
+    data[0] = DAMAGE[1]
+    for name, value in (("x", x), ("y", y), ("width", width), ("height", height)):
+        offset, field = EXTENSION_EVENTS["DAMAGE", 0].field(name)
+        field.pack_into(data, offset, value)
+    return bytes(data)
+
+
+def event(code: int, **fields) -> bytes:
+    data = bytearray(32)
+    data[0] = code
+    for name, value in fields.items():
+        offset, field = EVENTS[code].field(name)
+        field.pack_into(data, offset, value)
+    return bytes(data)
+
+
+class Stop(Exception):
+    pass
+
+
+def frame(height: int, width: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 4), dtype=np.uint8)
+
+
+def test_tile_diff_reports_the_changed_tiles():
+    tiles = TileDiff(32)
+    first = frame(100, 70)
+    assert tiles.diff(first).shape == (4, 3) and tiles.diff(first).sum() == 0
+    tiles.reset()
+    assert tiles.diff(first).all()
+
+    second = first.copy()
+    second[40, 69, 2] ^= 1  # a single bit of the last column of tiles
+    second[99, 0, 0] ^= 0x80  # the last, 4 rows high, row of tiles
+    mask = tiles.diff(second)
+    assert np.argwhere(mask).tolist() == [[1, 2], [3, 0]]
+    assert tiles.rects(mask, 70, 100, x=5, y=6) == [(69, 38, 6, 32), (5, 102, 32, 4)]
+    updates = list(tiles.updates(second, mask, x=5, y=6))
+    assert [rect for rect, _ in updates] == [(69, 38, 6, 32), (5, 102, 32, 4)]
+    assert np.shares_memory(updates[0][1], second) and np.array_equal(updates[0][1], second[32:64, 64:70])
+
+
+def test_tile_diff_sees_pixels_moved_inside_a_tile():
+    tiles = TileDiff(16)
+    first = frame(16, 16)
+    tiles.diff(first)
+    swapped = first.copy()
+    swapped[[0, 5]] = swapped[[5, 0]]  # same pixels, other places
+    assert tiles.diff(swapped).all()
+
+
+def test_tile_diff_memory_is_one_row_of_tiles():
+    tiles = TileDiff(64)
+    tiles.diff(frame(2160, 3840))
+    assert tiles._weights.shape == tiles._work.shape == (64, 3840)
+    assert tiles.diff(frame(40, 30)).all()  # a new size: every tile, with weights for the new width
+    assert tiles._weights.shape == (40, 30)
+
+
+def test_damage_mask():
+    # rects are on the screen, the frame starts at (100, 50)
+    rects = [(100, 50, 1, 1), (170, 150, 100, 10), (0, 0, 101, 51), (300, 300, 0, 5)]
+    mask = _damage_mask(rects, (4, 4), 32, 100, 50)
+    assert np.argwhere(mask).tolist() == [[0, 0], [3, 2], [3, 3]]
+    assert not _damage_mask([(0, 0, 100, 50)], (4, 4), 32, 100, 50).any()  # left and above the frame
+
+
+def test_watch_changes_yields_only_the_changed_tiles(fake_x: FakeX):
+    display = Display(fake_x.name)
+    frames = [[]]
+
+    def changed(x: int, y: int, width: int, height: int) -> bytes:
+        pixels = bytearray(FakeX.pixels(x, y, width, height))
+        if x <= 40 < x + width and y <= 40 < y + height:
+            pixels[((40 - y) * width + 40 - x) * 4] ^= 0xFF
+        return bytes(pixels)
+
+    def sleep(_: float) -> None:
+        if len(frames) == 2:
+            raise Stop
+        frames.append([])
+        fake_x.pixels = changed  # from the second capture on, the pixel at (40, 40) is another one
+
+    with pytest.raises(Stop):
+        for rect, pixels in watch_changes(display, 32, region=(10, 20, 100, 70), sleep=sleep):
+            frames[-1].append((rect, pixels.shape))
+    assert len(frames[0]) == 12
+    assert frames[0][0] == ((10, 20, 32, 32), (32, 32, 4))
+    assert frames[0][-1] == ((106, 84, 4, 6), (6, 4, 4))
+    assert frames[1] == [((10, 20, 32, 32), (32, 32, 4))]
+    display.close()
+
+
+def test_damage_tracker_takes_only_its_events(fake_x: FakeX):
+    fake_x.extensions[b"DAMAGE"] = DAMAGE
+    display = Display(fake_x.name)
+    connection = display.connection
+    tracker = DamageTracker(display)
+    connection.sync()
+    ((minor, body),) = fake_x.requests_of(DAMAGE[0])[1:2]
+    assert minor == DAMAGE_CREATE
+    damage, drawable, report = struct.unpack_from("<IIB", body)
+    assert (damage, drawable, report) == (tracker.damage, fake_x.root, 1)
+    assert tracker.take() == []
+
+    filtered = []
+    connection.event_filter = lambda events: filtered.append(len(events)) or events
+    fake_x.send_event(damage_notify(1, 2, 3, 4))
+    fake_x.send_event(event(17, window=0x300))
+    fake_x.send_event(damage_notify(5, 6, 7, 8))
+    connection.sync()
+    assert tracker.take() == [(1, 2, 3, 4), (5, 6, 7, 8)]
+    assert not filtered  # the DestroyNotify was given back, it is filtered once when taken
+    assert bytes(connection.take_events()) == event(17, window=0x300)
+    assert filtered == [32]
+    connection.sync()
+    assert [minor for minor, _ in fake_x.requests_of(DAMAGE[0])][-1] == DAMAGE_SUBTRACT
+    tracker.close()
+    display.close()
+
+
+def test_watch_changes_with_damage_captures_only_after_damage(fake_x: FakeX):
+    fake_x.extensions[b"DAMAGE"] = DAMAGE
+    display = Display(fake_x.name)
+    sleeps = []
+
+    def sleep(_: float) -> None:
+        sleeps.append(len(fake_x.requests_of(73)))
+        if len(sleeps) == 2:
+            fake_x.send_event(damage_notify(40, 40, 1, 1))
+            display.connection.sync()
+        elif len(sleeps) == 3:
+            raise Stop
+
+    yielded = []
+    with pytest.raises(Stop):
+        for rect, _ in watch_changes(display, 32, region=(0, 0, 64, 64), damage=True, sleep=sleep):
+            yielded.append(rect)
+    assert sleeps == [1, 1, 2]  # nothing captured without damage
+    assert yielded == [(0, 0, 32, 32), (32, 0, 32, 32), (0, 32, 32, 32), (32, 32, 32, 32), (32, 32, 32, 32)]
+    display.connection.sync()
+    assert [minor for minor, _ in fake_x.requests_of(DAMAGE[0])][-1] == 2  # DamageDestroy when stopped
+    display.close()
@@ -0,0 +1,42 @@
+import struct
+
+from slodon.slodonix.systems.x.events.coalesce import EXPOSE, EventCoalescer
+from slodon.slodonix.systems.x.protocol.bds import EVENTS
+
+MAP_NOTIFY = 19
+
+
+def expose(window: int, x: int, y: int, width: int, height: int, count: int) -> bytes:
+    return struct.pack("<BxHIHHHHH", EXPOSE, 0, window, x, y, width, height, count).ljust(32, b"\0")
+
+
+def exposes(buffer: bytearray) -> list[tuple[int, ...]]:
+    event = EVENTS[EXPOSE]
+    return [
+        tuple(event.get(buffer, name, offset) for name in ("window", "x", "y", "width", "height", "count"))
+        for offset in range(0, len(buffer), 32)
+        if buffer[offset] == EXPOSE
+    ]
+
+
+def test_merged_expose_keeps_the_last_count():
+    buffer = bytearray(expose(7, 0, 0, 10, 10, 1) + expose(7, 5, 5, 10, 10, 0))
+    assert exposes(EventCoalescer()(buffer)) == [(7, 0, 0, 15, 15, 0)]
+
+
+def test_expose_not_merged_across_another_event():
+    other = struct.pack("<BxHII", MAP_NOTIFY, 0, 7, 7).ljust(32, b"\0")
+    buffer = bytearray(expose(7, 0, 0, 10, 10, 1) + other + expose(7, 5, 5, 10, 10, 0))
+    buffer = EventCoalescer()(buffer)
+    assert len(buffer) == 96
+    assert exposes(buffer) == [(7, 0, 0, 10, 10, 1), (7, 5, 5, 10, 10, 0)]
+
+
+def test_expose_not_merged_across_a_disjoint_expose():
+    buffer = bytearray(expose(7, 0, 0, 10, 10, 2) + expose(7, 50, 50, 5, 5, 1) + expose(7, 5, 5, 10, 10, 0))
+    assert exposes(EventCoalescer()(buffer)) == [(7, 0, 0, 10, 10, 2), (7, 50, 50, 5, 5, 1), (7, 5, 5, 10, 10, 0)]
+
+
+def test_exposes_of_other_windows_merge_through():
+    buffer = bytearray(expose(7, 0, 0, 10, 10, 1) + expose(8, 0, 0, 4, 4, 0) + expose(7, 5, 5, 10, 10, 0))
+    assert exposes(EventCoalescer()(buffer)) == [(7, 0, 0, 15, 15, 0), (8, 0, 0, 4, 4, 0)]
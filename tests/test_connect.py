@@ -0,0 +1,65 @@
+import pytest
+
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.connect import Connection
+
+from tests.fakex import FakeX
+
+
+def test_replies_survive_later_reads(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    first = connection.request(bds.GET_GEOMETRY, fake_x.root)
+    second = connection.request(bds.QUERY_POINTER, fake_x.root)
+    geometry = first.reply()
+    second.reply()
+    for _ in range(50):  # reuse the receive buffer many times
+        connection.request(bds.GET_INPUT_FOCUS).reply()
+    assert isinstance(geometry, bytes)
+    assert bds.GET_GEOMETRY.reply.get(geometry, "width") == fake_x.width
+    assert bds.GET_GEOMETRY.reply.get(first.reply(), "height") == fake_x.height
+    connection.close()
+
+
+def test_reply_without_copy_is_a_view(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    reply = connection.request(bds.GET_GEOMETRY, fake_x.root).reply(copy=False)
+    assert bds.GET_GEOMETRY.reply.get(reply, "width") == fake_x.width
+    connection.close()
+
+
+def test_pipelined_requests_are_sent_in_one_flush(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    before = len(fake_x.requests)
+    cookies = [connection.request(bds.GET_GEOMETRY, fake_x.root) for _ in range(10)]
+    assert [cookie.sequence for cookie in cookies] == list(range(1, 11))
+    assert len(connection._out) == 80 and connection._flushed == 0  # queued, nothing sent yet
+    # waiting for the last one sends the whole queue, the earlier replies are routed on the way
+    assert bds.GET_GEOMETRY.reply.get(cookies[-1].reply(), "width") == fake_x.width
+    assert all(cookie.done for cookie in cookies)
+    assert len(fake_x.requests) - before == 10
+    assert bds.GET_GEOMETRY.reply.get(cookies[0].reply(), "sequence") == 1
+    connection.close()
+
+
+def test_requests_without_reply_advance_the_sequence(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    assert connection.request_batch(bds.MAP_WINDOW, ((window,) for window in range(5))) == 5
+    connection.request(bds.NO_OPERATION)
+    cookie = connection.request(bds.QUERY_POINTER, fake_x.root)
+    assert cookie.sequence == 7
+    assert bds.QUERY_POINTER.reply.get(cookie.reply(), "root_x") == fake_x.pointer[0]
+    assert not connection._pending
+    with pytest.raises(ValueError):
+        connection.request_batch(bds.GET_GEOMETRY, [(fake_x.root,)])
+    connection.close()
+
+
+def test_queue_is_flushed_above_the_threshold(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    connection.flush_threshold = 64
+    for window in range(7):
+        connection.request(bds.MAP_WINDOW, window)
+    assert connection._flushed == 0
+    connection.request(bds.MAP_WINDOW, 7)  # 64 bytes queued
+    assert connection._flushed == 8 and not len(connection._out)
+    connection.close()
@@ -0,0 +1,69 @@
+import pytest
+
+from slodon.slodonix.systems.x.errors import BadDrawable, BadWindow
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.connect import Connection
+
+from tests.fakex import FakeX
+
+MAP_WINDOW = 8
+GET_INPUT_FOCUS = 43
+
+
+def bad_map_window(fake_x: FakeX):
+    fake_x.handlers[MAP_WINDOW] = lambda client, sequence, data, body: fake_x.error(sequence, 3, 0x999, MAP_WINDOW)
+
+
+def test_error_is_raised_by_its_own_cookie(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    bad = connection.request(bds.GET_GEOMETRY, 0x999)
+    good = connection.request(bds.GET_GEOMETRY, fake_x.root)
+    assert bds.GET_GEOMETRY.reply.get(good.reply(), "width") == fake_x.width  # routed past the error
+    assert bad.done
+    with pytest.raises(BadDrawable) as raised:
+        bad.reply()
+    assert raised.value.serial == bad.sequence and raised.value.resource_id == 0x999
+    assert bad.reply(check=False) is None
+    error = bad.error()
+    assert error.request is bds.GET_GEOMETRY and error.sequence == bad.sequence and error.major_opcode == 14
+    assert good.error() is None
+    assert not connection.errors
+    connection.close()
+
+
+def test_errors_nobody_waits_for(fake_x: FakeX):
+    bad_map_window(fake_x)
+    connection = Connection(fake_x.name)
+    mapped = connection.request(bds.MAP_WINDOW, 0x999)
+    connection.sync()  # no exception
+    (error,) = connection.errors
+    assert error.sequence == mapped.sequence and error.error_class is BadWindow
+
+    handled = []
+    connection.error_handler = handled.append
+    connection.request(bds.MAP_WINDOW, 0x999)
+    connection.sync()
+    assert len(handled) == 1 and len(connection.errors) == 1
+    connection.close()
+
+
+def test_sequence_numbers_past_16_bits(fake_x: FakeX):
+    bad_map_window(fake_x)
+    connection = Connection(fake_x.name)
+    mapped = connection.request(bds.MAP_WINDOW, 0x999)
+    # more than 65536 requests without a reply: a GetInputFocus is slipped in so the server answers something
+    count = 0x10000 + 100
+    assert connection.request_batch(bds.NO_OPERATION, (() for _ in range(count))) == count
+    assert connection._sequence == 1 + count + 1
+    bad = connection.request(bds.GET_GEOMETRY, 0x999)
+    assert bad.sequence > 0x10000
+    with pytest.raises(BadDrawable) as raised:
+        bad.reply()
+    assert raised.value.serial == bad.sequence
+    assert len(fake_x.requests_of(GET_INPUT_FOCUS)) == 1
+    (error,) = connection.errors
+    assert error.sequence == mapped.sequence == 1  # widened from the sequence before it, not from the last sent
+
+    cookie = connection.request(bds.QUERY_POINTER, fake_x.root)
+    assert bds.QUERY_POINTER.reply.get(cookie.reply(), "root_y") == fake_x.pointer[1]
+    connection.close()
@@ -0,0 +1,79 @@
+import struct
+
+import pytest
+
+from slodon.slodonix.systems.x.events.event import SEND_EVENT_BIT, decode_events
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.bds import EVENTS
+from slodon.slodonix.systems.x.protocol.connect import Connection
+
+from tests.fakex import FakeX
+
+
+def event(code: int, **fields) -> bytes:
+    data = bytearray(32)
+    data[0] = code
+    for name, value in fields.items():
+        offset, field = EVENTS[code & 0x7F].field(name)
+        field.pack_into(data, offset, value)
+    return bytes(data)
+
+
+def test_decode_a_batch():
+    batch = bytearray(
+        event(6, event=0x100, root_x=10, root_y=20, state=1)
+        + event(99)  # unknown code: skipped
+        + event(17, event=0x100, window=0x300)
+        + event(33 | SEND_EVENT_BIT, format=32, window=0x400, type=5)
+    )
+    records = list(decode_events(batch))
+    assert [record.name for record in records] == ["MotionNotify", "DestroyNotify", "ClientMessage"]
+    motion, destroy, message = records
+    assert (motion.type, motion.root_x, motion.root_y, motion.state, motion.window) == (6, 10, 20, 1, 0x100)
+    assert not motion.send_event
+    assert destroy.window == 0x100 and destroy.get("window") == 0x300  # XAnyEvent.window is the event field
+    assert message.type == 33 and message.send_event and message.window == 0x400 and message.format == 32
+    assert motion.fields()["root_y"] == 20
+    assert bytes(destroy.raw()) == batch[64:96]
+    with pytest.raises(AttributeError):
+        motion.width
+
+
+def test_fields_are_decoded_when_accessed():
+    batch = bytearray(event(6, root_x=1))
+    (record,) = decode_events(batch)
+    EVENTS[6].field("root_x")[1].pack_into(batch, EVENTS[6].field("root_x")[0], 2)
+    assert record.root_x == 2  # nothing was unpacked before the access
+    assert not hasattr(record, "__dict__")
+
+
+def test_type_filter():
+    batch = event(6) + event(2, detail=38) + event(3, detail=38) + event(6)
+    assert [record.type for record in decode_events(batch, types={2, 3})] == [2, 3]
+    assert [record.detail for record in decode_events(batch, types={3})] == [38]
+
+
+def test_extension_events_use_the_codes_granted_by_the_server(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    randr_event = connection.extension("RANDR")[1]
+    layout = connection.event_layouts[randr_event]
+    assert layout.name == "RRScreenChangeNotify"
+
+    screen_change = bytearray(32)
+    screen_change[0] = randr_event
+    layout.pack_into(screen_change, 0, randr_event, 0, 0, 1, 2, fake_x.root, fake_x.root, 0, 0, 1280, 720, 0, 0)
+    generic = struct.pack("<BBHIHH", bds.GENERIC_EVENT_KIND, 131, 0, 2, 1, 0).ljust(40, b"\7")
+    for message in (generic, bytes(screen_change)):
+        fake_x.send_event(message[:32])
+        if len(message) > 32:
+            fake_x.clients[0].sendall(message[32:])
+    connection.sync()
+
+    events = connection.take_events()
+    assert len(events) == 64  # the generic event is framed by its length, its header kept
+    records = list(decode_events(events, connection.event_layouts))
+    assert [record.name for record in records] == ["RRScreenChangeNotify"]
+    assert (records[0].width, records[0].height, records[0].root) == (1280, 720, fake_x.root)
+    assert events[0] == bds.GENERIC_EVENT_KIND
+    assert list(decode_events(events)) == []  # the core layouts know neither
+    connection.close()
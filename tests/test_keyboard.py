@@ -0,0 +1,82 @@
+import select
+import struct
+
+from slodon.slodonix.systems.x.display.keyboard import MAPPING_NOTIFY, POLL_INTERVAL, KeyboardMapping
+from slodon.slodonix.systems.x.protocol import bds
+from slodon.slodonix.systems.x.protocol.connect import Connection
+
+from tests.fakex import FakeX
+
+GET_KEYBOARD_MAPPING = 101
+
+
+def mapping_notify(request: int) -> bytes:
+    return struct.pack("<BxHBBB", MAPPING_NOTIFY, 0, request, 8, 248).ljust(32, b"\0")
+
+
+def test_lookups(fake_x: FakeX):
+    keyboard = KeyboardMapping(Connection(fake_x.name))
+    assert keyboard.lookup("q") == (54, 0)
+    assert keyboard.lookup("Q") == (54, 1)
+    assert keyboard.key("ctrl") == (37, 0)
+    assert keyboard.modifier_keycode(1) == 50
+    keyboard.connection.close()
+
+
+def test_sync_takes_only_the_keyboard_mapping_notify(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    keyboard = KeyboardMapping(connection)
+    keyboard.sync()
+    assert len(fake_x.requests_of(GET_KEYBOARD_MAPPING)) == 1  # nothing changed: no round trip
+
+    motion = struct.pack("<BBHII", 6, 0, 0, 0, fake_x.root).ljust(32, b"\0")
+    fake_x.keymap[38] = (ord("q"), ord("Q"))
+    for event in (motion, mapping_notify(1), mapping_notify(2)):
+        fake_x.send_event(event)
+    connection.sync()  # the events are read before the reply
+    keyboard.sync()
+
+    assert len(fake_x.requests_of(GET_KEYBOARD_MAPPING)) == 2
+    assert keyboard.lookup("q") == (38, 0)
+    events = connection.take_events()
+    assert bytes(events) == motion + mapping_notify(2)  # the pointer MappingNotify is not the keyboard's
+    connection.close()
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sync_reads_the_socket_once_per_poll_interval(fake_x: FakeX, monkeypatch):
+    clock = Clock()
+    connection = Connection(fake_x.name)
+    keyboard = KeyboardMapping(connection, clock=clock)
+    polls = []
+    monkeypatch.setattr(connection, "poll", lambda timeout=0.0: polls.append(timeout) or Connection.poll(connection))
+    fake_x.send_event(mapping_notify(0))
+    select.select([connection._connection], [], [], 1.0)  # sent, not read yet
+    for _ in range(10):
+        keyboard.sync()  # a burst of keystrokes: no system call
+    assert not polls and len(fake_x.requests_of(GET_KEYBOARD_MAPPING)) == 1
+
+    clock.now += POLL_INTERVAL
+    keyboard.sync()
+    keyboard.sync()
+    assert len(polls) == 1
+    assert len(fake_x.requests_of(GET_KEYBOARD_MAPPING)) == 2
+    assert not connection.events
+    connection.close()
+
+
+def test_poll_interval_zero_reads_on_every_sync(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    keyboard = KeyboardMapping(connection, poll_interval=0)
+    fake_x.send_event(mapping_notify(0))
+    select.select([connection._connection], [], [], 1.0)
+    keyboard.sync()
+    assert len(fake_x.requests_of(GET_KEYBOARD_MAPPING)) == 2
+    connection.close()
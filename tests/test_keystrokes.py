@@ -0,0 +1,80 @@
+import struct
+
+import pytest
+
+from slodon.slodonix.systems.input.keystrokes import compile_text
+from slodon.slodonix.systems.x.display.display import Display
+from slodon.slodonix.systems.x.protocol.connect import Connection
+
+from tests.fakex import FakeX
+
+KEYS = {"a": (10, 0), "b": (11, 0), "A": (10, 1), "B": (11, 1), "é": (12, 4)}  # shift: 1, level 3: 4
+MODIFIERS = {1: 50, 4: 92}
+XTEST = 140
+KEY_PRESS, KEY_RELEASE = 2, 3
+
+
+def test_modifiers_stay_pressed_across_a_run_of_characters():
+    assert compile_text("aAB", KEYS, MODIFIERS.get) == [
+        (10, True, True), (10, False, False),
+        (50, True, True), (10, True, False), (10, False, False),
+        (11, True, True), (11, False, False),
+        (50, False, False),
+    ]
+    # from one modifier to another: the released one first, in one character
+    assert compile_text("Aé", KEYS, MODIFIERS.get) == [
+        (50, True, True), (10, True, False), (10, False, False),
+        (50, False, True), (92, True, False), (12, True, False), (12, False, False),
+        (92, False, False),
+    ]
+    assert compile_text("", KEYS, MODIFIERS.get) == []
+
+
+def test_unknown_characters_and_modifiers():
+    with pytest.raises(ValueError, match="'z'"):
+        compile_text("abz", KEYS, MODIFIERS.get)
+    with pytest.raises(ValueError, match="0x4"):
+        compile_text("é", KEYS, {1: 50}.get)
+
+
+def fake_inputs(fake_x: FakeX) -> list[tuple[int, int, int]]:
+    """
+    (type, detail, time) of every XTestFakeInput received
+    """
+    return [struct.unpack_from("<BB2xI", body) for minor, body in fake_x.requests_of(XTEST) if minor == 2]
+
+
+def test_type_text_is_one_stream_of_fake_inputs(fake_x: FakeX, monkeypatch):
+    display = Display(fake_x.name)
+    display.keyboard  # the keyboard mapping and the extension are fetched before the flushes are counted
+    display.connection.extension("XTEST")
+    flushes = []
+    connection = display.connection
+    monkeypatch.setattr(connection, "flush", lambda: flushes.append(1) or Connection.flush(connection))
+    display.type_text("abAB", interval=0.05)
+    assert len(flushes) == 1
+    display.connection.sync()
+
+    a, b = 38, 39  # the keycodes of FakeX
+    assert fake_inputs(fake_x) == [
+        (KEY_PRESS, a, 0), (KEY_RELEASE, a, 0),
+        (KEY_PRESS, b, 50), (KEY_RELEASE, b, 0),
+        (KEY_PRESS, 50, 50), (KEY_PRESS, a, 0), (KEY_RELEASE, a, 0),  # the interval is before every character
+        (KEY_PRESS, b, 50), (KEY_RELEASE, b, 0),
+        (KEY_RELEASE, 50, 0),
+    ]
+    with pytest.raises(ValueError):
+        display.type_text("a1")
+    display.connection.sync()
+    assert len(fake_inputs(fake_x)) == 10  # nothing typed
+    display.close()
+
+
+def test_long_texts_are_typed_without_a_paste_threshold(fake_x: FakeX):
+    display = Display(fake_x.name)
+    display.type_text("ab" * 500, paste_threshold=None)
+    display.connection.sync()
+    inputs = fake_inputs(fake_x)
+    assert len(inputs) == 2000 and inputs[-1] == (KEY_RELEASE, 39, 0)
+    assert not fake_x.requests_of(22)  # no SetSelectionOwner
+    display.close()
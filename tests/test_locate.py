@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from slodon.slodonix.systems.vision.locate import _downsample, _fast_length, _gray, locate, locate_all, match_template
+
+
+def screen(seed: int = 0, height: int = 360, width: int = 640) -> np.ndarray:
+    """
+    A BGRX frame of flat boxes on a light background, like the widgets of a desktop
+    """
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 4), 220, dtype=np.uint8)
+    for _ in range(600):
+        x, y = rng.integers(0, width), rng.integers(0, height)
+        frame[y:y + rng.integers(1, 16), x:x + rng.integers(2, 40), :3] = rng.integers(0, 256, 3)
+    return frame
+
+
+@pytest.mark.parametrize("x, y", [(100, 60), (101, 60), (100, 61), (101, 61), (203, 117)])
+def test_pyramid_finds_every_parity(x: int, y: int):
+    frame = screen()
+    match = locate(frame[y:y + 40, x:x + 64], frame)
+    assert match is not None and (match.left, match.top) == (x, y)
+
+
+@pytest.mark.parametrize("x, y", [(101, 61), (334, 197)])
+def test_pyramid_finds_detailed_templates(x: int, y: int):
+    frame = np.random.default_rng(1).integers(0, 256, (360, 640, 4), dtype=np.uint8)  # no coarse structure
+    match = locate(frame[y:y + 40, x:x + 64], frame)
+    assert match is not None and (match.left, match.top) == (x, y)
+
+
+@pytest.mark.parametrize("x, y", [(576, 320), (575, 319), (0, 319), (575, 0), (1, 1)])
+def test_pyramid_finds_templates_at_the_borders(x: int, y: int):
+    frame = screen(2)
+    frame[:42, :66, :3] = np.arange(42 * 66 * 3, dtype=np.uint8).reshape(42, 66, 3)  # a detailed corner
+    template = frame[y:y + 40, x:x + 64]
+    match = locate(template, frame)
+    assert match is not None and (match.left, match.top) == (x, y)
+    assert match[:4] == locate(template, frame, pyramid=False)[:4]
+
+
+def test_matches_do_not_overlap():
+    frame = screen(3)
+    template = frame[50:90, 80:144].copy()
+    frame[50:90, 144:208] = template  # a copy touching the original
+    matches = locate_all(template, frame, threshold=0.5)
+    assert {(match.left, match.top) for match in matches[:2]} == {(80, 50), (144, 50)}
+    for index, match in enumerate(matches):
+        for other in matches[:index]:
+            assert abs(match.left - other.left) >= match.width or abs(match.top - other.top) >= match.height
+
+
+@pytest.mark.parametrize("x, y", [(1799, 1019), (1887, 1047), (1886, 1046), (1885, 1045)])
+def test_pyramid_finds_a_template_in_the_corner_of_a_full_screen(x: int, y: int):
+    frame = screen(4, 1080, 1920)
+    blocks = np.random.default_rng(5).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+    frame[960:, 1740:, :3] = blocks.repeat(3, axis=0).repeat(3, axis=1)  # a detailed corner
+    template = frame[y:y + 33, x:x + 33]
+    match = locate(template, frame)
+    assert match is not None and (match.left, match.top) == (x, y)
+
+
+def test_fft_sizes_are_smooth():
+    assert [_fast_length(length) for length in (1, 7, 269, 479, 1080, 1081)] == [1, 8, 270, 480, 1080, 1125]
+    frame = screen(6, 269, 479)  # the coarse level of a 1080p frame: prime rows
+    template = frame[100:140, 200:264]
+    scores = match_template(frame, template)
+    assert scores.shape == (230, 416) and np.unravel_index(np.argmax(scores), scores.shape) == (100, 200)
+
+
+def test_downsample_is_exact_in_16_bits():
+    gray = _gray(np.full((9, 9, 4), 255, dtype=np.uint8))
+    small = _downsample(gray)
+    assert small.dtype == np.uint16 and (small == 16 * 765).all()
+    assert _downsample(small).dtype == np.uint32  # 16 times the values no longer fit
+    assert (_downsample(np.full((5, 5), 4096, dtype=np.uint16)) == 16 * 4096).all()
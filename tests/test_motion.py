@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from slodon.slodonix.systems.input.motion import EASINGS, RecordingBackend, play_path, tween_path
+
+
+@pytest.mark.parametrize("tween", sorted(EASINGS))
+def test_tween_path_ends_at_the_destination(tween: str):
+    times, points = tween_path((10, 20), (700, -40), 0.5, tween, rate=100)
+    assert tuple(points[-1]) == (700, -40)
+    assert 0 < times[0] and times[-1] <= 0.5  # the easings flat at the end arrive early
+    assert np.all(np.diff(times) > 0)
+    assert np.all(np.any(np.diff(points, axis=0) != 0, axis=1))  # no repeated position
+
+
+def test_tween_path_respects_the_rate():
+    times, points = tween_path((0, 0), (1000, 0), 2.0, rate=50)
+    assert len(points) <= 2.0 * 50
+    assert np.diff(times).min() >= 1 / 50 - 1e-9
+    assert tween_path((0, 0), (3, 0), 2.0, rate=50)[1].tolist() == [[1, 0], [2, 0], [3, 0]]  # fewer pixels than steps
+
+
+def test_tween_path_without_duration_or_distance():
+    times, points = tween_path((5, 5), (9, 9), 0.0)
+    assert times.tolist() == [0.0] and points.tolist() == [[9, 9]]
+    times, points = tween_path((5, 5), (5, 5), 1.0)
+    assert points.tolist() == [[5, 5]]
+
+
+def test_play_path_sends_every_position_on_time():
+    backend = RecordingBackend((0, 0))
+    assert backend.move_to(400, 300, duration=1.0, rate=60) == 0
+    times = [time for time, _, _ in backend.moves]
+    assert backend.moves[-1][1:] == (400, 300) and backend.position == (400, 300)
+    assert len(backend.moves) == 60
+    assert np.all(np.diff(times) > 0)
+    assert times[-1] == pytest.approx(1.0)
+    assert np.diff(times).min() >= 1 / 60 - 1e-9  # never faster than the rate
+
+
+def test_play_path_drops_the_late_positions():
+    backend = RecordingBackend((0, 0), move_cost=0.05)  # slower than the 100 positions per second
+    times, points = tween_path((0, 0), (500, 0), 1.0, rate=100)
+    dropped = play_path(times, points, backend.move, backend.clock, backend.sleep)
+    assert dropped > 0 and len(backend.moves) + dropped == len(points)
+    assert backend.moves[-1][1:] == (500, 0)
+    assert np.all(np.diff([time for time, _, _ in backend.moves]) > 0)
+    assert backend.moves[-1][0] <= 1.0 + 0.05  # the path does not fall behind
+
+
+def test_play_path_with_a_clock_far_from_zero():
+    backend = RecordingBackend((0, 0))
+    backend.now = 1e9  # offsets smaller than the resolution of the clock must not stall
+    backend.move_to(50, 50, duration=0.1, rate=1000)
+    assert backend.moves[-1][1:] == (50, 50)
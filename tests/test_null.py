@@ -0,0 +1,32 @@
+import pytest
+
+from slodon.slodonix.slodonix.slodonix_null import CHARS, MODIFIER_CODES, NAMED_KEYS, Display
+from slodon.slodonix.systems.input.recorder import KEY_DOWN, KEY_UP
+
+
+def pressed(display: Display) -> list[int]:
+    operations = display.operations
+    return operations["detail"][operations["op"] == KEY_DOWN].tolist()
+
+
+def test_modifiers_have_their_own_key_codes():
+    modifiers = set(MODIFIER_CODES.values())
+    assert not modifiers & {code for code, _ in CHARS.values()}
+    assert MODIFIER_CODES == {1: NAMED_KEYS["shift"][0], 4: NAMED_KEYS["ctrl"][0], 8: NAMED_KEYS["alt"][0]}
+
+
+@pytest.mark.parametrize("text", ["33", ";;", "^^", "aA;:"])
+def test_plans_type_every_character(text: str):
+    display = Display()
+    display.run_plan(f"type({text!r})")
+    codes = [CHARS[char][0] for char in text]
+    assert [code for code in pressed(display) if code not in MODIFIER_CODES.values()] == codes
+    operations = display.operations
+    assert (operations["op"] == KEY_DOWN).sum() == (operations["op"] == KEY_UP).sum()
+
+
+def test_modifier_key_names():
+    display = Display()
+    display.key_down("shift", with_release=True)
+    display.type_text("A")
+    assert pressed(display) == [MODIFIER_CODES[1], MODIFIER_CODES[1], CHARS["a"][0]]
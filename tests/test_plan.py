@@ -0,0 +1,47 @@
+import numpy as np
+
+from slodon.slodonix.systems.input.plan import compile_plan, hotkey, key, move, type, wait
+from slodon.slodonix.systems.input.recorder import KEY_DOWN, KEY_UP, MOVE
+
+SHIFT, CTRL = 50, 37
+KEYS = {"a": (38, 0), "A": (38, 1), "c": (54, 0), "v": (55, 0), "V": (55, 1)}
+NAMES = {"shift": (SHIFT, 0), "ctrl": (CTRL, 0)}
+
+
+def compile(plan):
+    program = compile_plan(plan, KEYS, {1: SHIFT, 4: CTRL}.get, lambda name: NAMES.get(name) or KEYS.get(name))
+    records = np.concatenate([segment for segment in program.segments if isinstance(segment, np.ndarray)])
+    return [(int(op), int(detail)) for op, detail in zip(records["op"], records["detail"])]
+
+
+def test_hotkeys_sharing_a_modifier_keep_it_pressed():
+    assert compile([hotkey("ctrl", "c"), hotkey("ctrl", "v")]) == [
+        (KEY_DOWN, CTRL), (KEY_DOWN, 54), (KEY_UP, 54), (KEY_DOWN, 55), (KEY_UP, 55), (KEY_UP, CTRL),
+    ]
+
+
+def test_modifier_taps_are_kept():
+    taps = [(KEY_DOWN, SHIFT), (KEY_UP, SHIFT)] * 2
+    assert compile([key("shift"), key("shift")]) == taps
+    assert compile([hotkey("shift"), hotkey("shift")]) == taps
+    assert compile('key("ctrl"); key("ctrl")') == [(KEY_DOWN, CTRL), (KEY_UP, CTRL)] * 2
+
+
+def test_tap_after_a_chord_is_kept():
+    assert compile([hotkey("ctrl", "c"), key("ctrl")]) == [
+        (KEY_DOWN, CTRL), (KEY_DOWN, 54), (KEY_UP, 54), (KEY_UP, CTRL), (KEY_DOWN, CTRL), (KEY_UP, CTRL),
+    ]
+
+
+def test_shifted_keys_share_shift():
+    assert compile([key("A"), type("V")]) == [
+        (KEY_DOWN, SHIFT), (KEY_DOWN, 38), (KEY_UP, 38), (KEY_DOWN, 55), (KEY_UP, 55), (KEY_UP, SHIFT),
+    ]
+
+
+def test_a_wait_keeps_the_release():
+    assert compile([hotkey("ctrl", "c"), wait(0.5), hotkey("ctrl", "v")]).count((KEY_UP, CTRL)) == 2
+
+
+def test_consecutive_moves_merge():
+    assert compile([move(1, 2), move(3, 4), move(5, 6)]) == [(MOVE, 0)]
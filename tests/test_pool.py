@@ -0,0 +1,52 @@
+import threading
+
+from slodon.slodonix.systems.x.display.pool import DisplayPool
+from slodon.slodonix.systems.x.protocol import bds
+
+from tests.fakex import FakeX
+
+
+def test_release_resets_the_display(fake_x: FakeX):
+    pool = DisplayPool()
+    display = pool.acquire(fake_x.name)
+    display.size()
+    display.recorder = []
+    assert display.root_event_masks
+    pool.release(display)
+
+    assert display.root_event_masks == {}
+    assert display._state is None and display._keyboard is None and display.recorder is None
+    masks = [body for data, body in fake_x.requests_of(bds.CHANGE_WINDOW_ATTRIBUTES.opcode)]
+    assert masks[-1][-4:] == bytes(4)  # the events of the root window deselected
+    assert pool.acquire(fake_x.name) is display
+    pool.close()
+
+
+def test_release_closes_a_dead_display(fake_x: FakeX):
+    pool = DisplayPool()
+    display = pool.acquire(fake_x.name)
+    display.connection._status = False
+    pool.release(display)
+    assert display.connection._connection.fileno() == -1
+    assert pool.stats()["idle"] == 0
+    pool.close()
+
+
+def test_threads_share_the_pool(fake_x: FakeX):
+    pool = DisplayPool(max_per_display=4)
+
+    def use() -> None:
+        for _ in range(20):
+            with pool.display(fake_x.name):
+                pass
+
+    threads = [threading.Thread(target=use) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = pool.stats()
+    assert stats["in_use"] == 0
+    assert stats["idle"] <= 4
+    assert stats["hits"] + stats["misses"] == 80
+    pool.close()
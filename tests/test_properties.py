@@ -0,0 +1,96 @@
+import struct
+
+from slodon.slodonix.systems.x.display.display import Display
+from slodon.slodonix.systems.x.display.properties import fetch_window_properties
+
+from tests.fakex import FakeX
+
+QUERY_TREE = 15
+
+
+def cardinals(*values: int) -> bytes:
+    return struct.pack(f"<{len(values)}I", *values)
+
+
+def test_fetch_decodes_every_type(fake_x: FakeX):
+    fake_x.children[fake_x.root] = [0x201, 0x202]
+    fake_x.children[0x201] = [0x211]
+    fake_x.geometry[0x201] = (100, 50, 640, 480)
+    fake_x.geometry[0x202] = (0, 0, 10, 10)
+    fake_x.geometry[0x211] = (4, 20, 600, 400)  # a client inside its frame
+    display = Display(fake_x.name)
+    atoms = display.atoms
+    skip_taskbar = fake_x.intern(b"_NET_WM_STATE_SKIP_TASKBAR")  # not cached by the client
+    properties = {
+        "WM_NAME": (atoms["STRING"], 8, "café".encode("latin-1")),
+        "_NET_WM_NAME": (atoms["UTF8_STRING"], 8, "café ☕".encode()),
+        "WM_CLASS": (atoms["STRING"], 8, b"term\0Term\0"),
+        "_NET_WM_PID": (atoms["CARDINAL"], 32, cardinals(4242)),
+        "_NET_WM_STATE": (atoms["ATOM"], 32, cardinals(atoms["_NET_WM_STATE_ABOVE"], skip_taskbar)),
+        "_NET_FRAME_EXTENTS": (atoms["CARDINAL"], 32, cardinals(1, 2, 3, 4)),
+    }
+    for name, value in properties.items():
+        fake_x.properties[0x211, atoms[name]] = value
+    client_list = atoms["_NET_CLIENT_LIST"]
+    fake_x.properties[fake_x.root, client_list] = (atoms["WINDOW"], 32, cardinals(0x211, 0x202))
+
+    table = fetch_window_properties(display, (*properties, "WM_WINDOW_ROLE"))
+    assert table.ids == [0x211, 0x202]
+    assert table.row(0) == {
+        "id": 0x211,
+        "WM_NAME": "café",
+        "_NET_WM_NAME": "café ☕",
+        "WM_CLASS": ("term", "Term"),
+        "_NET_WM_PID": 4242,
+        "_NET_WM_STATE": ("_NET_WM_STATE_ABOVE", "_NET_WM_STATE_SKIP_TASKBAR"),
+        "_NET_FRAME_EXTENTS": (1, 2, 3, 4),
+        "WM_WINDOW_ROLE": None,
+        "x": 104, "y": 70, "width": 600, "height": 400,
+    }
+    assert table.row(1) == {"id": 0x202, **{name: None for name in (*properties, "WM_WINDOW_ROLE")},
+                            "x": 0, "y": 0, "width": 10, "height": 10}
+    display.close()
+
+
+def test_fetch_is_one_batch(fake_x: FakeX):
+    windows = list(range(0x201, 0x221))
+    fake_x.children[fake_x.root] = windows
+    for window in windows:
+        fake_x.geometry[window] = (window, 0, 1, 1)
+    display = Display(fake_x.name)
+    display.atoms.prefetch(("WM_NAME", "_NET_WM_PID", "ATOM"))
+    connection = display.connection
+    flushed = connection._flushed
+    table = fetch_window_properties(display, ("WM_NAME", "_NET_WM_PID"), windows=windows)
+    # every GetProperty/GetGeometry/TranslateCoordinates went out together
+    assert connection._flushed - flushed == len(windows) * 4
+    assert table["x"] == windows and table["WM_NAME"] == [None] * len(windows)
+    display.close()
+
+
+def test_windows_destroyed_before_the_fetch(fake_x: FakeX):
+    fake_x.children[fake_x.root] = [0x201, 0x202]
+    fake_x.geometry[0x201] = (0, 0, 10, 10)
+    fake_x.geometry[0x202] = (20, 0, 10, 10)
+    display = Display(fake_x.name)
+    atoms = display.atoms
+    fake_x.properties[0x202, atoms["WM_NAME"]] = (atoms["STRING"], 8, b"kept")
+    # no _NET_CLIENT_LIST: the children of the root window, one of them destroyed after the QueryTree
+    original = fake_x._answer
+
+    def destroy_after_query_tree(client, sequence, opcode, data, body):
+        answer = original(client, sequence, opcode, data, body)
+        if opcode == QUERY_TREE:
+            fake_x.geometry.pop(0x201)
+            fake_x.children[fake_x.root].remove(0x201)
+        return answer
+
+    fake_x._answer = destroy_after_query_tree
+    table = fetch_window_properties(display, ("WM_NAME", "_NET_WM_STATE"))
+    assert table.ids == [0x201, 0x202]
+    assert table.row(0) == {"id": 0x201, "WM_NAME": None, "_NET_WM_STATE": None,
+                            "x": None, "y": None, "width": None, "height": None}
+    assert table.row(1)["WM_NAME"] == "kept" and table.row(1)["x"] == 20
+    display.connection.sync()
+    assert not display.connection.errors  # the errors of the destroyed window were expected, not reported
+    display.close()
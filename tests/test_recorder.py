@@ -0,0 +1,166 @@
+import functools
+import struct
+
+import numpy as np
+import pytest
+
+from slodon.slodonix.slodonix.slodonix_null import Display as NullDisplay
+from slodon.slodonix.systems.input.recorder import (
+    BUTTON_DOWN, BUTTON_UP, KEY_DOWN, KEY_UP, MOVE, RECORD, Recorder, Replayer,
+)
+from slodon.slodonix.systems.x.display.display import Display
+from slodon.slodonix.systems.x.display.record import InputCapture
+from slodon.slodonix.systems.x.errors import DisplayError
+from slodon.slodonix.systems.x.protocol.bds import EVENTS
+
+from tests.fakex import FakeX
+
+RECORD_EXTENSION = (148, 0, 0)
+XTEST = 140
+
+
+def event(code: int, **fields) -> bytes:
+    data = bytearray(32)
+    data[0] = code
+    for name, value in fields.items():
+        offset, field = EVENTS[code].field(name)
+        field.pack_into(data, offset, value)
+    return bytes(data)
+
+
+def session(display: NullDisplay) -> None:
+    display.move_to(100, 200)
+    display.type_text("aB", interval=0.25)
+    display.click(300, 400, clicks=2, interval=0.5)
+
+
+def test_record_and_replay_through_the_memory_map(tmp_path):
+    path = tmp_path / "input.log"
+    display = NullDisplay()
+    with Recorder(path, block=4, clock=display._clock) as recorder:  # blocks smaller than the session
+        display.recorder = recorder
+        session(display)
+    recorded = display.operations.copy()
+    assert recorder.count == len(recorded) > 4
+
+    other = NullDisplay()
+    with Replayer(path) as replayer:
+        assert len(replayer) == len(recorded)
+        assert not replayer.records.flags.owndata  # a view over the map, nothing parsed
+        assert np.array_equal(replayer.records, recorded)
+        sends = replayer.replay(other.send_records, clock=other._clock, sleep=other._sleep)
+    assert 1 < sends < len(recorded)  # the actions due together are sent together
+    replayed = other.operations
+    for name in ("op", "detail", "x", "y"):
+        assert np.array_equal(replayed[name], recorded[name])
+    assert np.allclose(replayed["time"], recorded["time"])
+
+
+def test_replay_speed(tmp_path):
+    path = tmp_path / "input.log"
+    display = NullDisplay()
+    with Recorder(path, clock=display._clock) as recorder:
+        display.recorder = recorder
+        session(display)
+    recorded = display.operations.copy()
+
+    with Replayer(path) as replayer:
+        faster = NullDisplay()
+        replayer.replay(faster.send_records, speed=2.0, clock=faster._clock, sleep=faster._sleep)
+        assert np.allclose(faster.operations["time"], recorded["time"] / 2)
+
+        # one send of the whole log, the gaps waited by the send itself
+        timed = NullDisplay()
+        assert replayer.replay(functools.partial(timed.send_records, timed=True, speed=4.0), speed=None) == 1
+        assert np.allclose(timed.operations["time"], recorded["time"] / 4)
+        with pytest.raises(ValueError):
+            replayer.replay(NullDisplay().send_records, speed=0)
+
+
+def test_a_new_session_continues_the_log(tmp_path):
+    path = tmp_path / "input.log"
+    now = [10.0]
+    with Recorder(path, clock=lambda: now[0]) as recorder:
+        recorder.append(KEY_DOWN, 38)
+        now[0] += 1.5
+        recorder.append(KEY_UP, 38)
+    now[0] = 500.0  # another process: another clock
+    with Recorder(path, clock=lambda: now[0]) as recorder:
+        recorder.append(MOVE, 0, 5, 6)
+        recorder.extend([(BUTTON_DOWN, 1, 0, 0, 0.25), (BUTTON_UP, 1, 0, 0, 0.25)])
+
+    with open(path, "ab") as file:
+        file.write(bytes(RECORD.itemsize // 2))  # a torn record of a crash
+    with Replayer(path) as replayer:
+        records = replayer.records.copy()  # a view over the map would keep it open
+    assert records["op"].tolist() == [KEY_DOWN, KEY_UP, MOVE, BUTTON_DOWN, BUTTON_UP]
+    assert records["time"].tolist() == [0.0, 1.5, 1.5, 1.75, 2.0]
+    assert (records["x"][2], records["y"][2]) == (5, 6)
+
+
+def test_not_an_input_log(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"something else entirely")
+    with pytest.raises(ValueError):
+        Replayer(path)
+    with pytest.raises(ValueError):
+        Recorder(path)
+    (tmp_path / "empty").write_bytes(b"")
+    with pytest.raises(ValueError):
+        Replayer(tmp_path / "empty")
+
+
+def test_send_records_scales_the_xtest_delays(fake_x: FakeX):
+    display = Display(fake_x.name)
+    records = np.zeros(3, dtype=RECORD)
+    records["time"] = [1.0, 1.5, 2.5]
+    records["op"] = [KEY_DOWN, KEY_UP, MOVE]
+    records["detail"] = [38, 38, 0]
+    records["x"], records["y"] = [0, 0, 70], [0, 0, 80]
+    display.send_records(records, timed=True, speed=2.0)
+    display.connection.sync()
+    inputs = [struct.unpack_from("<BB2xI", body) for minor, body in fake_x.requests_of(XTEST) if minor == 2]
+    assert inputs == [(KEY_DOWN, 38, 0), (KEY_UP, 38, 250), (MOVE, 0, 500)]
+    assert display.position() == (70, 80)  # known from the records, not queried
+    with pytest.raises(ValueError):
+        display.send_records(records, timed=True, speed=0)
+    display.close()
+
+
+def test_input_capture_records_the_intercepted_events(fake_x: FakeX, tmp_path):
+    fake_x.extensions[b"RECORD"] = RECORD_EXTENSION
+    display = Display(fake_x.name)
+    now = [50.0]
+    recorder = Recorder(tmp_path / "input.log", clock=lambda: now[0])
+    capture = InputCapture(display, recorder)
+    for _ in range(20):  # StartOfData
+        if capture.context in fake_x.record_streams:
+            break
+        capture.poll(0.05)
+    start = fake_x.time
+
+    fake_x.intercept(capture.context, b"".join((
+        event(2, detail=38, time=start + 100),
+        event(6, time=start + 250, root_x=12, root_y=34),
+        event(12),  # an Expose: not input
+        event(3, detail=38, time=start + 400),
+    )))
+    assert capture.poll(1.0) == 3
+    capture.close()
+    assert not capture.enabled and capture.error is None
+    recorder.close()
+
+    with Replayer(tmp_path / "input.log") as replayer:
+        records = replayer.records.copy()
+    assert records["op"].tolist() == [KEY_DOWN, MOVE, KEY_UP]
+    assert records["detail"].tolist() == [38, 0, 38]
+    assert (records["x"][1], records["y"][1]) == (12, 34)
+    assert np.allclose(records["time"], [0.1, 0.25, 0.4])  # the times of the server
+    display.close()
+
+
+def test_input_capture_needs_the_extension(fake_x: FakeX, tmp_path):
+    display = Display(fake_x.name)
+    with Recorder(tmp_path / "input.log") as recorder, pytest.raises(DisplayError, match="RECORD"):
+        InputCapture(display, recorder)
+    display.close()
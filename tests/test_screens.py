@@ -0,0 +1,123 @@
+import struct
+
+import numpy as np
+import pytest
+
+from slodon.slodonix.systems.x.display.display import Display
+from slodon.slodonix.systems.x.display.screens import Monitor, MonitorLayout, Screen, parse_screens
+from slodon.slodonix.systems.x.display.state import DisplayState
+from slodon.slodonix.systems.x.protocol.connect import Connection, parse_setup
+
+from tests.fakex import FakeX
+
+
+def screen(root: int, width: int, height: int, depths: list[tuple[int, int]]) -> bytes:
+    """
+    A screen of the setup with depths of (depth, visuals)
+    """
+    data = struct.pack(
+        "<IIIIIHHHHHHIBBBB", root, root + 1, 0xFFFFFF, 0, 0, width, height, width // 4, height // 4, 1, 1, root + 2,
+        0, 0, 24, len(depths),
+    )
+    for depth, visuals in depths:
+        data += struct.pack("<BxHxxxx", depth, visuals)
+        data += b"".join(struct.pack("<IBBHIIIxxxx", root + 3 + index, 4, 8, 256, 0xFF0000, 0xFF00, 0xFF)
+                         for index in range(visuals))
+    return data
+
+
+def test_parse_screens_skips_the_depths_and_visuals():
+    vendor = b"Test"
+    screens = screen(0x100, 1920, 1080, [(24, 2), (1, 0), (32, 1)]) + screen(0x200, 1280, 1024, [(24, 1)])
+    data = struct.pack("<IIIIHHBBBBBBBBxxxx", 1, 0x400000, 0x1FFFFF, 0, len(vendor), 65535, 2, 1, 0, 0, 32, 32, 8, 255)
+    data += vendor + struct.pack("<BBBxxxxx", 24, 32, 32) + screens
+    setup = parse_setup(struct.pack("<BxHHH", 1, 11, 0, len(data) // 4), data)
+    assert setup.roots == (0x100, 0x200)
+    assert parse_screens(setup) == (
+        Screen(0, 0x100, 1920, 1080, 480, 270, 24, 0x102, 0x101, 0xFFFFFF, 0),
+        Screen(1, 0x200, 1280, 1024, 320, 256, 24, 0x202, 0x201, 0xFFFFFF, 0),
+    )
+
+
+def test_parse_screens_of_a_server(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    (first,) = parse_screens(connection.setup)
+    assert (first.root, first.width, first.height, first.root_depth) == (fake_x.root, 1920, 1080, 24)
+    connection.close()
+
+
+# two side by side monitors, and a third one mirroring the left half of the second one
+LAYOUT = MonitorLayout((
+    Monitor("left", 0, 0, 1920, 1080),
+    Monitor("right", 1920, 0, 2560, 1440, primary=True),
+    Monitor("mirror", 1920, 0, 1280, 720),
+))
+
+
+def test_layout_properties():
+    assert LAYOUT.primary == 1 and LAYOUT[2].name == "mirror" and len(LAYOUT) == 3
+    assert LAYOUT.bounds == (0, 0, 4480, 1440)
+    assert LAYOUT.rects.tolist() == [[0, 0, 1920, 1080], [1920, 0, 2560, 1440], [1920, 0, 1280, 720]]
+    assert not LAYOUT.rects.flags.writeable
+    assert MonitorLayout(list(LAYOUT)) == LAYOUT and hash(MonitorLayout(list(LAYOUT))) == hash(LAYOUT)
+    assert MonitorLayout((Monitor("a", 0, 0, 10, 10),)).primary == 0
+    with pytest.raises(ValueError):
+        MonitorLayout(())
+
+
+POINTS = [(0, 0), (1919, 1079), (1920, 0), (2000, 700), (4479, 1439), (100, 1200), (5000, -50), (-3, 500)]
+
+
+@pytest.mark.parametrize("nearest, expected", [
+    (False, [0, 0, 1, 1, 1, -1, -1, -1]),  # the mirror overlaps "right", listed before it
+    (True, [0, 0, 1, 1, 1, 0, 1, 0]),
+])
+def test_locate_one_and_many_points_agree(nearest: bool, expected: list[int]):
+    assert [LAYOUT.locate(point, nearest) for point in POINTS] == expected
+    indices = LAYOUT.locate(np.array(POINTS), nearest)
+    assert indices.dtype == np.intp and indices.tolist() == expected
+    assert LAYOUT.locate(np.array([[2000, 700]]), nearest).tolist() == [1]
+
+
+def test_nearest_monitor_of_a_point_in_a_gap():
+    layout = MonitorLayout((Monitor("a", 0, 0, 100, 100), Monitor("b", 200, 0, 100, 100)))
+    assert [layout.locate((x, 50), nearest=True) for x in (120, 149, 151, 180)] == [0, 0, 1, 1]
+    assert layout.locate(np.array([[120, 50], [180, 50]]), nearest=True).tolist() == [0, 1]
+
+
+def test_clamp():
+    assert LAYOUT.clamp((100, 1200)) == (100, 1079)
+    assert LAYOUT.clamp((2000, 700)) == (2000, 700)
+    clamped = LAYOUT.clamp(np.array([[5000, -50], [-3, 500], [10, 10]]))
+    assert clamped.tolist() == [[4479, 0], [0, 500], [10, 10]]
+
+
+def test_to_local_and_back():
+    assert LAYOUT.to_local((2000, 700)) == (1, (80, 700))
+    assert LAYOUT.to_local((100, 1200)) == (0, (100, 1200))  # outside: relative to the closest monitor
+    indices, local = LAYOUT.to_local(np.array(POINTS[:5]))
+    assert indices.tolist() == [0, 0, 1, 1, 1]
+    assert local.tolist() == [[0, 0], [1919, 1079], [0, 0], [80, 700], [2559, 1439]]
+    assert LAYOUT.to_root(indices, local).tolist() == [list(point) for point in POINTS[:5]]
+    assert LAYOUT.to_root(1, (80, 700)) == (2000, 700)
+    assert LAYOUT.to_root(1, (0.5, 1.0), normalized=True) == (1920 + 1280, 1439)
+    assert LAYOUT.to_root([0, 2], [(1.0, 0.0), (0.0, 1.0)], normalized=True).tolist() == [[1919, 0], [1920, 719]]
+
+
+def test_xinerama_when_randr_has_no_monitors(fake_x: FakeX):
+    fake_x.randr_version = (1, 4)  # RRGetMonitors is RandR 1.5
+    fake_x.extensions[b"XINERAMA"] = (150, 0, 0)
+    fake_x.xinerama_screens = [(0, 0, 1280, 1024), (1280, 0, 1920, 1080)]
+    state = DisplayState(Display(fake_x.name))
+    layout = state.monitors()
+    assert [(monitor.name, *monitor[1:5], monitor.primary) for monitor in layout] == [
+        ("xinerama0", 0, 0, 1280, 1024, True), ("xinerama1", 1280, 0, 1920, 1080, False),
+    ]
+    assert layout.locate((1300, 10)) == 1
+
+
+def test_whole_screen_without_randr_nor_xinerama(fake_x: FakeX):
+    del fake_x.extensions[b"RANDR"]
+    state = DisplayState(Display(fake_x.name))
+    (monitor,) = state.monitors()
+    assert monitor == Monitor("screen0", 0, 0, 1920, 1080, 500, 300, True)
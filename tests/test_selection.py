@@ -0,0 +1,45 @@
+import struct
+
+from slodon.slodonix.systems.x.display.display import Display
+from slodon.slodonix.systems.x.display.selection import DELETED, PROPERTY_CHANGE_MASK, SelectionOwner
+
+from tests.fakex import FakeX
+
+REQUESTOR = 0x300
+
+
+def property_notify(window: int, atom: int, state: int) -> bytes:
+    return struct.pack("<BxHIIIB", 28, 0, window, atom, 1, state).ljust(32, b"\0")
+
+
+def selection_request(owner: int, requestor: int, selection: int, target: int, property: int) -> bytes:
+    return struct.pack("<BxHIIIIII", 30, 0, 0, owner, requestor, selection, target, property).ljust(32, b"\0")
+
+
+def test_incr_transfer_keeps_the_event_mask_of_the_requestor(fake_x: FakeX):
+    fake_x.children[fake_x.root] = [REQUESTOR]
+    fake_x.geometry[REQUESTOR] = (0, 0, 10, 10)
+    display = Display(fake_x.name)
+    display.window_tree(names=False)  # follows the requestor: SubstructureNotify selected on it
+    tree_mask = fake_x.event_masks[REQUESTOR]
+    assert tree_mask and not tree_mask & PROPERTY_CHANGE_MASK
+
+    owner = SelectionOwner(display, "x" * 100, chunk_size=40)
+    owner.acquire()
+    target, property = display.atoms["UTF8_STRING"], display.atoms["_SLODON_TEST"]
+    fake_x.send_event(selection_request(owner.window, REQUESTOR, owner.selection, target, property))
+    assert owner.serve(1.0, until=lambda owner: owner.busy)
+    display.connection.sync()  # the requests are processed
+    assert fake_x.event_masks[REQUESTOR] == tree_mask | PROPERTY_CHANGE_MASK
+
+    # the requestor deletes the property after INCR and after every chunk(40, 40, 20, then the empty one),
+    # the last event comes after the end of the transfer
+    for _ in range(5):
+        fake_x.send_event(property_notify(REQUESTOR, property, DELETED))
+    display.connection.sync()
+    assert owner.serve(1.0)
+    assert owner.served == 1 and not owner.busy
+    display.connection.sync()
+    assert fake_x.event_masks[REQUESTOR] == tree_mask
+    owner.close()
+    display.close()
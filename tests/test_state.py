@@ -0,0 +1,117 @@
+from slodon.slodonix.systems.x.display.display import Display
+from slodon.slodonix.systems.x.display.state import CONFIGURE_NOTIFY, MOTION_NOTIFY, POINTER_TTL, DisplayState
+from slodon.slodonix.systems.x.protocol.bds import EVENTS
+
+from tests.fakex import FakeX
+
+GET_GEOMETRY = 14
+QUERY_POINTER = 38
+RR_SCREEN_CHANGE_NOTIFY = 89  # first event of the RANDR extension of FakeX
+
+
+def event(code: int, **fields) -> bytes:
+    data = bytearray(32)
+    data[0] = code
+    for name, value in fields.items():
+        offset, field = EVENTS[code].field(name)
+        field.pack_into(data, offset, value)
+    return bytes(data)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_configure_notify_updates_the_size_without_a_query(fake_x: FakeX):
+    state = DisplayState(Display(fake_x.name))
+    assert state.size() == (1920, 1080)
+    fake_x.send_event(event(CONFIGURE_NOTIFY, event=fake_x.root, window=fake_x.root, width=1280, height=720))
+    state.connection.sync()
+    assert state.size() == (1280, 720)
+    assert len(fake_x.requests_of(GET_GEOMETRY)) == 1
+
+    # the ConfigureNotify of another window is left to the others
+    fake_x.send_event(event(CONFIGURE_NOTIFY, event=0x300, window=0x300, width=10, height=10))
+    state.connection.sync()
+    assert state.size() == (1280, 720)
+    assert len(state.connection.take_events()) == 32
+
+
+def test_randr_notification_invalidates_the_geometry(fake_x: FakeX):
+    fake_x.monitors = [(0, 1, 0, 0, 1920, 1080)]
+    state = DisplayState(Display(fake_x.name))
+    assert state.size() == (1920, 1080)
+    assert [monitor[1:5] for monitor in state.monitors()] == [(0, 0, 1920, 1080)]
+    queries = state.queries
+
+    fake_x.geometry[fake_x.root] = (0, 0, 3840, 1080)
+    fake_x.monitors = [(0, 1, 0, 0, 1920, 1080), (0, 0, 1920, 0, 1920, 1080)]
+    fake_x.send_event(event(RR_SCREEN_CHANGE_NOTIFY))
+    state.connection.sync()
+    assert state.size() == (3840, 1080)
+    assert [monitor[1:5] for monitor in state.monitors()] == [(0, 0, 1920, 1080), (1920, 0, 1920, 1080)]
+    assert state.queries == queries + 2
+    assert len(fake_x.requests_of(GET_GEOMETRY)) == 2
+
+
+def test_pointer_is_cached_and_kept_current_by_the_events(fake_x: FakeX):
+    clock = Clock()
+    state = DisplayState(Display(fake_x.name), clock=clock)
+    assert state.pointer_ttl == POINTER_TTL
+    assert state.pointer() == fake_x.pointer
+    assert len(fake_x.requests_of(QUERY_POINTER)) == 1
+
+    # a motion on the root window, then a move of the display itself: no query
+    fake_x.send_event(event(MOTION_NOTIFY, root=fake_x.root, event=fake_x.root, root_x=300, root_y=400))
+    state.connection.sync()
+    assert state.pointer() == (300, 400)
+    state.moved(5, 6)
+    assert state.pointer() == (5, 6)
+    # a motion reported to a client window is not the business of the state
+    fake_x.send_event(event(MOTION_NOTIFY, root=fake_x.root, event=0x300, root_x=7, root_y=8))
+    state.connection.sync()
+    assert state.pointer() == (5, 6)
+    assert len(fake_x.requests_of(QUERY_POINTER)) == 1
+
+
+def test_pointer_is_queried_again_after_its_ttl(fake_x: FakeX):
+    clock = Clock()
+    state = DisplayState(Display(fake_x.name), clock=clock)
+    state.moved(5, 6)
+    clock.now += POINTER_TTL / 2
+    assert state.pointer() == (5, 6)
+    assert not fake_x.requests_of(QUERY_POINTER)
+
+    # the pointer moved over a client window, the root window got no event
+    clock.now += POINTER_TTL
+    assert state.pointer() == fake_x.pointer
+    assert len(fake_x.requests_of(QUERY_POINTER)) == 1
+    assert state.pointer() == fake_x.pointer
+    assert len(fake_x.requests_of(QUERY_POINTER)) == 1
+
+    # no limit: trusted until an event or invalidate()
+    state.pointer_ttl = None
+    state.moved(5, 6)
+    clock.now += 3600
+    assert state.pointer() == (5, 6)
+    state.invalidate()
+    assert state.pointer() == fake_x.pointer
+    assert len(fake_x.requests_of(QUERY_POINTER)) == 2
+
+
+def test_state_on_xvfb(xvfb: str):
+    display = Display(xvfb)
+    try:
+        state = display.state
+        assert state.size() == (800, 600)
+        assert state.monitors().bounds == (0, 0, 800, 600)
+        display.move_to(120, 340)
+        assert display.position() == (120, 340)
+        state.invalidate()
+        assert display.position() == (120, 340)  # queried: the server moved the pointer too
+    finally:
+        display.close()
@@ -0,0 +1,156 @@
+from slodon.slodonix.systems.x.display.display import Display
+from slodon.slodonix.systems.x.protocol.bds import EVENTS
+
+from tests.fakex import FakeX
+
+CREATE_NOTIFY = 16
+DESTROY_NOTIFY = 17
+UNMAP_NOTIFY = 18
+MAP_NOTIFY = 19
+REPARENT_NOTIFY = 21
+CONFIGURE_NOTIFY = 22
+PROPERTY_NOTIFY = 28
+
+
+def event(code: int, **fields) -> bytes:
+    data = bytearray(32)
+    data[0] = code
+    for name, value in fields.items():
+        offset, field = EVENTS[code].field(name)
+        field.pack_into(data, offset, value)
+    return bytes(data)
+
+
+def seeded(fake_x: FakeX, *windows: int):
+    fake_x.children[fake_x.root] = list(windows)
+    for index, window in enumerate(windows):
+        fake_x.geometry[window] = (10 * index, 0, 100, 100)
+    display = Display(fake_x.name)
+    return display, display.window_tree()
+
+
+def deliver(fake_x: FakeX, display: Display, tree, *events: bytes) -> int:
+    for message in events:
+        fake_x.send_event(message)
+    display.connection.sync()
+    applied = tree.refresh()
+    display.connection.sync()  # the replies of the requests queued for new windows
+    tree.resolve()
+    return applied
+
+
+def test_seed_reads_attributes_and_geometry(fake_x: FakeX):
+    fake_x.children[fake_x.root] = [0x201, 0x202]
+    fake_x.geometry[0x201] = (10, 20, 300, 200)
+    fake_x.geometry[0x202] = (5, 6, 7, 8)
+    fake_x.unmapped.add(0x202)
+
+    display = Display(fake_x.name)
+    atoms = display.atoms
+    fake_x.properties[0x201, atoms["WM_NAME"]] = (atoms["STRING"], 8, b"editor")
+    tree = display.window_tree()
+    first, second = tree[0x201], tree[0x202]
+    assert (first.x, first.y, first.width, first.height, first.mapped) == (10, 20, 300, 200, True)
+    assert (second.x, second.y, second.width, second.height, second.mapped) == (5, 6, 7, 8, False)
+    assert [node.id for node in tree.find("editor")] == [0x201]
+    display.close()
+
+
+def test_create_notify_adds_the_window_on_top(fake_x: FakeX):
+    display, tree = seeded(fake_x, 0x201)
+    root = fake_x.root
+    fake_x.children[root].append(0x205)
+    fake_x.children[0x205] = [0x206]
+    fake_x.geometry[0x205] = (1, 2, 30, 40)
+    fake_x.geometry[0x206] = (0, 0, 5, 5)
+    fake_x.properties[0x205, display.atoms["WM_NAME"]] = (display.atoms["STRING"], 8, b"dialog")
+    created = event(CREATE_NOTIFY, parent=root, window=0x205, x=1, y=2, width=30, height=40, border_width=1)
+    outside = event(CREATE_NOTIFY, parent=0x999, window=0x998)
+    assert deliver(fake_x, display, tree, created, outside) == 1
+
+    node = tree[0x205]
+    assert (node.parent, node.x, node.y, node.width, node.height, node.border_width) == (root, 1, 2, 30, 40, 1)
+    assert [window.id for window in tree.top_level()] == [0x201, 0x205]
+    assert [window.id for window in tree.find("dialog")] == [0x205]
+    display.connection.sync()  # one more level: the children the new window already had
+    tree.resolve()
+    assert tree[0x206].parent == 0x205 and tree[0x205].children == [0x206]
+    assert 0x998 not in tree
+    display.close()
+
+
+def test_destroy_notify_removes_the_subtree(fake_x: FakeX):
+    fake_x.children[0x201] = [0x211]
+    fake_x.geometry[0x211] = (0, 0, 5, 5)
+    display, tree = seeded(fake_x, 0x201, 0x202)
+    atoms = display.atoms
+    fake_x.properties[0x211, atoms["WM_NAME"]] = (atoms["STRING"], 8, b"child")
+    tree.seed()
+    assert tree.find("child")
+
+    assert deliver(fake_x, display, tree, event(DESTROY_NOTIFY, event=fake_x.root, window=0x201)) == 1
+    assert 0x201 not in tree and 0x211 not in tree and not tree.find("child")
+    assert [window.id for window in tree.top_level()] == [0x202]
+    assert deliver(fake_x, display, tree, event(DESTROY_NOTIFY, event=0x999, window=0x999)) == 0
+    display.close()
+
+
+def test_configure_notify_moves_and_restacks(fake_x: FakeX):
+    display, tree = seeded(fake_x, 0x201, 0x202, 0x203)
+    root = fake_x.root
+    raised = event(
+        CONFIGURE_NOTIFY, event=root, window=0x201, above_sibling=0x203, x=50, y=60, width=70, height=80,
+        border_width=2, override_redirect=1,
+    )
+    deliver(fake_x, display, tree, raised)
+    node = tree[0x201]
+    assert (node.x, node.y, node.width, node.height, node.border_width, node.override_redirect) == (
+        50, 60, 70, 80, 2, True
+    )
+    assert [window.id for window in tree.top_level()] == [0x202, 0x203, 0x201]
+    assert tree.at(55, 65).id == 0x201  # now on top of the others
+
+    lowered = event(CONFIGURE_NOTIFY, event=root, window=0x201, above_sibling=0, x=50, y=60, width=70, height=80)
+    deliver(fake_x, display, tree, lowered)
+    assert [window.id for window in tree.top_level()] == [0x201, 0x202, 0x203]
+    middle = event(CONFIGURE_NOTIFY, event=root, window=0x201, above_sibling=0x202, width=70, height=80)
+    deliver(fake_x, display, tree, middle)
+    assert [window.id for window in tree.top_level()] == [0x202, 0x201, 0x203]
+    display.close()
+
+
+def test_reparent_notify_moves_the_window(fake_x: FakeX):
+    display, tree = seeded(fake_x, 0x201, 0x202)
+    # reported to both parents, applied twice
+    for reported in (fake_x.root, 0x201):
+        deliver(fake_x, display, tree, event(REPARENT_NOTIFY, event=reported, window=0x202, parent=0x201, x=3, y=4))
+    node = tree[0x202]
+    assert (node.parent, node.x, node.y) == (0x201, 3, 4)
+    assert tree[0x201].children == [0x202]
+    assert [window.id for window in tree.top_level()] == [0x201]
+    assert tree.position(0x202) == (3, 4)
+
+    deliver(fake_x, display, tree, event(REPARENT_NOTIFY, event=0x201, window=0x202, parent=0x999))
+    assert 0x202 not in tree and tree[0x201].children == []
+    display.close()
+
+
+def test_map_and_unmap_notify(fake_x: FakeX):
+    display, tree = seeded(fake_x, 0x201)
+    assert tree.at(5, 5).id == 0x201
+    deliver(fake_x, display, tree, event(UNMAP_NOTIFY, event=fake_x.root, window=0x201))
+    assert not tree[0x201].mapped and tree.at(5, 5) is None
+    deliver(fake_x, display, tree, event(MAP_NOTIFY, event=fake_x.root, window=0x201))
+    assert tree[0x201].mapped and tree.at(5, 5).id == 0x201
+    display.close()
+
+
+def test_property_notify_refreshes_the_name(fake_x: FakeX):
+    display, tree = seeded(fake_x, 0x201)
+    atoms = display.atoms
+    fake_x.properties[0x201, atoms["_NET_WM_NAME"]] = (atoms["UTF8_STRING"], 8, "éditeur".encode())
+    changed = event(PROPERTY_NOTIFY, window=0x201, atom=atoms["_NET_WM_NAME"])
+    other = event(PROPERTY_NOTIFY, window=0x201, atom=atoms["WM_CLASS"])
+    assert deliver(fake_x, display, tree, changed, other) == 1
+    assert tree[0x201].name == "éditeur" and [node.id for node in tree.find("édit", exact=False)] == [0x201]
+    display.close()
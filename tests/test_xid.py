@@ -0,0 +1,59 @@
+import pytest
+
+from slodon.slodonix.systems.x.errors import ResourceIdError
+from slodon.slodonix.systems.x.protocol.connect import Connection
+from slodon.slodonix.systems.x.resources.xid import XIDAllocator
+
+from tests.fakex import FakeX
+
+BASE = 0x4600000
+
+
+def test_ids_stay_inside_the_granted_range():
+    allocator = XIDAllocator(BASE, 0x3C)  # increment 4, 16 ids
+    ids = [allocator.alloc() for _ in range(16)]
+    assert ids == [BASE + 4 * index for index in range(16)]
+    assert all(xid & ~0x3C == BASE and allocator.is_allocated(xid) for xid in ids)
+    assert allocator.allocated == 16
+    with pytest.raises(ResourceIdError):
+        allocator.alloc()  # no XC-MISC
+
+
+def test_freed_ids_are_reused_first():
+    allocator = XIDAllocator(BASE, 0xFF)
+    first, second, third = (allocator.alloc() for _ in range(3))
+    allocator.free(first)
+    allocator.free(third)
+    assert not allocator.is_allocated(first) and allocator.allocated == 1
+    assert allocator.alloc() == third  # LIFO
+    assert allocator.alloc() == first
+    assert allocator.alloc() == BASE + 3
+    with pytest.raises(ResourceIdError):
+        allocator.free(first + 0x100)  # outside the range
+    allocator.free(second)
+    with pytest.raises(ResourceIdError):
+        allocator.free(second)  # twice
+
+
+def test_connection_ids_come_from_the_setup(fake_x: FakeX):
+    connection = Connection(fake_x.name)
+    xid = connection.xid.alloc()
+    assert xid & ~fake_x.resource_id_mask == fake_x.resource_id_base
+    assert connection.xid.alloc() == xid + 1
+    connection.close()
+
+
+def test_exhausted_range_is_refilled_through_xc_misc(fake_x: FakeX):
+    fake_x.resource_id_mask = 0x7
+    fake_x.extensions[b"XC-MISC"] = (146, 0, 0)
+    connection = Connection(fake_x.name)
+    base = fake_x.resource_id_base
+    assert [connection.xid.alloc() for _ in range(8)] == [base + index for index in range(8)]
+
+    # the server destroyed the resources 2 and 3 with their parent, it grants them again
+    fake_x.xid_ranges = [(base + 2, 2)]
+    assert [connection.xid.alloc() for _ in range(2)] == [base + 2, base + 3]
+    assert len(fake_x.requests_of(146)) == 1
+    with pytest.raises(ResourceIdError):
+        connection.xid.alloc()  # the server has no unused range left
+    connection.close()